@@ -1,2 +1,4 @@
 # -*- coding: utf-8 -*-
 __version__ = '1.2.0'
+
+default_app_config = 'aldryn_bootstrap3.apps.AldrynBootstrap3Config'
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from django.apps import AppConfig
+from django.utils.translation import ugettext_lazy as _
+
+
+class AldrynBootstrap3Config(AppConfig):
+    name = 'aldryn_bootstrap3'
+    verbose_name = _('Aldryn Bootstrap 3')
+
+    def ready(self):
+        from . import signals
+        from .conf import settings
+        signals.connect()
+        if settings.ALDRYN_BOOTSTRAP3_METRICS:
+            from . import thumbnails
+            thumbnails.install_generation_timing()
+        if settings.ALDRYN_BOOTSTRAP3_COMPILE_TEMPLATES:
+            from . import precompile
+            precompile.compile_on_startup()
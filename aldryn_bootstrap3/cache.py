@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import time
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from cms.models import Page, Title
+from filer.models import File, Image
+
+from .conf import settings
+
+
+FOLDER_IMAGES_KEY = 'aldryn_bootstrap3:folder_images:{}'
+FOLDER_IMAGE_COUNT_KEY = 'aldryn_bootstrap3:folder_image_count:{}'
+PAGE_URLS_VERSION_KEY = 'aldryn_bootstrap3:page_urls_version'
+PAGE_URL_KEY = 'aldryn_bootstrap3:page_url:{}:{}:{}'
+FILE_URL_KEY = 'aldryn_bootstrap3:file_url:{}'
+
+# Images of a slide folder are shown in this order
+FOLDER_IMAGES_ORDERING = ('original_filename', 'pk')
+
+
+def get_folder_images_queryset(folder_id):
+    return (
+        Image.objects
+        .filter(folder_id=folder_id)
+        .order_by(*FOLDER_IMAGES_ORDERING)
+    )
+
+
+def get_folder_image_ids(folder_id):
+    """
+    Returns the ids of the images shown as slides for a filer folder,
+    limited to ``ALDRYN_BOOTSTRAP3_CAROUSEL_FOLDER_MAX_SLIDES``.
+
+    The listing is cached until the folder or one of its files changes.
+    """
+    key = FOLDER_IMAGES_KEY.format(folder_id)
+    image_ids = cache.get(key)
+    if image_ids is None:
+        queryset = get_folder_images_queryset(folder_id).values_list('pk', flat=True)
+        image_ids = list(queryset[:settings.ALDRYN_BOOTSTRAP3_CAROUSEL_FOLDER_MAX_SLIDES])
+        cache.set(key, image_ids, settings.ALDRYN_BOOTSTRAP3_CAROUSEL_FOLDER_CACHE_TIMEOUT)
+    return image_ids
+
+
+def get_folder_images(folder_ids):
+    """
+    Returns a dict mapping each of ``folder_ids`` to the images shown as
+    slides for it, fetched with a single query for all folders.
+    """
+    image_ids = {folder_id: get_folder_image_ids(folder_id) for folder_id in set(folder_ids)}
+    images = (
+        Image.objects
+        .filter(folder_id__in=list(image_ids))
+        .in_bulk([pk for ids in image_ids.values() for pk in ids])
+    )
+    return {
+        folder_id: [images[pk] for pk in ids if pk in images]
+        for folder_id, ids in image_ids.items()
+    }
+
+
+def get_folder_image_counts(folder_ids):
+    """
+    Returns a dict mapping each of ``folder_ids`` to the number of slides
+    rendered for it. Counts missing from the cache are fetched with a single
+    aggregate query for all folders.
+    """
+    keys = {FOLDER_IMAGE_COUNT_KEY.format(folder_id): folder_id for folder_id in set(folder_ids)}
+    if not keys:
+        return {}
+    counts = {
+        keys[key]: count
+        for key, count in cache.get_many(list(keys)).items()
+    }
+    missing = [folder_id for folder_id in keys.values() if folder_id not in counts]
+    if missing:
+        queryset = (
+            Image.objects
+            .filter(folder_id__in=missing)
+            .order_by()
+            .values_list('folder_id')
+            .annotate(count=Count('pk'))
+        )
+        max_slides = settings.ALDRYN_BOOTSTRAP3_CAROUSEL_FOLDER_MAX_SLIDES
+        fetched = dict.fromkeys(missing, 0)
+        fetched.update({
+            folder_id: min(count, max_slides)
+            for folder_id, count in queryset
+        })
+        cache.set_many(
+            {FOLDER_IMAGE_COUNT_KEY.format(folder_id): count for folder_id, count in fetched.items()},
+            settings.ALDRYN_BOOTSTRAP3_CAROUSEL_FOLDER_CACHE_TIMEOUT,
+        )
+        counts.update(fetched)
+    return counts
+
+
+def invalidate_folder(folder_id):
+    cache.delete_many([
+        FOLDER_IMAGES_KEY.format(folder_id),
+        FOLDER_IMAGE_COUNT_KEY.format(folder_id),
+    ])
+
+
+def get_page_urls_version():
+    version = cache.get(PAGE_URLS_VERSION_KEY)
+    if version is None:
+        # start from the current time, so urls cached before the version
+        # was evicted are never picked up again
+        cache.add(PAGE_URLS_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(PAGE_URLS_VERSION_KEY, 0)
+    return version
+
+
+def get_page_urls(page_ids, language):
+    """
+    Returns a dict mapping each of ``page_ids`` to the page's absolute url in
+    ``language``. Urls missing from the cache are built from two queries for
+    all pages.
+    """
+    page_ids = set(page_ids)
+    if not page_ids:
+        return {}
+    version = get_page_urls_version()
+    keys = {PAGE_URL_KEY.format(version, language, page_id): page_id for page_id in page_ids}
+    urls = {
+        keys[key]: url
+        for key, url in cache.get_many(list(keys)).items()
+    }
+    missing = page_ids.difference(urls)
+    if missing:
+        pages = Page.objects.in_bulk(missing)
+        for page in pages.values():
+            page.title_cache = {}
+        for title in Title.objects.filter(page_id__in=pages):
+            pages[title.page_id].title_cache[title.language] = title
+        fetched = {
+            page_id: page.get_absolute_url(language)
+            for page_id, page in pages.items()
+        }
+        cache.set_many(
+            {PAGE_URL_KEY.format(version, language, page_id): url for page_id, url in fetched.items()},
+            settings.ALDRYN_BOOTSTRAP3_LINK_URL_CACHE_TIMEOUT,
+        )
+        urls.update(fetched)
+    return urls
+
+
+def get_file_urls(file_ids):
+    """
+    Returns a dict mapping each of ``file_ids`` to the url of the filer file,
+    fetching all files missing from the cache with a single query.
+    """
+    keys = {FILE_URL_KEY.format(file_id): file_id for file_id in set(file_ids)}
+    if not keys:
+        return {}
+    urls = {
+        keys[key]: url
+        for key, url in cache.get_many(list(keys)).items()
+    }
+    missing = [file_id for file_id in keys.values() if file_id not in urls]
+    if missing:
+        files = File.objects.non_polymorphic().filter(pk__in=missing)
+        fetched = {file_obj.pk: file_obj.url for file_obj in files}
+        cache.set_many(
+            {FILE_URL_KEY.format(file_id): url for file_id, url in fetched.items()},
+            settings.ALDRYN_BOOTSTRAP3_LINK_URL_CACHE_TIMEOUT,
+        )
+        urls.update(fetched)
+    return urls
+
+
+def invalidate_page_urls(page_ids=None):
+    """
+    Removes the cached urls of ``page_ids`` in all languages, or of all
+    pages if no ids are given.
+    """
+    if page_ids is None:
+        try:
+            cache.incr(PAGE_URLS_VERSION_KEY)
+        except ValueError:
+            cache.add(PAGE_URLS_VERSION_KEY, int(time.time() * 1000), None)
+        return
+    version = get_page_urls_version()
+    cache.delete_many([
+        PAGE_URL_KEY.format(version, language, page_id)
+        for language, name in settings.LANGUAGES
+        for page_id in page_ids
+    ])
+
+
+def invalidate_file_url(file_id):
+    cache.delete(FILE_URL_KEY.format(file_id))
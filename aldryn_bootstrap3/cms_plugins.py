@@ -6,7 +6,9 @@ import warnings
 
 from django.conf.urls import url
 from django.core.exceptions import ImproperlyConfigured
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.shortcuts import get_object_or_404
 from django.templatetags.static import static
 from django.utils.translation import ugettext_lazy as _
 from django.views.decorators.csrf import csrf_exempt
@@ -15,18 +17,37 @@ from cms.models import CMSPlugin
 from cms.plugin_base import CMSPluginBase
 from cms.plugin_pool import plugin_pool
 
-try:
-    from filer.admin.clipboardadmin import ajax_upload as filer_ajax_upload
-except ImportError:
-    filer_ajax_upload = None
-    warnings.warn('Drag and drop functionality is not avalable. '
-                  'Please update to django-filer>=1.1.1',
-                  Warning)
+from . import models, forms, constants, cache, fragments, instrumentation, links, metrics, thumbnails, utils
 
-from . import models, forms, constants
 
+_filer_ajax_upload = []
 
-class Bootstrap3RowCMSPlugin(CMSPluginBase):
+
+def get_filer_ajax_upload():
+    """
+    Returns Filer's ``ajax_upload`` view or ``None`` with django-filer<1.1.1.
+    Imported on first use as it pulls in the whole Filer admin.
+    """
+    if not _filer_ajax_upload:
+        try:
+            from filer.admin.clipboardadmin import ajax_upload
+        except ImportError:
+            ajax_upload = None
+            warnings.warn('Drag and drop functionality is not avalable. '
+                          'Please update to django-filer>=1.1.1',
+                          Warning)
+        _filer_ajax_upload.append(ajax_upload)
+    return _filer_ajax_upload[0]
+
+
+class Bootstrap3PluginBase(instrumentation.RenderTimingMixin, fragments.FragmentCacheMixin, CMSPluginBase):
+    """
+    Base of all Bootstrap3 plugins, see ``fragments.FragmentCacheMixin`` and
+    ``instrumentation.RenderTimingMixin``.
+    """
+
+
+class Bootstrap3RowCMSPlugin(Bootstrap3PluginBase):
     """
     CSS - Grid system: "Row" Plugin
     http://getbootstrap.com/css/#grid
@@ -84,7 +105,7 @@ class Bootstrap3RowCMSPlugin(CMSPluginBase):
         return response
 
 
-class Bootstrap3ColumnCMSPlugin(CMSPluginBase):
+class Bootstrap3ColumnCMSPlugin(Bootstrap3PluginBase):
     """
     CSS - Grid system: "Column" Plugin
     http://getbootstrap.com/css/#grid
@@ -120,7 +141,7 @@ class Bootstrap3ColumnCMSPlugin(CMSPluginBase):
     ]
 
 
-class Bootstrap3BlockquoteCMSPlugin(CMSPluginBase):
+class Bootstrap3BlockquoteCMSPlugin(Bootstrap3PluginBase):
     """
     CSS - Typography: "Blockquote" Plugin
     http://getbootstrap.com/css/#type-blockquotes
@@ -148,7 +169,7 @@ class Bootstrap3BlockquoteCMSPlugin(CMSPluginBase):
     ]
 
 
-class Bootstrap3CiteCMSPlugin(CMSPluginBase):
+class Bootstrap3CiteCMSPlugin(Bootstrap3PluginBase):
     """
     CSS - Typography: "Cite" Plugin
     http://getbootstrap.com/css/#type-blockquotes
@@ -178,7 +199,7 @@ class Bootstrap3CiteCMSPlugin(CMSPluginBase):
     ]
 
 
-class Bootstrap3CodeCMSPlugin(CMSPluginBase):
+class Bootstrap3CodeCMSPlugin(Bootstrap3PluginBase):
     """
     CSS - Code: Model
     http://getbootstrap.com/css/#code
@@ -191,10 +212,21 @@ class Bootstrap3CodeCMSPlugin(CMSPluginBase):
     render_template = 'aldryn_bootstrap3/plugins/code.html'
     text_enabled = True
 
+    def render(self, context, instance, placeholder):
+        if not instance.has_current_style():
+            # the style setting changed and the plugin was not highlighted
+            # again yet, see the aldryn_bootstrap3_highlight_code command
+            instance.update_highlighted_code()
+            if instance.pk:
+                instance.save_highlighted_code()
+                utils.invalidate_placeholders([(instance.placeholder_id, instance.language)])
+        return super(Bootstrap3CodeCMSPlugin, self).render(context, instance, placeholder)
+
     fieldsets = (
         (None, {
             'fields': (
                 'code_type',
+                'code_language',
                 'code',
             )
         }),
@@ -208,7 +240,7 @@ class Bootstrap3CodeCMSPlugin(CMSPluginBase):
     )
 
 
-class Bootstrap3ButtonCMSPlugin(CMSPluginBase):
+class Bootstrap3ButtonCMSPlugin(Bootstrap3PluginBase):
     """
     CSS - Buttons: "Button/Link" Plugin
     http://getbootstrap.com/css/#buttons
@@ -254,8 +286,13 @@ class Bootstrap3ButtonCMSPlugin(CMSPluginBase):
     def icon_src(self, instance):
         return static('aldryn_bootstrap3/img/type/button.png')
 
+    @classmethod
+    def get_render_queryset(cls):
+        queryset = super(Bootstrap3ButtonCMSPlugin, cls).get_render_queryset()
+        return links.with_resolved_links(queryset)
 
-class Bootstrap3ImageCMSPlugin(CMSPluginBase):
+
+class Bootstrap3ImageCMSPlugin(Bootstrap3PluginBase):
     """
     CSS - Images: Plugin
     http://getbootstrap.com/css/#images
@@ -290,7 +327,7 @@ class Bootstrap3ImageCMSPlugin(CMSPluginBase):
 
     def render(self, context, instance, placeholder):
         context.update({'instance': instance})
-        if callable(filer_ajax_upload):
+        if callable(get_filer_ajax_upload()):
             # Use this in template to conditionally enable drag-n-drop.
             context.update({'has_dnd_support': True})
         return context
@@ -320,6 +357,7 @@ class Bootstrap3ImageCMSPlugin(CMSPluginBase):
         return urlpatterns
 
     @csrf_exempt
+    @metrics.timed('upload_seconds', {'view': 'ajax_upload'})
     def ajax_upload(self, request, pk):
         """
         Handle drag-n-drop uploads.
@@ -327,6 +365,7 @@ class Bootstrap3ImageCMSPlugin(CMSPluginBase):
         Call original 'ajax_upload' Filer view, parse response and update
         plugin instance file_id from it. Send original response back.
         """
+        filer_ajax_upload = get_filer_ajax_upload()
         if not callable(filer_ajax_upload):
             # Do not try to handle request if we were unable to
             # import Filer view.
@@ -352,8 +391,13 @@ class Bootstrap3ImageCMSPlugin(CMSPluginBase):
         instance.save()
         return filer_response
 
+    @classmethod
+    def get_render_queryset(cls):
+        queryset = super(Bootstrap3ImageCMSPlugin, cls).get_render_queryset()
+        return queryset.select_related('file')
+
 
-class Bootstrap3ResponsiveCMSPlugin(CMSPluginBase):
+class Bootstrap3ResponsiveCMSPlugin(Bootstrap3PluginBase):
     """
     CSS - Responsive: "Utilities" Plugin
     http://getbootstrap.com/css/#responsive-utilities
@@ -382,7 +426,7 @@ class Bootstrap3ResponsiveCMSPlugin(CMSPluginBase):
     )
 
 
-class Bootstrap3IconCMSPlugin(CMSPluginBase):
+class Bootstrap3IconCMSPlugin(Bootstrap3PluginBase):
     """
     Component - Glyphicons: "Icon" Plugin
     http://getbootstrap.com/components/#glyphicons
@@ -415,7 +459,7 @@ class Bootstrap3IconCMSPlugin(CMSPluginBase):
         return static('aldryn_bootstrap3/img/type/icon.png')
 
 
-class Bootstrap3LabelCMSPlugin(CMSPluginBase):
+class Bootstrap3LabelCMSPlugin(Bootstrap3PluginBase):
     """
     Component - Label: Plugin
     http://getbootstrap.com/components/#labels
@@ -448,7 +492,7 @@ class Bootstrap3LabelCMSPlugin(CMSPluginBase):
         return static('aldryn_bootstrap3/img/type/label.png')
 
 
-class Bootstrap3JumbotronCMSPlugin(CMSPluginBase):
+class Bootstrap3JumbotronCMSPlugin(Bootstrap3PluginBase):
     """
     Component - Jumbotron: Plugin
     http://getbootstrap.com/components/#jumbotron
@@ -477,7 +521,7 @@ class Bootstrap3JumbotronCMSPlugin(CMSPluginBase):
     )
 
 
-class Bootstrap3AlertCMSPlugin(CMSPluginBase):
+class Bootstrap3AlertCMSPlugin(Bootstrap3PluginBase):
     """
     Component - Alert: Plugin
     http://getbootstrap.com/components/#alerts
@@ -506,7 +550,7 @@ class Bootstrap3AlertCMSPlugin(CMSPluginBase):
     )
 
 
-class Bootstrap3ListGroupCMSPlugin(CMSPluginBase):
+class Bootstrap3ListGroupCMSPlugin(Bootstrap3PluginBase):
     """
     Component - List group: "Wrapper" Plugin
     http://getbootstrap.com/components/#alerts
@@ -535,7 +579,7 @@ class Bootstrap3ListGroupCMSPlugin(CMSPluginBase):
     )
 
 
-class Bootstrap3ListGroupItemCMSPlugin(CMSPluginBase):
+class Bootstrap3ListGroupItemCMSPlugin(Bootstrap3PluginBase):
     """
     Component - List group: "Item" Plugin
     http://getbootstrap.com/components/#alerts
@@ -574,7 +618,7 @@ class Bootstrap3ListGroupItemCMSPlugin(CMSPluginBase):
         return context
 
 
-class Bootstrap3PanelCMSPlugin(CMSPluginBase):
+class Bootstrap3PanelCMSPlugin(Bootstrap3PluginBase):
     """
     Component - Panel: "Wrapper" Plugin
     http://getbootstrap.com/components/#panels
@@ -642,7 +686,7 @@ class Bootstrap3PanelCMSPlugin(CMSPluginBase):
         return response
 
 
-class Bootstrap3PanelHeadingCMSPlugin(CMSPluginBase):
+class Bootstrap3PanelHeadingCMSPlugin(Bootstrap3PluginBase):
     """
     Component - Panel: "Heading" Plugin
     http://getbootstrap.com/components/#panels-heading
@@ -672,7 +716,7 @@ class Bootstrap3PanelHeadingCMSPlugin(CMSPluginBase):
     )
 
 
-class Bootstrap3PanelBodyCMSPlugin(CMSPluginBase):
+class Bootstrap3PanelBodyCMSPlugin(Bootstrap3PluginBase):
     """
     Component - Panel: "Body" Plugin
     http://getbootstrap.com/components/#panels
@@ -700,7 +744,7 @@ class Bootstrap3PanelBodyCMSPlugin(CMSPluginBase):
     )
 
 
-class Bootstrap3PanelFooterCMSPlugin(CMSPluginBase):
+class Bootstrap3PanelFooterCMSPlugin(Bootstrap3PluginBase):
     """
     Component - Panel: "Footer" Plugin
     http://getbootstrap.com/components/#panels-footer
@@ -728,7 +772,7 @@ class Bootstrap3PanelFooterCMSPlugin(CMSPluginBase):
     )
 
 
-class Bootstrap3WellCMSPlugin(CMSPluginBase):
+class Bootstrap3WellCMSPlugin(Bootstrap3PluginBase):
     """
     Component - Wells: Plugin
     http://getbootstrap.com/components/#wells
@@ -756,7 +800,7 @@ class Bootstrap3WellCMSPlugin(CMSPluginBase):
     )
 
 
-class Bootstrap3TabCMSPlugin(CMSPluginBase):
+class Bootstrap3TabCMSPlugin(Bootstrap3PluginBase):
     """
     JavaScript - Tab: "Wrapper" Plugin
     http://getbootstrap.com/javascript/#tabs
@@ -792,7 +836,7 @@ class Bootstrap3TabCMSPlugin(CMSPluginBase):
         return context
 
 
-class Bootstrap3TabItemCMSPlugin(CMSPluginBase):
+class Bootstrap3TabItemCMSPlugin(Bootstrap3PluginBase):
     """
     JavaScript - Tab: "Item" Plugin
     http://getbootstrap.com/javascript/#tabs
@@ -822,7 +866,7 @@ class Bootstrap3TabItemCMSPlugin(CMSPluginBase):
     )
 
 
-class Bootstrap3AccordionCMSPlugin(CMSPluginBase):
+class Bootstrap3AccordionCMSPlugin(Bootstrap3PluginBase):
     """
     JavaScript - Collapse: "Accordion" Plugin
     http://getbootstrap.com/javascript/#collapse
@@ -857,7 +901,7 @@ class Bootstrap3AccordionCMSPlugin(CMSPluginBase):
         return context
 
 
-class Bootstrap3AccordionItemCMSPlugin(CMSPluginBase):
+class Bootstrap3AccordionItemCMSPlugin(Bootstrap3PluginBase):
     """
     JavaScript - Collapse: "Accordion item" Plugin
     http://getbootstrap.com/javascript/#collapse
@@ -892,7 +936,7 @@ class Bootstrap3AccordionItemCMSPlugin(CMSPluginBase):
         return context
 
 
-class CarouselBase(CMSPluginBase):
+class CarouselBase(Bootstrap3PluginBase):
     module = _('Bootstrap 3')
 
 
@@ -910,19 +954,17 @@ class CarouselSlideBase(CarouselBase):
         context['image'] = instance.image
         return context
 
-    def get_slide_template(self, instance, name='slide'):
-        if instance.parent is None:
-            style = models.Bootstrap3CarouselPlugin.STYLE_DEFAULT
-        else:
-            style = getattr(
-                instance.parent.get_plugin_instance()[0],
-                'style',
-                models.Bootstrap3CarouselPlugin.STYLE_DEFAULT,
-            )
+    def get_slide_template(self, instance, name='slide', context=None):
+        # the carousel being rendered is in the context, instead of querying
+        # the parent of each slide
+        carousel = context.get('carousel') if context is not None else None
+        if carousel is None or carousel.pk != instance.parent_id:
+            carousel = instance.parent.get_plugin_instance()[0] if instance.parent_id else None
+        style = getattr(carousel, 'style', models.Bootstrap3CarouselPlugin.STYLE_DEFAULT)
         return 'aldryn_bootstrap3/plugins/carousel/{}/{}.html'.format(style, name)
 
     def get_render_template(self, context, instance, placeholder):
-        return self.get_slide_template(instance=instance)
+        return self.get_slide_template(instance=instance, context=context)
 
 
 class Bootstrap3CarouselCMSPlugin(CarouselBase):
@@ -938,7 +980,7 @@ class Bootstrap3CarouselCMSPlugin(CarouselBase):
     allow_children = True
     child_classes = [
         'Bootstrap3CarouselSlideCMSPlugin',
-        # 'Bootstrap3CarouselSlideFolderCMSPlugin',
+        'Bootstrap3CarouselSlideFolderCMSPlugin',
     ]
     fieldsets = (
         (None, {
@@ -960,20 +1002,94 @@ class Bootstrap3CarouselCMSPlugin(CarouselBase):
 
     def render(self, context, instance, placeholder):
         context['instance'] = instance
-        if instance.child_plugin_instances:
-            number_of_slides = sum([
-                plugin.folder.file_count
-                if isinstance(plugin, Bootstrap3CarouselCMSPlugin) else 1
-                for plugin in instance.child_plugin_instances
-            ])
-        else:
-            number_of_slides = 0
-        context['slides'] = range(number_of_slides)
+        context['slides'] = range(self.get_number_of_slides(instance))
+        context['carousel'] = instance
+        models.Bootstrap3CarouselSlideFolderPlugin.prefetch_images(
+            plugin for plugin in instance.child_plugin_instances or []
+            if isinstance(plugin, models.Bootstrap3CarouselSlideFolderPlugin)
+        )
         return context
 
+    def get_number_of_slides(self, instance):
+        # every slide plugin is one slide, a slides folder contributes one
+        # slide per image. Folder sizes are looked up in one go.
+        children = instance.child_plugin_instances or []
+        folder_ids = [
+            plugin.folder_id for plugin in children
+            if isinstance(plugin, models.Bootstrap3CarouselSlideFolderPlugin)
+        ]
+        folder_counts = cache.get_folder_image_counts(folder_ids)
+        return sum(
+            folder_counts.get(plugin.folder_id, 0)
+            if isinstance(plugin, models.Bootstrap3CarouselSlideFolderPlugin) else 1
+            for plugin in children
+        )
+
     def get_render_template(self, context, instance, placeholder):
         return 'aldryn_bootstrap3/plugins/carousel/{}/carousel.html'.format(instance.style)
 
+    def get_plugin_urls(self):
+        urlpatterns = [
+            url(
+                r'^bulk_upload/(?P<pk>[0-9]+)/$',
+                self.bulk_upload,
+                name='bootstrap3_carousel_bulk_upload'
+            ),
+        ]
+        return urlpatterns
+
+    @metrics.timed('upload_seconds', {'view': 'bulk_upload'})
+    def bulk_upload(self, request, pk):
+        """
+        Create many slides at once.
+
+        Accepts several image uploads as ``files`` or a filer ``folder`` id
+        and appends one slide per image to the carousel in one transaction.
+        Thumbnails for the carousel's sizes are generated in the background.
+        Requests have to send the CSRF token, e.g. as ``X-CSRFToken`` header.
+        """
+        if request.method != 'POST':
+            return HttpResponseNotAllowed(['POST'])
+        instance = get_object_or_404(self.model, pk=pk)
+        slide_type = Bootstrap3CarouselSlideCMSPlugin.__name__
+        if not instance.placeholder.has_add_plugin_permission(request.user, slide_type):
+            return HttpResponse(
+                json.dumps({'error': 'Permission denied.'}),
+                status=403,
+                content_type='application/json')
+
+        form = forms.CarouselBulkUploadForm(request.POST, request.FILES)
+        if not form.is_valid():
+            return HttpResponse(
+                json.dumps({'errors': form.errors}),
+                status=400,
+                content_type='application/json')
+        folder = form.cleaned_data.get('folder')
+        if folder and form.uploads:
+            # the uploaded images are saved into the folder
+            allowed = folder.has_add_children_permission(request)
+        else:
+            allowed = not folder or folder.has_read_permission(request)
+        if not allowed:
+            return HttpResponse(
+                json.dumps({'error': 'Permission denied.'}),
+                status=403,
+                content_type='application/json')
+
+        with transaction.atomic():
+            images = form.get_images(owner=request.user)
+            slides = [
+                models.Bootstrap3CarouselSlidePlugin(
+                    image=image,
+                    plugin_type=slide_type,
+                ) for image in images
+            ]
+            utils.bulk_add_child_plugins(instance, slides)
+        thumbnails.queue_thumbnails(images, instance.srcset().values())
+        return HttpResponse(
+            json.dumps({'plugin_ids': [slide.pk for slide in slides]}),
+            content_type='application/json')
+
 
 class Bootstrap3CarouselSlideCMSPlugin(CarouselSlideBase):
     """
@@ -1012,6 +1128,11 @@ class Bootstrap3CarouselSlideCMSPlugin(CarouselSlideBase):
         }),
     )
 
+    @classmethod
+    def get_render_queryset(cls):
+        queryset = super(Bootstrap3CarouselSlideCMSPlugin, cls).get_render_queryset()
+        return links.with_resolved_links(queryset.select_related('image'))
+
 
 class Bootstrap3CarouselSlideFolderCMSPlugin(CarouselSlideBase):
     """
@@ -1020,20 +1141,41 @@ class Bootstrap3CarouselSlideFolderCMSPlugin(CarouselSlideBase):
     """
     model = models.Bootstrap3CarouselSlideFolderPlugin
     name = _('Carousel slides folder')
+    change_form_template = 'admin/aldryn_bootstrap3/base.html'
+
+    fieldsets = (
+        (None, {
+            'fields': (
+                'folder',
+            )
+        }),
+        (_('Advanced settings'), {
+            'classes': ('collapse',),
+            'fields': (
+                'classes',
+            ),
+        }),
+    )
 
     def render(self, context, instance, placeholder):
         context['instance'] = instance
+        context['images'] = instance.get_images()
         context['slide_template'] = self.get_slide_template(
             instance=instance,
             name='image_slide',
+            context=context,
         )
         return context
 
     def get_render_template(self, context, instance, placeholder):
-        return self.get_slide_template(instance=instance, name='slide_folder')
+        return self.get_slide_template(
+            instance=instance,
+            name='slide_folder',
+            context=context,
+        )
 
 
-class Bootstrap3SpacerCMSPlugin(CMSPluginBase):
+class Bootstrap3SpacerCMSPlugin(Bootstrap3PluginBase):
     """
     Custom - Spacer: Plugin
     """
@@ -1064,7 +1206,7 @@ class Bootstrap3SpacerCMSPlugin(CMSPluginBase):
         return static('aldryn_bootstrap3/img/type/spacer.png')
 
 
-class Bootstrap3FileCMSPlugin(CMSPluginBase):
+class Bootstrap3FileCMSPlugin(Bootstrap3PluginBase):
     """
     Custom - File: Plugin
     """
@@ -1096,6 +1238,11 @@ class Bootstrap3FileCMSPlugin(CMSPluginBase):
     def icon_src(self, instance):
         return static('aldryn_bootstrap3/img/type/file.png')
 
+    @classmethod
+    def get_render_queryset(cls):
+        queryset = super(Bootstrap3FileCMSPlugin, cls).get_render_queryset()
+        return queryset.select_related('file')
+
 
 plugin_pool.register_plugin(Bootstrap3RowCMSPlugin)
 plugin_pool.register_plugin(Bootstrap3ColumnCMSPlugin)
@@ -1122,6 +1269,6 @@ plugin_pool.register_plugin(Bootstrap3AccordionCMSPlugin)
 plugin_pool.register_plugin(Bootstrap3AccordionItemCMSPlugin)
 plugin_pool.register_plugin(Bootstrap3CarouselCMSPlugin)
 plugin_pool.register_plugin(Bootstrap3CarouselSlideCMSPlugin)
-# plugin_pool.register_plugin(Bootstrap3CarouselSlideFolderCMSPlugin)
+plugin_pool.register_plugin(Bootstrap3CarouselSlideFolderCMSPlugin)
 plugin_pool.register_plugin(Bootstrap3SpacerCMSPlugin)
 plugin_pool.register_plugin(Bootstrap3FileCMSPlugin)
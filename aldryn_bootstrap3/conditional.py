@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import calendar
+import hashlib
+
+from django.db.models import Count, Max, Q
+from django.utils.encoding import force_text
+from django.utils.http import parse_etags, parse_http_date_safe
+
+from cms.models import CMSPlugin, PagePermission, StaticPlaceholder
+from cms.plugin_pool import plugin_pool
+from cms.utils.conf import get_cms_setting
+from filer.models import File
+
+from .conf import settings
+
+try:
+    from cms.cache import _get_cache_version
+except ImportError:
+    _get_cache_version = None
+
+
+def get_page_validators(page, language):
+    """
+    Returns ``(etag, last_modified)`` for the content of ``page`` in
+    ``language``, or ``None`` if the page can not be validated without
+    rendering it because one of its plugins must not be cached or the page
+    has view restrictions.
+
+    Uses one aggregate query for the plugins of the page's placeholders and
+    the site's static placeholders and one for the filer files they show.
+    """
+    from .models import FileUsage
+
+    if get_cms_setting('PERMISSION'):
+        # e.g. pages restricted after the response was cached, and the menu
+        restrictions = (
+            PagePermission.objects
+            .filter(can_view=True)
+            .aggregate(count=Count('pk'), last=Max('pk'))
+        )
+        if restrictions['count'] and page.has_view_restrictions():
+            return None
+    else:
+        restrictions = {'count': 0, 'last': None}
+
+    placeholder_ids = list(page.placeholders.values_list('pk', flat=True))
+    placeholder_ids.extend(
+        StaticPlaceholder.objects
+        .filter(Q(site__isnull=True) | Q(site_id=page.site_id))
+        .values_list('public_id', flat=True)
+    )
+    plugin_rows = (
+        CMSPlugin.objects
+        .filter(placeholder_id__in=placeholder_ids, language=language)
+        .order_by()
+        .values_list('plugin_type')
+        .annotate(changed=Max('changed_date'), count=Count('pk'))
+    )
+    plugin_count = 0
+    timestamps = [page.changed_date]
+    for plugin_type, changed, count in plugin_rows:
+        try:
+            plugin_class = plugin_pool.get_plugin(plugin_type)
+        except KeyError:
+            continue
+        if not plugin_class.cache:
+            return None
+        plugin_count += count
+        timestamps.append(changed)
+
+    usage = FileUsage.objects.filter(placeholder_id__in=placeholder_ids, language=language)
+    file_row = (
+        File.objects
+        .filter(
+            Q(pk__in=usage.values('file_id')) |
+            Q(folder_id__in=usage.values('folder_id'))
+        )
+        .aggregate(changed=Max('modified_at'), count=Count('pk'))
+    )
+    if file_row['changed']:
+        timestamps.append(file_row['changed'])
+
+    last_modified = max(timestamps)
+    parts = [
+        settings.ALDRYN_BOOTSTRAP3_CONDITIONAL_GET_VERSION,
+        page.pk,
+        language,
+        # changes to other pages, e.g. the menu
+        _get_cache_version() if _get_cache_version else '',
+        plugin_count,
+        file_row['count'],
+        restrictions['count'],
+        restrictions['last'],
+        last_modified.isoformat(),
+    ]
+    data = ':'.join(force_text(part) for part in parts)
+    etag = hashlib.sha1(data.encode('utf-8')).hexdigest()
+    return etag, calendar.timegm(last_modified.utctimetuple())
+
+
+def is_not_modified(request, etag, last_modified):
+    """
+    Returns whether the conditional headers of ``request`` match the page
+    validators, ``If-None-Match`` takes precedence over
+    ``If-Modified-Since``.
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        # newer Django versions keep the quotes
+        etags = [value.replace('W/', '', 1).strip('"') for value in parse_etags(if_none_match)]
+        return '*' in etags or etag in etags
+    if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+    if if_modified_since:
+        if_modified_since = parse_http_date_safe(if_modified_since)
+        return if_modified_since is not None and last_modified <= if_modified_since
+    return False
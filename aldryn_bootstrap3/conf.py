@@ -17,3 +17,60 @@ class AldrynSitesConf(AppConf):
         ('glyphicons', 'glyphicons', 'Glyphicons'),
         ('fontawesome', 'fa', 'Fontawesome'),
     )
+    # generate thumbnails for bulk created carousel slides in a background
+    # thread instead of during the request
+    THUMBNAILS_ASYNC = True
+    # upper bound for the number of slides rendered from a filer folder
+    CAROUSEL_FOLDER_MAX_SLIDES = 50
+    CAROUSEL_FOLDER_CACHE_TIMEOUT = 60 * 60
+    # Pygments style for highlighted code, None only adds css classes
+    CODE_HIGHLIGHT_STYLE = None
+    # page and file urls of button and carousel slide links are cached until
+    # a page is published or moved or the file changes
+    LINK_URL_CACHE_TIMEOUT = 60 * 60 * 24
+    # part of the ETags of ConditionalPageMiddleware, change it to make
+    # clients reload pages, e.g. after deploying template changes
+    CONDITIONAL_GET_VERSION = ''
+    # rendered plugins are cached in this cache for this many seconds,
+    # 0 disables the fragment cache
+    FRAGMENT_CACHE = 'default'
+    FRAGMENT_CACHE_TIMEOUT = 0
+    # expired fragments are served for this many more seconds while one
+    # process renders them again, holding a lock for at most
+    # FRAGMENT_CACHE_LOCK_TIMEOUT seconds
+    FRAGMENT_CACHE_STALE_TIMEOUT = 5 * 60
+    FRAGMENT_CACHE_LOCK_TIMEOUT = 30
+    # missing fragments are awaited this many seconds if another process
+    # renders them already
+    FRAGMENT_CACHE_LOCK_WAIT = 5
+    # optional in-process cache in front of the shared one, generation
+    # counters may be this many seconds out of date
+    FRAGMENT_CACHE_LOCAL_TIMEOUT = 0
+    FRAGMENT_CACHE_LOCAL_MAX_ENTRIES = 1000
+    # store the HTML of the top-level plugins of pages when they are
+    # published, it is served until their placeholder or files change
+    PRERENDER = False
+    # record plugin render timings, requires RenderTimingMiddleware
+    RENDER_TIMING = False
+    # log plugin renders taking longer than this many milliseconds, without
+    # their children, 0 disables it
+    SLOW_RENDER_THRESHOLD = 0
+    # observe plugin render times and serve aldryn_bootstrap3.views.metrics_view
+    METRICS = False
+    # compile the addon's templates and check the carousel style templates
+    # on startup, compiled templates are kept by the cached template loader.
+    # Building the template engine imports the tag libraries of all apps,
+    # e.g. the filer admin, so it is off by default
+    COMPILE_TEMPLATES = False
+    # reverse ids or ids of the pages aldryn_bootstrap3_warmup renders first
+    WARMUP_PAGES = []
+    # link file plugins to aldryn_bootstrap3.views.file_download, requires
+    # aldryn_bootstrap3.urls to be included
+    FILE_DOWNLOAD_VIEW = False
+    # None (serve with django), 'xsendfile' or 'nginx' (X-Accel-Redirect)
+    FILE_DOWNLOAD_SERVER = None
+    # internal nginx location mapped to the root of the file storage
+    FILE_DOWNLOAD_NGINX_LOCATION = '/protected/'
+    # download counts are written after this many downloads or seconds
+    FILE_DOWNLOAD_FLUSH_COUNT = 100
+    FILE_DOWNLOAD_FLUSH_INTERVAL = 60
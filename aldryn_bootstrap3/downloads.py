@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import atexit
+import calendar
+import collections
+import mimetypes
+import os
+import re
+import threading
+import time
+
+from django.db import transaction
+from django.db.models import F
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
+from django.utils.http import parse_http_date_safe, urlquote
+
+from .conf import settings
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def get_local_path(file_obj):
+    """
+    Returns the path of a filer file on the local file system or ``None`` for
+    storages without one (e.g. S3).
+    """
+    try:
+        return file_obj.file.path
+    except NotImplementedError:
+        return None
+
+
+def parse_range(header, size):
+    """
+    Parses a single ``bytes=`` range. Returns ``(start, end)`` (inclusive),
+    ``None`` if the header should be ignored or ``False`` if the range can
+    not be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # multiple ranges or another unit, the whole file is served
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # suffix range, the last ``end`` bytes
+        length = int(end)
+        if not length:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    if end and int(end) < start:
+        # syntactically invalid, RFC 7233 requires ignoring the header
+        return None
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size:
+        return False
+    return start, end
+
+
+def if_range_matches(header, file_obj):
+    """
+    Returns whether the ``If-Range`` header, an ETag or a date, matches the
+    current version of ``file_obj``. A range of another version must not be
+    combined with the downloaded bytes, the whole file is served instead.
+    """
+    header = header.strip()
+    if not header:
+        return True
+    if header.startswith(('"', 'W/')):
+        # only strong ETags validate a range
+        return header == '"{}"'.format(get_etag(file_obj))
+    timestamp = parse_http_date_safe(header)
+    return timestamp is not None and timestamp == calendar.timegm(file_obj.modified_at.utctimetuple())
+
+
+def iter_range(fobj, start, length):
+    fobj.seek(start)
+    try:
+        while length > 0:
+            data = fobj.read(min(CHUNK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        fobj.close()
+
+
+def serve(request, file_obj):
+    """
+    Returns a response delivering ``file_obj``.
+
+    Depending on ``ALDRYN_BOOTSTRAP3_FILE_DOWNLOAD_SERVER`` the file is
+    handed off to the web server (``'xsendfile'`` or ``'nginx'``) or served
+    by Django with support for single range requests. Files without a local
+    path are redirected to their storage URL.
+    """
+    server = settings.ALDRYN_BOOTSTRAP3_FILE_DOWNLOAD_SERVER
+    filename = os.path.basename(file_obj.file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if server == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = '{}{}'.format(
+            settings.ALDRYN_BOOTSTRAP3_FILE_DOWNLOAD_NGINX_LOCATION,
+            urlquote(file_obj.file.name),
+        )
+        return response
+
+    path = get_local_path(file_obj)
+    if path is None:
+        return HttpResponseRedirect(file_obj.url)
+
+    if server == 'xsendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+        return response
+
+    size = os.path.getsize(path)
+    byte_range = None
+    if if_range_matches(request.META.get('HTTP_IF_RANGE', ''), file_obj):
+        byte_range = parse_range(request.META.get('HTTP_RANGE', ''), size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */{}'.format(size)
+        return response
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Content-Length'] = str(size)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            iter_range(open(path, 'rb'), start, length),
+            status=206,
+            content_type=content_type,
+        )
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, size)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def get_etag(file_obj):
+    # filer stores the sha1 of the file contents on upload
+    if file_obj.sha1:
+        return file_obj.sha1
+    return '{}-{}'.format(file_obj.pk, file_obj.size)
+
+
+class DownloadCounter(object):
+    """
+    Counts downloads per filer file in memory and writes them to the
+    database in one transaction once enough downloads or time accumulated.
+    """
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self.lock = threading.Lock()
+        self.last_flush = time.time()
+
+    def add(self, file_id):
+        with self.lock:
+            self.counts[file_id] += 1
+            pending = sum(self.counts.values())
+            due = (
+                pending >= settings.ALDRYN_BOOTSTRAP3_FILE_DOWNLOAD_FLUSH_COUNT or
+                time.time() - self.last_flush >= settings.ALDRYN_BOOTSTRAP3_FILE_DOWNLOAD_FLUSH_INTERVAL
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        from .models import FileDownloadCount
+
+        with self.lock:
+            counts, self.counts = self.counts, collections.Counter()
+            self.last_flush = time.time()
+        if not counts:
+            return
+        with transaction.atomic():
+            for file_id, count in sorted(counts.items()):
+                queryset = FileDownloadCount.objects.filter(file_id=file_id)
+                if queryset.update(count=F('count') + count):
+                    continue
+                # another process may create the row at the same time
+                obj, created = FileDownloadCount.objects.get_or_create(
+                    file_id=file_id,
+                    defaults={'count': count},
+                )
+                if not created:
+                    queryset.update(count=F('count') + count)
+
+
+download_counter = DownloadCounter()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        download_counter.flush()
+    except Exception:
+        # the database may already be gone when the process exits
+        pass
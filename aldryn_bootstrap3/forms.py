@@ -4,8 +4,6 @@ from __future__ import unicode_literals, absolute_import
 import django.core.exceptions
 import django.forms
 import django.forms.models
-import django.template
-import django.template.loader
 
 from django.forms.widgets import Media, TextInput, Textarea
 from django.utils.translation import ugettext_lazy as _
@@ -13,9 +11,12 @@ from django.utils.translation import ugettext_lazy as _
 import cms.forms.fields
 import cms.models
 
+from filer import settings as filer_settings
+from filer.models import Folder, Image
+
 from djangocms_attributes_field.widgets import AttributesWidget
 
-from . import models, constants
+from . import models, constants, cache, highlighting, styles
 
 
 class RowPluginBaseForm(django.forms.models.ModelForm):
@@ -136,6 +137,18 @@ class Bootstrap3CodePluginForm(django.forms.models.ModelForm):
             'code': Textarea(attrs={'class': 'js-ckeditor-use-selected-text'}),
         }
 
+    def clean_code_language(self):
+        language = self.cleaned_data.get('code_language', '').strip().lower()
+        if language and not highlighting.is_available():
+            raise django.forms.ValidationError(
+                _('Syntax highlighting requires Pygments to be installed.')
+            )
+        if language and highlighting.get_lexer(language) is None:
+            raise django.forms.ValidationError(
+                _('Unknown language "{language}".').format(language=language)
+            )
+        return language
+
 
 class LinkForm(django.forms.models.ModelForm):
     link_page = cms.forms.fields.PageSelectFormField(
@@ -223,15 +236,15 @@ class CarouselPluginForm(django.forms.ModelForm):
 
     def clean_style(self):
         style = self.cleaned_data.get('style')
-        template = 'aldryn_bootstrap3/plugins/carousel/{}/carousel.html'.format(
-            style
-        )
-        # Check if template for style exists:
-        try:
-            django.template.loader.select_template([template])
-        except django.template.TemplateDoesNotExist:
+        # Check if the templates of the style exist and compile:
+        missing, errors = styles.registry.check(style)
+        if missing:
+            raise django.forms.ValidationError(
+                _('Not a valid style (template {path} does not exist)').format(path=missing[0])
+            )
+        if errors:
             raise django.forms.ValidationError(
-                _('Not a valid style (template {path} does not exist)').format(path=template)
+                _('Not a valid style (template {path} failed to compile)').format(path=sorted(errors)[0])
             )
         return style
 
@@ -245,3 +258,52 @@ class CarouselSlidePluginForm(django.forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super(CarouselSlidePluginForm, self).__init__(*args, **kwargs)
         self.fields['link_attributes'].widget = AttributesWidget()
+
+
+class CarouselBulkUploadForm(django.forms.Form):
+    """
+    Validates a bulk slide upload: either a list of image files sent as
+    ``files`` or the id of a filer folder whose images become slides.
+    """
+    folder = django.forms.ModelChoiceField(
+        queryset=Folder.objects.all(),
+        required=False,
+    )
+
+    def clean(self):
+        data = super(CarouselBulkUploadForm, self).clean()
+        self.uploads = self.files.getlist('files') if self.files else []
+        if not self.uploads and not data.get('folder'):
+            raise django.forms.ValidationError(
+                _('Please upload at least one image or choose a folder.')
+            )
+        invalid = [
+            upload.name for upload in self.uploads
+            if not Image.matches_file_type(upload.name, upload, None)
+        ]
+        if invalid:
+            raise django.forms.ValidationError(
+                _('Not a valid image: {names}').format(names=', '.join(invalid))
+            )
+        return data
+
+    def get_images(self, owner=None):
+        """
+        Returns the filer images to create slides for. Uploaded files are
+        saved to filer (into the chosen folder, if any) first.
+        """
+        folder = self.cleaned_data.get('folder')
+        if not self.uploads:
+            return list(cache.get_folder_images_queryset(folder.pk))
+        images = []
+        for upload in self.uploads:
+            image = Image(
+                original_filename=upload.name,
+                owner=owner,
+                folder=folder,
+                is_public=filer_settings.FILER_IS_PUBLIC_DEFAULT,
+            )
+            image.file = upload
+            image.save()
+            images.append(image)
+        return images
@@ -0,0 +1,473 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import collections
+import hashlib
+import threading
+import time
+import uuid
+
+from django.core.cache import caches
+from django.template.loader import get_template
+from django.utils import six
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+from cms.utils.placeholder import restore_sekizai_context
+from sekizai.helpers import Watcher, get_varname
+
+from . import metrics
+from .conf import settings
+
+
+GENERATION_KEY = 'aldryn_bootstrap3:generation:{}:{}'
+FRAGMENT_KEY = 'aldryn_bootstrap3:fragment:{}:{}:{}'
+LOCK_KEY = '{}:lock'
+# layout of the cached fragments, entries of other versions are ignored
+FRAGMENT_FORMAT = 1
+LOCK_POLL_INTERVAL = 0.05
+
+PLACEHOLDER = 'placeholder'
+FILE = 'file'
+FOLDER = 'folder'
+
+
+class LocalCache(object):
+    """
+    A small in-process cache with a short timeout in front of the shared
+    cache, entries are evicted in insertion order once it is full.
+    """
+
+    def __init__(self):
+        self.data = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.time()
+        values = {}
+        with self.lock:
+            for key in keys:
+                entry = self.data.get(key)
+                if entry is not None and entry[0] > now:
+                    values[key] = entry[1]
+        return values
+
+    def set_many(self, data):
+        timeout = settings.ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_LOCAL_TIMEOUT
+        if not timeout:
+            return
+        expires = time.time() + timeout
+        max_entries = settings.ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_LOCAL_MAX_ENTRIES
+        with self.lock:
+            for key, value in data.items():
+                self.data.pop(key, None)
+                self.data[key] = (expires, value)
+            while len(self.data) > max_entries:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+local_cache = LocalCache()
+
+
+def get_shared_cache():
+    return caches[settings.ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE]
+
+
+def get_initial_generation():
+    # counters evicted from the shared cache start over from the current
+    # time, so fragments cached before are never picked up again
+    return int(time.time() * 1000)
+
+
+def get_generations(objects):
+    """
+    Returns the generation counters of ``objects``, a list of
+    ``(kind, id)`` tuples, in the same order.
+    """
+    keys = [GENERATION_KEY.format(kind, object_id) for kind, object_id in objects]
+    generations = local_cache.get_many(keys)
+    missing = [key for key in keys if key not in generations]
+    if missing:
+        shared_cache = get_shared_cache()
+        fetched = shared_cache.get_many(missing)
+        for key in missing:
+            if key not in fetched:
+                shared_cache.add(key, get_initial_generation(), None)
+                fetched[key] = shared_cache.get(key, 0)
+        local_cache.set_many(fetched)
+        generations.update(fetched)
+    return [generations[key] for key in keys]
+
+
+def bump_generation(kind, object_id):
+    """
+    Invalidates all fragments depending on an object. Other processes see
+    the new generation after ``ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_LOCAL_TIMEOUT``
+    at the latest.
+    """
+    key = GENERATION_KEY.format(kind, object_id)
+    shared_cache = get_shared_cache()
+    try:
+        shared_cache.incr(key)
+    except ValueError:
+        shared_cache.add(key, get_initial_generation(), None)
+    local_cache.delete(key)
+
+
+def get_placeholder_file_usage(placeholder):
+    """
+    Returns the ``(plugin path, file id, folder id)`` rows of the usage index
+    for ``placeholder``, read once per placeholder and render.
+    """
+    from .models import FileUsage
+
+    usage = getattr(placeholder, '_aldryn_bootstrap3_file_usage', None)
+    if usage is None:
+        usage = list(
+            FileUsage.objects
+            .filter(placeholder_id=placeholder.pk)
+            .values_list('plugin__path', 'file_id', 'folder_id')
+        )
+        placeholder._aldryn_bootstrap3_file_usage = usage
+    return usage
+
+
+def get_file_dependencies(placeholder, instance):
+    """
+    Returns the ids of the filer files and folders shown by ``instance`` and
+    its descendants.
+    """
+    file_ids = set()
+    folder_ids = set()
+    for path, file_id, folder_id in get_placeholder_file_usage(placeholder):
+        if path.startswith(instance.path):
+            if file_id:
+                file_ids.add(file_id)
+            if folder_id:
+                folder_ids.add(folder_id)
+    return sorted(file_ids), sorted(folder_ids)
+
+
+def is_cacheable(context, plugin, placeholder):
+    if not plugin.cache or not placeholder or not placeholder.pk:
+        return False
+    request = context.get('request')
+    if request is None:
+        return False
+    toolbar = getattr(request, 'toolbar', None)
+    # editors see markup for the frontend editing
+    return not (toolbar and (toolbar.show_toolbar or toolbar.edit_mode))
+
+
+def get_vary_headers(request, instance, placeholder):
+    """
+    Returns the sorted names of the request headers the output of
+    ``instance`` and its descendants varies on, ``None`` if one of them
+    must not be cached. The result is kept on ``instance`` for the render.
+    """
+    try:
+        return instance._aldryn_bootstrap3_vary_headers
+    except AttributeError:
+        pass
+    headers = set()
+    try:
+        plugin = instance.get_plugin_class_instance()
+    except KeyError:
+        headers = None
+    else:
+        children = getattr(instance, 'child_plugin_instances', None)
+        if not plugin.cache or (instance.numchild and children is None):
+            # the children of plugins rendered on their own are not loaded
+            headers = None
+        else:
+            # get_vary_cache_on() was added in django CMS 3.4
+            get_vary_cache_on = getattr(plugin, 'get_vary_cache_on', None)
+            vary_on = get_vary_cache_on and get_vary_cache_on(request, instance, placeholder)
+            if isinstance(vary_on, six.string_types):
+                vary_on = [vary_on]
+            headers.update(header.lower() for header in vary_on or [])
+            for child in children or []:
+                child_headers = get_vary_headers(request, child, placeholder)
+                if child_headers is None:
+                    headers = None
+                    break
+                headers.update(child_headers)
+    if headers is not None:
+        headers = sorted(headers)
+    instance._aldryn_bootstrap3_vary_headers = headers
+    return headers
+
+
+def get_vary_values(request, headers):
+    return [
+        (header, request.META.get('HTTP_' + header.upper().replace('-', '_'), ''))
+        for header in headers
+    ]
+
+
+def get_fragment_key(instance, placeholder, vary=()):
+    """
+    Returns the key the output of ``instance`` is cached under, ``vary`` are
+    the ``(header, value)`` pairs of the request it varies on.
+    """
+    file_ids, folder_ids = get_file_dependencies(placeholder, instance)
+    objects = [(PLACEHOLDER, placeholder.pk)]
+    objects.extend((FILE, file_id) for file_id in file_ids)
+    objects.extend((FOLDER, folder_id) for folder_id in folder_ids)
+    generations = ','.join(str(generation) for generation in get_generations(objects))
+    if vary:
+        generations += ';' + ','.join('{}={}'.format(header, value) for header, value in vary)
+    digest = hashlib.sha1(generations.encode('utf-8')).hexdigest()
+    return FRAGMENT_KEY.format(instance.pk, get_language(), digest)
+
+
+def pack_fragment(content, sekizai_changes, expires):
+    """
+    Returns the compact tuple a fragment is cached as: plain text instead of
+    ``SafeText`` and only the sekizai blocks the plugin added to.
+    """
+    sekizai_changes = tuple(
+        (name, tuple(values))
+        for name, values in sorted(sekizai_changes.items()) if values
+    )
+    return FRAGMENT_FORMAT, six.text_type(content), sekizai_changes, expires
+
+
+def unpack_fragment(value):
+    """
+    Returns ``(content, sekizai_changes, expires)`` of a cached fragment, or
+    ``None`` if it was stored in another format.
+    """
+    if not isinstance(value, tuple) or not value or value[0] != FRAGMENT_FORMAT:
+        return None
+    content, sekizai_changes, expires = value[1:]
+    return mark_safe(content), dict(sekizai_changes), expires
+
+
+def get_fragment(key):
+    value = local_cache.get_many([key]).get(key)
+    if value is None:
+        value = get_shared_cache().get(key)
+        if value is not None:
+            local_cache.set_many({key: value})
+    return unpack_fragment(value)
+
+
+def set_fragment(key, content, sekizai_changes):
+    """
+    Stores a fragment. It is fresh for
+    ``ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_TIMEOUT`` seconds and served stale
+    for ``ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_STALE_TIMEOUT`` more seconds
+    while it is refreshed.
+    """
+    timeout = settings.ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_TIMEOUT
+    value = pack_fragment(content, sekizai_changes, time.time() + timeout)
+    get_shared_cache().set(
+        key, value, timeout + settings.ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_STALE_TIMEOUT,
+    )
+    local_cache.set_many({key: value})
+
+
+def acquire_lock(key):
+    """
+    Returns the token the lock of ``key`` is held with, ``None`` if another
+    process holds it.
+    """
+    token = uuid.uuid4().hex
+    if get_shared_cache().add(
+        LOCK_KEY.format(key), token, settings.ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_LOCK_TIMEOUT,
+    ):
+        return token
+    return None
+
+
+def release_lock(key, token):
+    """
+    Releases the lock of ``key`` unless it expired and another process took
+    it since.
+    """
+    shared_cache = get_shared_cache()
+    lock_key = LOCK_KEY.format(key)
+    if shared_cache.get(lock_key) == token:
+        shared_cache.delete(lock_key)
+
+
+def wait_for_fragment(key):
+    """
+    Waits for the process holding the lock of ``key`` to store the
+    fragment, for ``ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_LOCK_WAIT`` seconds at
+    most.
+    """
+    shared_cache = get_shared_cache()
+    started = time.time()
+    deadline = started + settings.ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_LOCK_WAIT
+    value = None
+    while time.time() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = shared_cache.get(key)
+        if value is not None or shared_cache.get(LOCK_KEY.format(key)) is None:
+            break
+    metrics.increment('fragment_cache_lock_waits')
+    metrics.increment('fragment_cache_lock_wait_seconds', time.time() - started)
+    return unpack_fragment(value)
+
+
+class StoredFragment(object):
+    """
+    Stands in for the template of a plugin whose output is served from the
+    cache without rendering.
+    """
+
+    def __init__(self, content, sekizai_changes):
+        self.content = content
+        self.sekizai_changes = sekizai_changes
+
+    def render(self, context=None, request=None):
+        if self.sekizai_changes and get_varname() in context:
+            restore_sekizai_context(context, self.sekizai_changes)
+        return mark_safe(self.content)
+
+
+class CachedTemplate(object):
+    """
+    Wraps a plugin template, its output and the sekizai data it adds are
+    cached under ``key``.
+
+    Only one process renders a missing or stale fragment at a time, the
+    lock is held in the shared cache. Meanwhile the others serve the stale
+    fragment or wait for the new one.
+    """
+
+    def __init__(self, template, key):
+        if isinstance(template, six.string_types):
+            template = get_template(template)
+        self.template = template
+        self.key = key
+
+    def render(self, context=None, request=None):
+        value = get_fragment(self.key)
+        if value is not None:
+            content, sekizai_changes, expires = value
+            if expires > time.time():
+                metrics.increment('fragment_cache_hits')
+                return self.restore(context, content, sekizai_changes)
+            token = acquire_lock(self.key)
+            if token is None:
+                metrics.increment('fragment_cache_stale_serves')
+                return self.restore(context, content, sekizai_changes)
+            return self.refresh(context, request, token)
+
+        metrics.increment('fragment_cache_misses')
+        token = acquire_lock(self.key)
+        if token is not None:
+            return self.refresh(context, request, token)
+        value = wait_for_fragment(self.key)
+        if value is not None:
+            content, sekizai_changes, expires = value
+            return self.restore(context, content, sekizai_changes)
+        # the other process takes too long, render it here as well
+        return self.render_content(context, request)[0]
+
+    def restore(self, context, content, sekizai_changes):
+        if sekizai_changes:
+            restore_sekizai_context(context, sekizai_changes)
+        return content
+
+    def render_content(self, context, request):
+        if get_varname() in context:
+            watcher = Watcher(context)
+        else:
+            watcher = None
+        content = self.template.render(context, request)
+        return content, watcher.get_changes() if watcher else {}
+
+    def refresh(self, context, request, token):
+        # called with the lock held
+        try:
+            content, sekizai_changes = self.render_content(context, request)
+            set_fragment(self.key, content, sekizai_changes)
+        finally:
+            release_lock(self.key, token)
+        metrics.increment('fragment_cache_refreshes')
+        return content
+
+
+class FragmentCacheMixin(object):
+    """
+    Caches the rendered output of a plugin, including its children, until
+    its placeholder or one of the filer files it shows changes, see
+    ``bump_generation``. Plugins whose descendants are not cacheable are
+    rendered every time, the output varies on the headers named by the
+    ``get_vary_cache_on()`` of the plugin and its descendants.
+
+    Top-level plugins are served from the HTML stored when their page was
+    published if ``ALDRYN_BOOTSTRAP3_PRERENDER`` is enabled.
+
+    ``render()`` is skipped for fresh fragments, so its queries only run on
+    misses. Like for the render timing it is set on the plugin instance.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(FragmentCacheMixin, self).__init__(*args, **kwargs)
+        self.render = self.render_unless_cached
+
+    def render_unless_cached(self, context, instance, placeholder):
+        template, key = self.get_fragment(context, instance, instance.placeholder)
+        self._fragment = instance, template, key
+        if template is None:
+            return type(self).render(self, context, instance, placeholder)
+        context['instance'] = instance
+        context['placeholder'] = placeholder
+        return context
+
+    def get_fragment(self, context, instance, placeholder):
+        """
+        Returns ``(template, key)``: the template standing in for the plugin
+        template if the output of ``instance`` is served without rendering,
+        and the key to cache it under otherwise.
+        """
+        if not is_cacheable(context, self, placeholder):
+            return None, None
+        request = context['request']
+        headers = get_vary_headers(request, instance, placeholder)
+        if headers is None:
+            return None, None
+        if settings.ALDRYN_BOOTSTRAP3_PRERENDER and instance.parent_id is None and not headers:
+            from .prerender import get_stored_template
+
+            stored_template = get_stored_template(instance, placeholder)
+            if stored_template is not None:
+                return stored_template, None
+        if not settings.ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_TIMEOUT:
+            return None, None
+        key = get_fragment_key(instance, placeholder, get_vary_values(request, headers))
+        value = get_fragment(key)
+        if value is not None:
+            content, sekizai_changes, expires = value
+            if expires > time.time():
+                metrics.increment('fragment_cache_hits')
+                return StoredFragment(content, sekizai_changes), key
+        return None, key
+
+    def _get_render_template(self, context, instance, placeholder):
+        fragment = getattr(self, '_fragment', None)
+        if fragment is not None and fragment[0] is instance:
+            template, key = fragment[1:]
+        else:
+            template, key = self.get_fragment(context, instance, placeholder)
+        if template is not None:
+            return template
+        template = super(FragmentCacheMixin, self)._get_render_template(
+            context, instance, placeholder,
+        )
+        if key is None:
+            return template
+        return CachedTemplate(template, key)
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import collections
+import hashlib
+import json
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.encoding import force_text
+
+from cms.models import CMSPlugin
+from cms.plugin_pool import plugin_pool
+
+
+# tree and bookkeeping fields, they do not change what a plugin renders
+EXCLUDED_FIELDS = (
+    'id',
+    'path',
+    'depth',
+    'numchild',
+    'position',
+    'parent',
+    'placeholder',
+    'language',
+    'creation_date',
+    'changed_date',
+)
+
+
+# the order the cms renders siblings in
+PLUGIN_ORDERING = ('position', 'path')
+
+
+def get_sort_key(plugin):
+    return plugin.position, plugin.path
+
+
+def get_content_hash(instance):
+    """
+    Returns a hash of the own content of the plugin model ``instance``,
+    without its children.
+    """
+    values = [instance.plugin_type]
+    for field in instance._meta.concrete_fields:
+        if field.primary_key or field.name in EXCLUDED_FIELDS:
+            continue
+        values.append([field.attname, field.value_from_object(instance)])
+    data = json.dumps(values, sort_keys=True, default=force_text)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def get_subtree_hash(content_hash, child_hashes):
+    data = '{}:{}'.format(content_hash, ','.join(child_hashes))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def get_ancestor_paths(path):
+    steplen = CMSPlugin.steplen
+    return [path[:end] for end in range(steplen, len(path) + 1, steplen)]
+
+
+def downcast(plugins):
+    """
+    Returns a dict mapping plugin ids to plugin model instances, with one
+    query per plugin type.
+    """
+    pks_by_type = collections.defaultdict(list)
+    for plugin in plugins:
+        pks_by_type[plugin.plugin_type].append(plugin.pk)
+    instances = {}
+    for plugin_type, pks in pks_by_type.items():
+        try:
+            model = plugin_pool.get_plugin(plugin_type).model
+        except KeyError:
+            # plugins of uninstalled types are hashed by their type only
+            continue
+        instances.update(model.objects.in_bulk(pks))
+    return instances
+
+
+def save_hashes(hashes, extra_query=None):
+    """
+    Replaces the hash rows of the plugins in ``hashes``, a dict mapping
+    plugins to ``(content_hash, subtree_hash)``, and the rows matching
+    ``extra_query``.
+    """
+    from .models import PluginHash
+
+    plugin_ids = [plugin.pk for plugin in hashes]
+    query = Q(plugin_id__in=plugin_ids)
+    if extra_query is not None:
+        query |= extra_query
+    try:
+        with transaction.atomic():
+            PluginHash.objects.filter(query).delete()
+            PluginHash.objects.bulk_create([
+                PluginHash(
+                    plugin_id=plugin.pk,
+                    placeholder_id=plugin.placeholder_id,
+                    content_hash=content_hash,
+                    subtree_hash=subtree_hash,
+                ) for plugin, (content_hash, subtree_hash) in hashes.items()
+            ])
+    except IntegrityError:
+        # a concurrent save in the same placeholder inserted some of the
+        # rows after they were deleted, write them one by one instead
+        with transaction.atomic():
+            if extra_query is not None:
+                PluginHash.objects.filter(extra_query).exclude(plugin_id__in=plugin_ids).delete()
+            for plugin, (content_hash, subtree_hash) in hashes.items():
+                PluginHash.objects.update_or_create(plugin_id=plugin.pk, defaults={
+                    'placeholder_id': plugin.placeholder_id,
+                    'content_hash': content_hash,
+                    'subtree_hash': subtree_hash,
+                })
+
+
+def rebuild_placeholder_hashes(placeholder_id):
+    """
+    Computes the hashes of all plugins in a placeholder from scratch.
+
+    Used after plugins were moved, which the cms does with queryset updates
+    instead of saving them.
+    """
+    plugins = list(
+        CMSPlugin.objects
+        .filter(placeholder_id=placeholder_id)
+        .order_by('path')
+    )
+    instances = downcast(plugins)
+    children = collections.defaultdict(list)
+    for plugin in sorted(plugins, key=get_sort_key):
+        children[plugin.parent_id].append(plugin)
+    hashes = {}
+    subtree_hashes = {}
+    # descendants come after their ancestors in path order
+    for plugin in reversed(plugins):
+        content_hash = get_content_hash(instances.get(plugin.pk, plugin))
+        subtree_hash = get_subtree_hash(content_hash, [
+            subtree_hashes[child.pk] for child in children[plugin.pk]
+        ])
+        subtree_hashes[plugin.pk] = subtree_hash
+        hashes[plugin] = (content_hash, subtree_hash)
+    save_hashes(hashes, Q(placeholder_id=placeholder_id))
+
+
+def update_hashes(plugin):
+    """
+    Updates the hashes of ``plugin`` and of all its ancestors after it was
+    saved or one of its children changed.
+
+    The content hash of ``plugin`` is recomputed if it is a plugin model
+    instance, for a base ``CMSPlugin`` the stored one is kept.
+    """
+    from .models import PluginHash
+
+    chain = list(
+        CMSPlugin.objects
+        .filter(path__in=get_ancestor_paths(plugin.path))
+        .order_by('-depth')
+    )
+    if not chain or chain[0].pk != plugin.pk:
+        return
+    chain_ids = [node.pk for node in chain]
+    children = collections.defaultdict(list)
+    child_ids = []
+    for pk, parent_id in (
+        CMSPlugin.objects
+        .filter(parent_id__in=chain_ids)
+        .order_by(*PLUGIN_ORDERING)
+        .values_list('pk', 'parent_id')
+    ):
+        children[parent_id].append(pk)
+        child_ids.append(pk)
+    rows = PluginHash.objects.in_bulk(chain_ids + child_ids)
+
+    content_hashes = {node.pk: rows[node.pk].content_hash for node in chain if node.pk in rows}
+    if plugin.__class__ is not CMSPlugin:
+        content_hashes[plugin.pk] = get_content_hash(plugin)
+    # a new plugin has no row yet, its subtree hash is computed below
+    missing = set(child_ids) - set(rows) - {plugin.pk}
+    if len(content_hashes) < len(chain) or missing:
+        # plugins saved before hashes were maintained
+        rebuild_placeholder_hashes(plugin.placeholder_id)
+        return
+
+    subtree_hashes = {pk: row.subtree_hash for pk, row in rows.items()}
+    hashes = {}
+    for node in chain:
+        subtree_hash = get_subtree_hash(content_hashes[node.pk], [
+            subtree_hashes[pk] for pk in children[node.pk]
+        ])
+        subtree_hashes[node.pk] = subtree_hash
+        hashes[node] = (content_hashes[node.pk], subtree_hash)
+    save_hashes(hashes)
+
+
+def get_placeholder_hashes(placeholder, language=None):
+    """
+    Returns a dict mapping the ids of the plugins in ``placeholder`` to
+    their subtree hashes, with a single query.
+    """
+    from .models import PluginHash
+
+    queryset = PluginHash.objects.filter(placeholder=placeholder)
+    if language:
+        queryset = queryset.filter(plugin__language=language)
+    return dict(queryset.values_list('plugin_id', 'subtree_hash'))
+
+
+def get_placeholder_hash(placeholder, language):
+    """
+    Returns a hash of the content of ``placeholder`` in ``language``, derived
+    from the subtree hashes of its root plugins with a single query.
+    """
+    from .models import PluginHash
+
+    subtree_hashes = (
+        PluginHash.objects
+        .filter(
+            placeholder=placeholder,
+            plugin__language=language,
+            plugin__parent__isnull=True,
+        )
+        .order_by(*['plugin__{}'.format(name) for name in PLUGIN_ORDERING])
+        .values_list('subtree_hash', flat=True)
+    )
+    return get_subtree_hash('', list(subtree_hashes))
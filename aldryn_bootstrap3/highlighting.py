@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import hashlib
+
+try:
+    # the lexers and formatters are imported on first use, they pull in most
+    # of pygments
+    import pygments
+except ImportError:
+    pygments = None
+
+from django.utils.encoding import force_bytes
+
+from .conf import settings
+
+
+def is_available():
+    return pygments is not None
+
+
+def get_style():
+    """
+    The Pygments style used for inline styles, ``None`` if the highlighted
+    markup should only carry CSS classes.
+    """
+    return settings.ALDRYN_BOOTSTRAP3_CODE_HIGHLIGHT_STYLE
+
+
+def get_lexer(language):
+    if not language or pygments is None:
+        return None
+    from pygments.lexers import get_lexer_by_name
+    from pygments.util import ClassNotFound
+    try:
+        return get_lexer_by_name(language)
+    except ClassNotFound:
+        return None
+
+
+def get_hash(code, language, style=None):
+    """
+    Fingerprint of everything the highlighted output depends on.
+    """
+    return hashlib.sha1(force_bytes('\0'.join([
+        pygments.__version__ if pygments else '',
+        language or '',
+        style or '',
+        code or '',
+    ]))).hexdigest()
+
+
+def highlight(code, language, style=None):
+    """
+    Returns ``code`` as highlighted HTML (without a wrapping element) or an
+    empty string if it can not be highlighted.
+    """
+    lexer = get_lexer(language)
+    if lexer is None or not code:
+        return ''
+    from pygments.formatters import HtmlFormatter
+    if style:
+        formatter = HtmlFormatter(nowrap=True, noclasses=True, style=style)
+    else:
+        formatter = HtmlFormatter(nowrap=True)
+    return pygments.highlight(code, lexer, formatter)
@@ -0,0 +1,432 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import collections
+import json
+import logging
+import threading
+import time
+
+from django.core.signals import request_finished
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.template.loader import get_template
+
+from cms.models import CMSPlugin
+from easy_thumbnails.signals import thumbnail_created
+
+from . import hashes, metrics
+from .conf import settings
+
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger(__name__ + '.slow')
+
+_local = threading.local()
+
+
+# The render of one plugin: the time spent, queries made and bytes output by
+# the plugin itself, without its children.
+RenderRecord = collections.namedtuple(
+    'RenderRecord', ['plugin_type', 'plugin_id', 'seconds', 'queries', 'size'],
+)
+
+
+class CountingCursor(object):
+    """
+    Records the SQL executed through ``cursor`` for a ``QueryCollector``.
+    """
+
+    def __init__(self, cursor, collector):
+        self.cursor = cursor
+        self.collector = collector
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return self.cursor.__exit__(*exc_info)
+
+    def execute(self, sql, params=None):
+        self.collector.record(sql)
+        return self.cursor.execute(sql, params)
+
+    def executemany(self, sql, param_list):
+        self.collector.record(sql)
+        return self.cursor.executemany(sql, param_list)
+
+
+class QueryCollector(object):
+    """
+    Records the SQL of the queries made through the default connection of
+    this thread into ``queries`` while it is a list, without the debug
+    cursor and the bounded ``queries_log`` it fills. Uses
+    ``connection.execute_wrapper()`` on Django 2.0+ and wraps the cursors
+    before.
+
+    One collector is installed per thread and request, see
+    ``get_collector``, and shared by all collections of the request.
+    """
+
+    def __init__(self):
+        self.queries = None
+        self.connection = None
+
+    def record(self, sql):
+        if self.queries is not None:
+            self.queries.append(sql)
+
+    def __call__(self, execute, sql, params, many, context):
+        self.record(sql)
+        return execute(sql, params, many, context)
+
+    def install(self):
+        # the connection of this thread, not the proxy
+        self.connection = connections[DEFAULT_DB_ALIAS]
+        if hasattr(self.connection, 'execute_wrappers'):
+            self.connection.execute_wrappers.append(self)
+            return
+        cursor = self.connection.cursor
+
+        def counting_cursor(*args, **kwargs):
+            return CountingCursor(cursor(*args, **kwargs), self)
+
+        self.connection.cursor = counting_cursor
+
+    def uninstall(self):
+        if self.connection is None:
+            return
+        if hasattr(self.connection, 'execute_wrappers'):
+            if self in self.connection.execute_wrappers:
+                self.connection.execute_wrappers.remove(self)
+        else:
+            vars(self.connection).pop('cursor', None)
+        self.connection = None
+
+
+def get_collector():
+    """
+    Returns the ``QueryCollector`` of this thread. It is installed on first
+    use and stays installed until the request finishes, the renders timed
+    one top-level plugin at a time share it.
+    """
+    collector = getattr(_local, 'collector', None)
+    if collector is None or collector.connection is not connections[DEFAULT_DB_ALIAS]:
+        uninstall_collector()
+        collector = _local.collector = QueryCollector()
+        collector.install()
+        request_finished.connect(uninstall_collector, dispatch_uid='aldryn_bootstrap3_query_collector')
+    return collector
+
+
+def uninstall_collector(*args, **kwargs):
+    collector = getattr(_local, 'collector', None)
+    _local.collector = None
+    if collector is not None:
+        collector.uninstall()
+
+
+class Frame(object):
+    """
+    A plugin being rendered.
+    """
+    __slots__ = (
+        'instance', 'started', 'query_start',
+        'child_seconds', 'child_queries', 'child_size', 'child_ranges', 'thumbnails',
+    )
+
+    def __init__(self, instance, query_start):
+        self.instance = instance
+        self.started = time.time()
+        self.query_start = query_start
+        self.child_seconds = 0.0
+        self.child_queries = 0
+        self.child_size = 0
+        # query ranges of the children
+        self.child_ranges = []
+        self.thumbnails = 0
+
+    def get_own_queries(self, queries, query_end):
+        indexes = set(range(self.query_start, query_end))
+        for start, end in self.child_ranges:
+            indexes.difference_update(range(start, end))
+        return [queries[index] for index in sorted(indexes)]
+
+
+class RenderTimings(object):
+    """
+    Collects the plugin renders of one request, or of one top-level plugin if
+    it is ``temporary``.
+    """
+
+    def __init__(self, temporary=False, count_queries=True):
+        self.records = []
+        self.stack = []
+        self.temporary = temporary
+        self.count_queries = count_queries
+        # filled by the QueryCollector of the thread while collecting
+        self.queries = []
+
+    def start(self, instance):
+        self.stack.append(Frame(instance, len(self.queries)))
+
+    def stop(self, instance, size):
+        try:
+            self.record(instance, size)
+        finally:
+            self.finish()
+
+    def record(self, instance, size):
+        frame = self.stack.pop()
+        seconds = time.time() - frame.started
+        query_end = len(self.queries)
+        queries = query_end - frame.query_start
+        if self.stack:
+            parent = self.stack[-1]
+            parent.child_seconds += seconds
+            parent.child_queries += queries
+            parent.child_size += size
+            parent.child_ranges.append((frame.query_start, query_end))
+        record = RenderRecord(
+            instance.plugin_type,
+            instance.pk,
+            seconds - frame.child_seconds,
+            queries - frame.child_queries,
+            size - frame.child_size,
+        )
+        if not self.temporary:
+            self.records.append(record)
+        if settings.ALDRYN_BOOTSTRAP3_METRICS:
+            metrics.observe('plugin_render_seconds', record.seconds, {'plugin_type': record.plugin_type})
+        threshold = settings.ALDRYN_BOOTSTRAP3_SLOW_RENDER_THRESHOLD
+        if threshold and record.seconds * 1000 >= threshold:
+            log_slow_render(frame, record, seconds, frame.get_own_queries(self.queries, query_end))
+
+    def abort(self):
+        # the plugin failed to render, its time is added to its parent
+        self.stack.pop()
+        self.finish()
+
+    def finish(self):
+        if self.temporary and not self.stack:
+            stop_collecting()
+
+    def count_thumbnail(self):
+        if self.stack:
+            self.stack[-1].thumbnails += 1
+
+    def get_totals(self):
+        """
+        Returns ``(plugin_type, count, seconds, queries, size)`` tuples,
+        slowest plugin types first.
+        """
+        totals = {}
+        for record in self.records:
+            count, seconds, queries, size = totals.get(record.plugin_type, (0, 0.0, 0, 0))
+            totals[record.plugin_type] = (
+                count + 1,
+                seconds + record.seconds,
+                queries + record.queries,
+                size + record.size,
+            )
+        rows = [(plugin_type,) + values for plugin_type, values in totals.items()]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def get_server_timing(self):
+        """
+        Returns the value of a ``Server-Timing`` header with one metric per
+        plugin type.
+        """
+        metrics = []
+        for plugin_type, count, seconds, queries, size in self.get_totals():
+            metrics.append('{};dur={:.3f};desc="{} plugins - {} queries - {} bytes"'.format(
+                plugin_type, seconds * 1000, count, queries, size,
+            ))
+        return ', '.join(metrics)
+
+    def get_log_data(self):
+        return {
+            'types': [
+                {
+                    'plugin_type': plugin_type,
+                    'count': count,
+                    'ms': round(seconds * 1000, 3),
+                    'queries': queries,
+                    'bytes': size,
+                } for plugin_type, count, seconds, queries, size in self.get_totals()
+            ],
+            'plugins': [
+                {
+                    'plugin_type': record.plugin_type,
+                    'plugin_id': record.plugin_id,
+                    'ms': round(record.seconds * 1000, 3),
+                    'queries': record.queries,
+                    'bytes': record.size,
+                } for record in self.records
+            ],
+        }
+
+
+def start_collecting(temporary=False, count_queries=True):
+    """
+    Starts collecting the plugin renders in this thread. Queries are
+    counted by the ``QueryCollector`` of the thread until
+    ``stop_collecting``.
+    """
+    # connected on first use, nothing is counted before
+    thumbnail_created.connect(count_thumbnail, dispatch_uid='aldryn_bootstrap3_render_timings')
+    stop_collecting()
+    timings = RenderTimings(temporary, count_queries)
+    if count_queries:
+        get_collector().queries = timings.queries
+    _local.timings = timings
+    return timings
+
+
+def stop_collecting():
+    timings = getattr(_local, 'timings', None)
+    _local.timings = None
+    collector = getattr(_local, 'collector', None)
+    if collector is not None:
+        collector.queries = None
+    return timings
+
+
+def get_timings():
+    return getattr(_local, 'timings', None)
+
+
+def is_timing_enabled():
+    # renders are timed outside of RenderTimingMiddleware as well
+    return bool(
+        settings.ALDRYN_BOOTSTRAP3_SLOW_RENDER_THRESHOLD or
+        settings.ALDRYN_BOOTSTRAP3_METRICS
+    )
+
+
+def count_thumbnail(sender, **kwargs):
+    # easy_thumbnails generated a thumbnail while a plugin was rendered
+    timings = get_timings()
+    if timings is not None:
+        timings.count_thumbnail()
+
+
+def get_plugin_label(plugin_type, plugin_id):
+    name = plugin_type
+    if name.startswith('Bootstrap3') and name.endswith('CMSPlugin'):
+        name = name[len('Bootstrap3'):-len('CMSPlugin')]
+    return '{}#{}'.format(name, plugin_id)
+
+
+def log_slow_render(frame, record, total_seconds, queries):
+    instance = frame.instance
+    ancestors = (
+        CMSPlugin.objects
+        .filter(path__in=hashes.get_ancestor_paths(instance.path))
+        .order_by('depth')
+        .values_list('plugin_type', 'pk')
+    )
+    placeholder = instance.placeholder
+    page = placeholder.page if placeholder else None
+    data = {
+        'path': ' > '.join(get_plugin_label(*ancestor) for ancestor in ancestors),
+        'plugin_type': instance.plugin_type,
+        'plugin_id': instance.pk,
+        'placeholder': placeholder.slot if placeholder else None,
+        'page_id': page.pk if page else None,
+        'page': page.get_absolute_url(instance.language) if page else None,
+        'language': instance.language,
+        'ms': round(record.seconds * 1000, 3),
+        'total_ms': round(total_seconds * 1000, 3),
+        'queries': queries,
+        'inline_thumbnails': frame.thumbnails,
+    }
+    slow_logger.warning(
+        'slow plugin render %s: %.1f ms', data['path'], data['ms'],
+        extra={'slow_render': data},
+    )
+
+
+def log_timings(request, timings):
+    data = timings.get_log_data()
+    data['path'] = request.path
+    logger.info('plugin render timings %s', json.dumps(data), extra={'render_timings': data})
+
+
+class TimedTemplate(object):
+    """
+    Wraps the template of a plugin and ends its timing once rendered.
+    """
+
+    def __init__(self, template, instance, timings):
+        self.template = template
+        self.instance = instance
+        self.timings = timings
+
+    def render(self, context=None, request=None):
+        try:
+            content = self.template.render(context, request)
+        except Exception:
+            self.timings.abort()
+            raise
+        self.timings.stop(self.instance, len(content.encode('utf-8')))
+        return content
+
+
+class RenderTimingMixin(object):
+    """
+    Records the wall time, queries and output size of each plugin render in
+    requests handled by ``middleware.RenderTimingMiddleware``, logs renders
+    slower than ``ALDRYN_BOOTSTRAP3_SLOW_RENDER_THRESHOLD`` and observes
+    their duration if ``ALDRYN_BOOTSTRAP3_METRICS`` is enabled.
+
+    Most plugins override ``render()`` without calling ``super()``, so the
+    timed version is set on the plugin instance, which the cms creates for
+    each render. Nothing is wrapped while all of them are disabled.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(RenderTimingMixin, self).__init__(*args, **kwargs)
+        if get_timings() is not None or is_timing_enabled():
+            # the render of the mixins further down, e.g. the fragment cache
+            self.untimed_render = self.render
+            self.render = self.timed_render
+
+    def timed_render(self, context, instance, placeholder):
+        render = self.untimed_render
+        timings = get_timings()
+        if timings is None:
+            if not is_timing_enabled():
+                return render(context, instance, placeholder)
+            timings = start_collecting(
+                temporary=True,
+                count_queries=bool(settings.ALDRYN_BOOTSTRAP3_SLOW_RENDER_THRESHOLD),
+            )
+        timings.start(instance)
+        try:
+            return render(context, instance, placeholder)
+        except Exception:
+            timings.abort()
+            raise
+
+    def _get_render_template(self, context, instance, placeholder):
+        timings = get_timings()
+        if timings is None or not timings.stack or timings.stack[-1].instance is not instance:
+            return super(RenderTimingMixin, self)._get_render_template(
+                context, instance, placeholder,
+            )
+        try:
+            template = super(RenderTimingMixin, self)._get_render_template(
+                context, instance, placeholder,
+            )
+            if not hasattr(template, 'render'):
+                template = get_template(template)
+        except Exception:
+            timings.abort()
+            raise
+        return TimedTemplate(template, instance, timings)
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from django.utils.translation import get_language
+
+from cms.models import Page
+
+from . import cache, utils
+
+
+def resolve_links(instances, language=None):
+    """
+    Resolves the page and file urls of ``LinkMixin`` instances in bulk and
+    remembers them on the instances for ``get_link_url``.
+
+    Urls are taken from the shared url cache, pages and files missing from
+    it are fetched with a fixed number of queries for all ``instances``.
+    """
+    language = language or get_language()
+    instances = [
+        instance for instance in instances
+        if hasattr(instance, 'link_page_id') and
+        language not in instance.__dict__.get('_link_page_urls', {})
+    ]
+    if not instances:
+        return
+    page_urls = cache.get_page_urls(
+        [instance.link_page_id for instance in instances if instance.link_page_id],
+        language,
+    )
+    file_urls = cache.get_file_urls(
+        [instance.link_file_id for instance in instances if instance.link_file_id],
+    )
+    for instance in instances:
+        instance.__dict__.setdefault('_link_page_urls', {})[language] = (
+            page_urls.get(instance.link_page_id, '')
+        )
+        instance._link_file_url = file_urls.get(instance.link_file_id, '')
+
+
+class LinkQuerySetMixin(object):
+    """
+    Resolves the links of all fetched instances at once.
+    """
+
+    def _fetch_all(self):
+        fetched = self._result_cache is None
+        super(LinkQuerySetMixin, self)._fetch_all()
+        if fetched:
+            resolve_links(self._result_cache)
+
+    def iterator(self):
+        # the cms downcasts plugins with iterator()
+        instances = list(super(LinkQuerySetMixin, self).iterator())
+        resolve_links(instances)
+        return iter(instances)
+
+
+_queryset_classes = {}
+
+
+def with_resolved_links(queryset):
+    """
+    Returns a copy of ``queryset`` resolving the links of its instances in
+    bulk, see ``resolve_links``.
+    """
+    base = queryset.__class__
+    if base not in _queryset_classes:
+        name = str('Link{}'.format(base.__name__))
+        _queryset_classes[base] = type(name, (LinkQuerySetMixin, base), {})
+    return _queryset_classes[base](
+        model=queryset.model,
+        query=queryset.query.clone(),
+        using=queryset._db,
+        hints=queryset._hints,
+    )
+
+
+def get_page_tree_ids(page):
+    """
+    Returns the ids of ``page`` and its descendants, draft and public, whose
+    urls change with the url of ``page``.
+    """
+    rows = (
+        Page.objects
+        .filter(path__startswith=page.path)
+        .values_list('pk', 'publisher_public_id')
+    )
+    return {pk for row in rows for pk in row if pk}
+
+
+def get_page_link(instance):
+    """
+    Returns the unsaved link index entry of the plugin ``instance`` or
+    ``None`` if it does not link to a page.
+    """
+    from .models import PageLink
+
+    if not getattr(instance, 'link_page_id', None):
+        return None
+    return PageLink(
+        plugin_id=instance.pk,
+        page_id=instance.link_page_id,
+        placeholder_id=instance.placeholder_id,
+        language=instance.language,
+    )
+
+
+def invalidate_page_links(page):
+    """
+    Invalidates the cached urls of ``page`` and its descendants and the
+    cached content of the placeholders with plugins linking to them.
+    """
+    from .models import PageLink
+
+    page_ids = get_page_tree_ids(page)
+    cache.invalidate_page_urls(page_ids)
+    rows = (
+        PageLink.objects
+        .filter(page_id__in=page_ids)
+        .values_list('placeholder_id', 'language')
+        .distinct()
+    )
+    utils.clear_placeholder_caches(rows)
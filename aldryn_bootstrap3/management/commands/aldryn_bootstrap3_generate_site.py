@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from aldryn_bootstrap3 import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates published pages filled with random Bootstrap3 plugins, '
+        'images and files for load tests. The same seed generates the same '
+        'site.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=10,
+            help='Number of pages to generate.',
+        )
+        parser.add_argument(
+            '--plugins', type=int, default=100,
+            help='Number of plugins per page, split among its placeholders.',
+        )
+        parser.add_argument(
+            '--depth', type=int, default=4,
+            help='Maximum depth of the plugin trees.',
+        )
+        parser.add_argument(
+            '--children', type=int, default=5,
+            help='Maximum number of children per plugin.',
+        )
+        parser.add_argument(
+            '--mix', default='',
+            help=(
+                'Weights of plugin types, e.g. "Row=5,Carousel=0". The '
+                '"Bootstrap3" prefix and "CMSPlugin" suffix may be left out.'
+            ),
+        )
+        parser.add_argument(
+            '--images', type=int, default=10,
+            help='Number of filer images to generate.',
+        )
+        parser.add_argument(
+            '--files', type=int, default=5,
+            help='Number of filer files to generate.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Seed of the random generator.',
+        )
+        parser.add_argument(
+            '--language', default=settings.LANGUAGE_CODE,
+            help='Language of the pages and plugins.',
+        )
+        parser.add_argument(
+            '--template', default=None,
+            help='Page template, defaults to the first of CMS_TEMPLATES.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mix = synthetic.parse_mix(options['mix'])
+        except ValueError as error:
+            raise CommandError(error)
+        generator = synthetic.SiteGenerator(
+            seed=options['seed'],
+            mix=mix,
+            plugins=options['plugins'],
+            depth=options['depth'],
+            children=options['children'],
+            images=options['images'],
+            files=options['files'],
+            language=options['language'],
+            template=options['template'],
+        )
+        started = time.time()
+        generator.generate(options['pages'])
+        self.stdout.write(
+            'Generated {} page(s) with {} plugin(s) in {:.1f} seconds.'.format(
+                len(generator.pages), generator.plugin_count, time.time() - started,
+            )
+        )
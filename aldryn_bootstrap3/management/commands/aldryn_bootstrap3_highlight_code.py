@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from aldryn_bootstrap3 import highlighting, utils
+from aldryn_bootstrap3.models import Bootstrap3CodePlugin
+
+
+def highlight_row(row):
+    # runs in a worker process, must not touch the database
+    pk, code, language, style, code_hash = row
+    return pk, highlighting.highlight(code, language, style), code_hash, style
+
+
+class Command(BaseCommand):
+    help = (
+        'Highlights the code of all code plugins whose stored highlighted '
+        'output is missing or outdated.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help='Number of worker processes (defaults to the number of CPUs).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of plugins read and written per transaction.',
+        )
+        parser.add_argument(
+            '--force', action='store_true', default=False,
+            help='Highlight all plugins, even if they are up to date.',
+        )
+
+    def get_batches(self, force, batch_size):
+        """
+        Yields the rows of the plugins to highlight, the plugins are read in
+        primary key ranges of ``batch_size``.
+        """
+        style = highlighting.get_style()
+        last_pk = 0
+        while True:
+            queryset = (
+                Bootstrap3CodePlugin.objects
+                .filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', 'code', 'code_language', 'highlighted_code_hash')
+            )[:batch_size]
+            rows = []
+            count = 0
+            for pk, code, language, current_hash in queryset.iterator():
+                last_pk = pk
+                count += 1
+                code_hash = highlighting.get_hash(code, language, style)
+                if force or code_hash != current_hash:
+                    rows.append((pk, code, language, style, code_hash))
+            if rows:
+                yield rows
+            if count < batch_size:
+                return
+
+    def save(self, results):
+        pks = []
+        with transaction.atomic():
+            for pk, highlighted_code, code_hash, style in results:
+                Bootstrap3CodePlugin.objects.filter(pk=pk).update(
+                    highlighted_code=highlighted_code,
+                    highlighted_code_hash=code_hash,
+                    highlighted_code_style=style or '',
+                )
+                pks.append(pk)
+        # the updates do not send the save signals
+        utils.invalidate_placeholders(
+            Bootstrap3CodePlugin.objects
+            .filter(pk__in=pks)
+            .values_list('placeholder_id', 'language')
+            .distinct()
+        )
+
+    def handle(self, *args, **options):
+        if not highlighting.is_available():
+            self.stderr.write('Pygments is not installed, nothing to do.')
+            return
+        processes = options['processes']
+        pool = None
+        count = 0
+        try:
+            for rows in self.get_batches(options['force'], options['batch_size']):
+                if processes == 1 or len(rows) <= 1:
+                    results = [highlight_row(row) for row in rows]
+                else:
+                    if pool is None:
+                        # the forked workers must not share the connections
+                        # of this process
+                        connections.close_all()
+                        pool = multiprocessing.Pool(processes)
+                    results = pool.imap_unordered(highlight_row, rows, chunksize=50)
+                self.save(results)
+                count += len(rows)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        self.stdout.write('Highlighted {} code plugin(s).'.format(count))
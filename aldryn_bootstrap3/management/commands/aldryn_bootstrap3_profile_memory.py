@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from aldryn_bootstrap3 import memory, warmup
+
+
+class Command(BaseCommand):
+    help = (
+        'Renders the plugins of published pages under tracemalloc and prints '
+        'the peak memory, the memory allocated and retained per plugin type '
+        'and the top allocation sites.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'pages', nargs='+',
+            help='Reverse ids or ids of the pages to profile.',
+        )
+        parser.add_argument(
+            '--language', default=settings.LANGUAGE_CODE,
+            help='Language of the pages.',
+        )
+        parser.add_argument(
+            '--top', type=int, default=memory.TOP_SITES,
+            help='Number of allocation sites to print.',
+        )
+
+    def handle(self, *args, **options):
+        if memory.tracemalloc is None:
+            raise CommandError('Memory profiles require tracemalloc (Python 3.4+).')
+        pages = warmup.get_priority_pages(options['pages'])
+        if not pages:
+            raise CommandError('No published page found.')
+        for page in pages:
+            self.stdout.write('{} ({})'.format(
+                page.get_absolute_url(options['language']), options['language'],
+            ))
+            profile = memory.profile_page(page, options['language'], top=options['top'])
+            self.stdout.write(profile.as_text())
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from django.core.management.base import BaseCommand
+
+from cms.models import CMSPlugin
+
+from aldryn_bootstrap3 import hashes
+
+
+class Command(BaseCommand):
+    help = (
+        'Computes the content hashes of all plugins, e.g. for plugins '
+        'created before they were maintained.'
+    )
+
+    def handle(self, *args, **options):
+        placeholder_ids = (
+            CMSPlugin.objects
+            .exclude(placeholder__isnull=True)
+            .order_by('placeholder_id')
+            .values_list('placeholder_id', flat=True)
+            .distinct()
+        )
+        count = 0
+        for placeholder_id in placeholder_ids.iterator():
+            hashes.rebuild_placeholder_hashes(placeholder_id)
+            count += 1
+        self.stdout.write('Rebuilt hashes of {} placeholder(s).'.format(count))
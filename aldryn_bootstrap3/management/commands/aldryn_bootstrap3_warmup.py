@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import time
+from multiprocessing.pool import ThreadPool
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from aldryn_bootstrap3 import thumbnails, warmup
+from aldryn_bootstrap3.conf import settings
+
+
+class Command(BaseCommand):
+    help = (
+        'Renders the published placeholders containing Bootstrap3 plugins to '
+        'fill the fragment, placeholder and thumbnail caches, e.g. after a '
+        'deploy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', nargs='*', default=None,
+            help=(
+                'Reverse ids or ids of the pages to warm up first, defaults '
+                'to ALDRYN_BOOTSTRAP3_WARMUP_PAGES.'
+            ),
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Number of placeholders rendered at the same time.',
+        )
+        parser.add_argument(
+            '--time-budget', type=float, default=None,
+            help='Seconds after which no more placeholders are rendered.',
+        )
+        parser.add_argument(
+            '--report-interval', type=float, default=30,
+            help='Seconds between the timing statistics printed meanwhile.',
+        )
+
+    def write_stats(self, stats):
+        self.stdout.write('{:<40} {:>8} {:>12} {:>10} {:>10}'.format(
+            'plugin type', 'count', 'total ms', 'mean ms', 'max ms',
+        ))
+        for plugin_type, count, total, mean, maximum in stats.get_rows():
+            self.stdout.write('{:<40} {:>8} {:>12.1f} {:>10.1f} {:>10.1f}'.format(
+                plugin_type, count, total * 1000, mean * 1000, maximum * 1000,
+            ))
+
+    def handle(self, *args, **options):
+        entries = options['pages']
+        if entries is None:
+            entries = settings.ALDRYN_BOOTSTRAP3_WARMUP_PAGES
+        tasks = warmup.get_tasks(warmup.get_priority_pages(entries))
+        stats = warmup.TimingStats()
+        concurrency = max(options['concurrency'], 1)
+        if options['time_budget'] is None:
+            deadline = None
+        else:
+            deadline = time.time() + options['time_budget']
+
+        def run(task):
+            if deadline is not None and time.time() > deadline:
+                return task, None, None
+            try:
+                return task, warmup.warm_placeholder(task, stats), None
+            except Exception as error:
+                # a broken placeholder must not stop the others
+                return task, None, error
+            finally:
+                if concurrency > 1:
+                    connections.close_all()
+
+        if concurrency == 1:
+            pool = None
+            results = (run(task) for task in tasks)
+        else:
+            pool = ThreadPool(concurrency)
+            results = pool.imap_unordered(run, tasks)
+
+        count = 0
+        skipped = 0
+        failed = 0
+        reported = time.time()
+        try:
+            for task, seconds, error in results:
+                if error is not None:
+                    failed += 1
+                    self.stderr.write('Failed to warm up {} ({}) {}: {!r}'.format(
+                        task.page.get_absolute_url(task.language),
+                        task.language,
+                        task.placeholder.slot,
+                        error,
+                    ))
+                    continue
+                if seconds is None:
+                    skipped += 1
+                    continue
+                count += 1
+                if options['verbosity'] > 1:
+                    self.stdout.write('{} ({}) {}: {:.1f} ms'.format(
+                        task.page.get_absolute_url(task.language),
+                        task.language,
+                        task.placeholder.slot,
+                        seconds * 1000,
+                    ))
+                if time.time() - reported >= options['report_interval']:
+                    reported = time.time()
+                    self.stdout.write('Warmed up {} of {} placeholder(s).'.format(
+                        count, len(tasks),
+                    ))
+                    self.write_stats(stats)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        thumbnails.wait_for_thumbnails()
+
+        self.write_stats(stats)
+        self.stdout.write('Warmed up {} placeholder(s).'.format(count))
+        if skipped:
+            self.stdout.write(
+                'Skipped {} placeholder(s) after the time budget.'.format(skipped)
+            )
+        if failed:
+            self.stdout.write('Failed to warm up {} placeholder(s).'.format(failed))
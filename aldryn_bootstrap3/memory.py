@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import sys
+
+from django.db import models
+from django.utils import translation
+
+from cms.plugin_rendering import ContentRenderer
+from sekizai.context import SekizaiContext
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2
+    tracemalloc = None
+
+
+# query parameter profiling a page instead of rendering it if DEBUG is on,
+# see ``middleware.MemoryProfileMiddleware``
+PROFILE_PARAM = 'aldryn_bootstrap3_memory'
+TOP_SITES = 15
+
+# instance attributes reported on their own or shared with other plugins
+EXCLUDED_ATTRIBUTES = ('_state', 'child_plugin_instances')
+
+
+def get_size(obj, seen):
+    """
+    Returns the size of ``obj`` and of the containers and strings it refers
+    to, objects in ``seen`` and model instances are not counted.
+    """
+    if id(obj) in seen or isinstance(obj, (models.Model, models.base.ModelState)):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(get_size(key, seen) + get_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(get_size(item, seen) for item in obj)
+    return size
+
+
+class MemoryProfile(object):
+    """
+    The memory used to render the plugins of a page.
+    """
+
+    def __init__(self):
+        self.instances = []
+        # plugin type -> bytes allocated by its renders, without children
+        self.allocated = {}
+        self.peak = 0
+        # (file:line, size, count) of the top allocation sites
+        self.sites = []
+
+    def add_render(self, instance, allocated):
+        self.instances.append(instance)
+        self.allocated[instance.plugin_type] = (
+            self.allocated.get(instance.plugin_type, 0) + allocated
+        )
+
+    def get_rows(self):
+        """
+        Returns ``(plugin_type, count, allocated, retained, tree, srcset)``
+        tuples, the plugin types using most memory first. ``retained`` is the
+        size of the plugin instances, ``tree`` the size of their
+        ``child_plugin_instances`` and ``srcset`` the size of the srcset
+        dicts they build on each call.
+        """
+        totals = {}
+        seen = set()
+        for instance in self.instances:
+            count, retained, tree, srcset = totals.get(instance.plugin_type, (0, 0, 0, 0))
+            attributes = {
+                key: value for key, value in instance.__dict__.items()
+                if key not in EXCLUDED_ATTRIBUTES
+            }
+            retained += sys.getsizeof(instance) + get_size(attributes, seen)
+            children = getattr(instance, 'child_plugin_instances', None)
+            if children is not None:
+                tree += get_size(children, seen)
+            if callable(getattr(instance, 'srcset', None)):
+                srcset += get_size(instance.srcset(), set())
+            totals[instance.plugin_type] = (count + 1, retained, tree, srcset)
+        rows = [
+            (plugin_type, count, self.allocated.get(plugin_type, 0), retained, tree, srcset)
+            for plugin_type, (count, retained, tree, srcset) in totals.items()
+        ]
+        return sorted(rows, key=lambda row: row[2] + row[3], reverse=True)
+
+    def as_text(self):
+        lines = [
+            'peak: {:.1f} KiB'.format(self.peak / 1024.0),
+            '',
+            '{:<40} {:>8} {:>14} {:>14} {:>10} {:>12}'.format(
+                'plugin type', 'count', 'allocated KiB', 'retained KiB', 'tree KiB', 'srcset KiB',
+            ),
+        ]
+        for plugin_type, count, allocated, retained, tree, srcset in self.get_rows():
+            lines.append('{:<40} {:>8} {:>14.1f} {:>14.1f} {:>10.1f} {:>12.1f}'.format(
+                plugin_type, count, allocated / 1024.0, retained / 1024.0,
+                tree / 1024.0, srcset / 1024.0,
+            ))
+        lines.extend(['', 'top allocation sites:'])
+        for site, size, count in self.sites:
+            lines.append('{:>10.1f} KiB {:>8} blocks  {}'.format(size / 1024.0, count, site))
+        return '\n'.join(lines) + '\n'
+
+
+class MemoryContentRenderer(ContentRenderer):
+    """
+    Records the memory allocated while rendering each plugin, without the
+    memory allocated by its children.
+    """
+
+    def __init__(self, request, profile):
+        super(MemoryContentRenderer, self).__init__(request)
+        self.profile = profile
+        self._child_sizes = []
+
+    def render_plugin(self, instance, context, placeholder=None, editable=False):
+        self._child_sizes.append(0)
+        start = tracemalloc.get_traced_memory()[0]
+        try:
+            return super(MemoryContentRenderer, self).render_plugin(
+                instance, context, placeholder, editable,
+            )
+        finally:
+            allocated = tracemalloc.get_traced_memory()[0] - start
+            child_size = self._child_sizes.pop()
+            if self._child_sizes:
+                self._child_sizes[-1] += allocated
+            self.profile.add_render(instance, allocated - child_size)
+
+
+def profile_page(page, language, top=TOP_SITES):
+    """
+    Renders the placeholders of ``page`` the way anonymous visitors see
+    them, without caches, under ``tracemalloc`` and returns a
+    ``MemoryProfile``.
+    """
+    from .warmup import get_request
+
+    if tracemalloc is None:
+        raise RuntimeError('Memory profiles require tracemalloc (Python 3.4+).')
+    profile = MemoryProfile()
+    placeholders = list(page.placeholders.all())
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        baseline = tracemalloc.get_traced_memory()[0]
+        with translation.override(language):
+            request = get_request(page, language)
+            renderer = MemoryContentRenderer(request, profile)
+            for placeholder in placeholders:
+                context = SekizaiContext({
+                    'request': request,
+                    'cms_content_renderer': renderer,
+                })
+                renderer.render_placeholder(
+                    placeholder,
+                    context,
+                    language=language,
+                    page=page,
+                    editable=False,
+                    use_cache=False,
+                )
+        peak = tracemalloc.get_traced_memory()[1]
+        after = tracemalloc.take_snapshot()
+    finally:
+        if started:
+            tracemalloc.stop()
+    # the peak of a trace started earlier may predate this render
+    profile.peak = max(peak - baseline, 0)
+    ignored = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    stats = after.filter_traces(ignored).compare_to(before.filter_traces(ignored), 'lineno')
+    profile.sites = [
+        (str(stat.traceback[0]), stat.size_diff, stat.count_diff)
+        for stat in stats[:top]
+    ]
+    return profile
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import bisect
+import collections
+import functools
+import threading
+import time
+
+
+# Metrics are kept per process, each worker reports its own values.
+PREFIX = 'aldryn_bootstrap3_'
+
+# upper bounds of the histogram buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_counters = collections.defaultdict(float)
+# (name, labels) -> [counts per bucket, sum, count]
+_histograms = {}
+_lock = threading.Lock()
+
+
+def get_labels(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def get_sample_name(name, labels, suffix=''):
+    if not labels:
+        return name + suffix
+    return '{}{}{{{}}}'.format(name, suffix, ','.join(
+        '{}="{}"'.format(key, escape_label(value)) for key, value in labels
+    ))
+
+
+def escape_label(value):
+    return '{}'.format(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def increment(name, value=1, labels=None):
+    key = (name, get_labels(labels))
+    with _lock:
+        _counters[key] += value
+
+
+def observe(name, value, labels=None):
+    """
+    Adds ``value`` to the histogram ``name``, e.g. a duration in seconds.
+    """
+    key = (name, get_labels(labels))
+    index = bisect.bisect_left(DEFAULT_BUCKETS, value)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * len(DEFAULT_BUCKETS), 0.0, 0]
+        if index < len(DEFAULT_BUCKETS):
+            histogram[0][index] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+
+def timed(name, labels=None):
+    """
+    Decorator observing the duration of each call in the histogram ``name``.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, time.time() - started, labels)
+        return wrapper
+    return decorator
+
+
+def get_counters():
+    """
+    Returns a copy of all counters of this process, keyed by their sample
+    name, e.g. ``fragment_cache_hits``.
+    """
+    with _lock:
+        return {
+            get_sample_name(name, labels): value
+            for (name, labels), value in _counters.items()
+        }
+
+
+def get_histograms():
+    """
+    Returns a copy of all histograms of this process, keyed by their sample
+    name, as ``(counts per bucket, sum, count)`` tuples.
+    """
+    with _lock:
+        return {
+            get_sample_name(name, labels): (list(counts), total, count)
+            for (name, labels), (counts, total, count) in _histograms.items()
+        }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def format_value(value):
+    if value == int(value):
+        return '{}'.format(int(value))
+    return repr(float(value))
+
+
+def render_text():
+    """
+    Returns all metrics of this process in the Prometheus text format.
+    """
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(
+            (key, (list(counts), total, count))
+            for key, (counts, total, count) in _histograms.items()
+        )
+    lines = []
+    last_name = None
+    for (name, labels), value in counters:
+        name = PREFIX + name + '_total'
+        if name != last_name:
+            lines.append('# TYPE {} counter'.format(name))
+            last_name = name
+        lines.append('{} {}'.format(get_sample_name(name, labels), format_value(value)))
+    for (name, labels), (counts, total, count) in histograms:
+        name = PREFIX + name
+        if name != last_name:
+            lines.append('# TYPE {} histogram'.format(name))
+            last_name = name
+        cumulative = 0
+        for bound, bucket_count in zip(DEFAULT_BUCKETS, counts):
+            cumulative += bucket_count
+            bucket_labels = labels + (('le', repr(float(bound))),)
+            lines.append('{} {}'.format(get_sample_name(name, bucket_labels, '_bucket'), cumulative))
+        lines.append('{} {}'.format(get_sample_name(name, labels + (('le', '+Inf'),), '_bucket'), count))
+        lines.append('{} {}'.format(get_sample_name(name, labels, '_sum'), format_value(total)))
+        lines.append('{} {}'.format(get_sample_name(name, labels, '_count'), count))
+    return '\n'.join(lines) + '\n'
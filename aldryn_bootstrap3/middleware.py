@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, quote_etag
+
+from cms.utils import get_language_from_request
+from cms.utils.page_resolver import get_page_from_request
+from cms.views import details
+
+from . import conditional, instrumentation, memory
+from .conf import settings
+
+try:
+    from django.utils.deprecation import MiddlewareMixin
+except ImportError:
+    # Django < 1.10
+    MiddlewareMixin = object
+
+
+class ConditionalPageMiddleware(MiddlewareMixin):
+    """
+    Answers conditional GET requests for cms pages with
+    ``304 Not Modified`` before the page is rendered and adds ``ETag`` and
+    ``Last-Modified`` headers to rendered pages, see
+    ``conditional.get_page_validators``.
+
+    Only anonymous requests are handled, editors see the toolbar and
+    unpublished content.
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if view_func is not details or request.method not in ('GET', 'HEAD'):
+            return None
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated():
+            return None
+        page = get_page_from_request(request, use_path=view_kwargs.get('slug', ''))
+        if not page or page.application_urls or page.login_required:
+            return None
+        language = get_language_from_request(request, current_page=page)
+        validators = conditional.get_page_validators(page, language)
+        if validators is None:
+            return None
+        request._aldryn_bootstrap3_validators = validators
+        if conditional.is_not_modified(request, *validators):
+            return self.add_headers(HttpResponseNotModified(), validators)
+        return None
+
+    def process_response(self, request, response):
+        validators = getattr(request, '_aldryn_bootstrap3_validators', None)
+        if validators and response.status_code == 200 and not response.has_header('ETag'):
+            self.add_headers(response, validators)
+        return response
+
+    def add_headers(self, response, validators):
+        etag, last_modified = validators
+        response['ETag'] = quote_etag(etag)
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class RenderTimingMiddleware(MiddlewareMixin):
+    """
+    Records the render timings of the Bootstrap3 plugins if
+    ``ALDRYN_BOOTSTRAP3_RENDER_TIMING`` is enabled, adds them to the response
+    as a ``Server-Timing`` header and logs them, see
+    ``instrumentation.RenderTimingMixin``.
+    """
+
+    def process_request(self, request):
+        if not settings.ALDRYN_BOOTSTRAP3_RENDER_TIMING:
+            return None
+        request._aldryn_bootstrap3_timings = instrumentation.start_collecting()
+        return None
+
+    def process_response(self, request, response):
+        if getattr(request, '_aldryn_bootstrap3_timings', None) is None:
+            return response
+        timings = instrumentation.stop_collecting()
+        if timings is not None and timings.records:
+            response['Server-Timing'] = timings.get_server_timing()
+            instrumentation.log_timings(request, timings)
+        return response
+
+
+class MemoryProfileMiddleware(MiddlewareMixin):
+    """
+    Answers requests for cms pages with ``?aldryn_bootstrap3_memory`` with
+    a memory profile of their plugins instead of the page if ``DEBUG`` is
+    enabled, see ``memory.profile_page``.
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (view_func is not details or not settings.DEBUG or
+                memory.PROFILE_PARAM not in request.GET or memory.tracemalloc is None):
+            return None
+        page = get_page_from_request(request, use_path=view_kwargs.get('slug', ''))
+        if not page:
+            return None
+        language = get_language_from_request(request, current_page=page)
+        profile = memory.profile_page(page, language)
+        return HttpResponse(profile.as_text(), content_type='text/plain; charset=utf-8')
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aldryn_bootstrap3', '0014_translations_update'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bootstrap3codeplugin',
+            name='code_language',
+            field=models.CharField(blank=True, default='', help_text='Highlights the code on the server, e.g. "python" or "html". Leave empty to output the code as is.', max_length=255, verbose_name='Language'),
+        ),
+        migrations.AddField(
+            model_name='bootstrap3codeplugin',
+            name='highlighted_code',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='bootstrap3codeplugin',
+            name='highlighted_code_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+    ]
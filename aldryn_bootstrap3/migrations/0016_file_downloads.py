@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('filer', '0002_auto_20150606_2003'),
+        ('aldryn_bootstrap3', '0015_bootstrap3codeplugin_highlighting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileDownloadCount',
+            fields=[
+                ('file', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='filer.File', verbose_name='File')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Downloads')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='bootstrap3fileplugin',
+            name='file_size',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='bootstrap3fileplugin',
+            name='file_url',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+LINK_MODELS = (
+    'Boostrap3ButtonPlugin',
+    'Bootstrap3CarouselSlidePlugin',
+)
+
+
+def create_page_links(apps, schema_editor):
+    PageLink = apps.get_model('aldryn_bootstrap3', 'PageLink')
+    for model_name in LINK_MODELS:
+        model = apps.get_model('aldryn_bootstrap3', model_name)
+        rows = (
+            model.objects
+            .filter(link_page__isnull=False)
+            .values_list('pk', 'link_page_id', 'placeholder_id', 'language')
+        )
+        PageLink.objects.bulk_create([
+            PageLink(
+                plugin_id=plugin_id,
+                page_id=page_id,
+                placeholder_id=placeholder_id,
+                language=language,
+            ) for plugin_id, page_id, placeholder_id, language in rows.iterator()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0016_auto_20160608_1535'),
+        ('aldryn_bootstrap3', '0016_file_downloads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageLink',
+            fields=[
+                ('plugin', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='cms.CMSPlugin', verbose_name='Plugin')),
+                ('language', models.CharField(max_length=15, verbose_name='Language')),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cms.Page', verbose_name='Page')),
+                ('placeholder', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cms.Placeholder', verbose_name='Placeholder')),
+            ],
+        ),
+        migrations.RunPython(create_page_links, migrations.RunPython.noop),
+    ]
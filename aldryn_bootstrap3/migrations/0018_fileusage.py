@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# (model, field, is folder)
+USAGE_FIELDS = (
+    ('Boostrap3ImagePlugin', 'file', False),
+    ('Bootstrap3FilePlugin', 'file', False),
+    ('Boostrap3ButtonPlugin', 'link_file', False),
+    ('Bootstrap3CarouselSlidePlugin', 'image', False),
+    ('Bootstrap3CarouselSlidePlugin', 'link_file', False),
+    ('Bootstrap3CarouselSlideFolderPlugin', 'folder', True),
+)
+
+
+def create_file_usage(apps, schema_editor):
+    FileUsage = apps.get_model('aldryn_bootstrap3', 'FileUsage')
+    for model_name, field_name, is_folder in USAGE_FIELDS:
+        model = apps.get_model('aldryn_bootstrap3', model_name)
+        attname = '{}_id'.format(field_name)
+        rows = (
+            model.objects
+            .filter(**{'{}__isnull'.format(field_name): False})
+            .values_list('pk', attname, 'placeholder_id', 'language')
+        )
+        FileUsage.objects.bulk_create([
+            FileUsage(
+                plugin_id=plugin_id,
+                field_name=field_name,
+                placeholder_id=placeholder_id,
+                language=language,
+                **{'folder_id' if is_folder else 'file_id': value}
+            ) for plugin_id, value, placeholder_id, language in rows.iterator()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('filer', '0002_auto_20150606_2003'),
+        ('cms', '0016_auto_20160608_1535'),
+        ('aldryn_bootstrap3', '0017_pagelink'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileUsage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field_name', models.CharField(max_length=100, verbose_name='Field')),
+                ('language', models.CharField(max_length=15, verbose_name='Language')),
+                ('file', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='filer.File', verbose_name='File')),
+                ('folder', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='filer.Folder', verbose_name='Folder')),
+                ('placeholder', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cms.Placeholder', verbose_name='Placeholder')),
+                ('plugin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cms.CMSPlugin', verbose_name='Plugin')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='fileusage',
+            unique_together=set([('plugin', 'field_name')]),
+        ),
+        migrations.RunPython(create_file_usage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0016_auto_20160608_1535'),
+        ('aldryn_bootstrap3', '0018_fileusage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PluginHash',
+            fields=[
+                ('plugin', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='cms.CMSPlugin', verbose_name='Plugin')),
+                ('content_hash', models.CharField(max_length=40, verbose_name='Content hash')),
+                ('subtree_hash', models.CharField(max_length=40, verbose_name='Subtree hash')),
+                ('placeholder', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cms.Placeholder', verbose_name='Placeholder')),
+            ],
+        ),
+    ]
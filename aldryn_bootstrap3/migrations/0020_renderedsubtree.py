@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0016_auto_20160608_1535'),
+        ('aldryn_bootstrap3', '0019_pluginhash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenderedSubtree',
+            fields=[
+                ('plugin', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='cms.CMSPlugin', verbose_name='Plugin')),
+                ('language', models.CharField(max_length=15, verbose_name='Language')),
+                ('fragment_key', models.CharField(max_length=255, verbose_name='Fragment key')),
+                ('content', models.TextField(verbose_name='Content')),
+                ('sekizai', models.TextField(blank=True, verbose_name='Sekizai data')),
+                ('placeholder', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='cms.Placeholder', verbose_name='Placeholder')),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aldryn_bootstrap3', '0020_renderedsubtree'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bootstrap3codeplugin',
+            name='highlighted_code_style',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def backfill_file_cache(apps, schema_editor):
+    # the url is resolved by the storage of the filer file, which the
+    # historical model does not know about
+    from filer.models import File
+
+    Bootstrap3FilePlugin = apps.get_model('aldryn_bootstrap3', 'Bootstrap3FilePlugin')
+    plugins = (
+        Bootstrap3FilePlugin.objects
+        .filter(file__isnull=False, file_url='')
+        .values_list('pk', 'file_id')
+    )
+    file_ids = {}
+    for plugin_id, file_id in plugins.iterator():
+        file_ids.setdefault(file_id, []).append(plugin_id)
+    files = File.objects.non_polymorphic().filter(pk__in=list(file_ids))
+    for file_obj in files.iterator():
+        Bootstrap3FilePlugin.objects.filter(pk__in=file_ids[file_obj.pk]).update(
+            file_url=file_obj.url,
+            file_size=file_obj.size,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('filer', '0002_auto_20150606_2003'),
+        ('aldryn_bootstrap3', '0021_bootstrap3codeplugin_highlighted_code_style'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_file_cache, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aldryn_bootstrap3', '0022_file_cache_backfill'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='renderedsubtree',
+            old_name='fragment_key',
+            new_name='state_key',
+        ),
+        migrations.AlterField(
+            model_name='renderedsubtree',
+            name='state_key',
+            field=models.CharField(max_length=255, verbose_name='State key'),
+        ),
+    ]
@@ -8,7 +8,7 @@ import django.forms
 
 from django.core.exceptions import ValidationError
 from django.db import models
-from django.utils.translation import ugettext, ugettext_lazy as _, ungettext
+from django.utils.translation import get_language, ugettext, ugettext_lazy as _, ungettext
 
 from django.utils.encoding import force_text
 
@@ -22,7 +22,7 @@ import filer.fields.image
 from djangocms_attributes_field.fields import AttributesField
 
 from .conf import settings
-from . import fields, constants
+from . import fields, constants, links
 
 
 def get_additional_styles():
@@ -47,6 +47,35 @@ def get_additional_styles():
     return choices
 
 
+class StyleChoices(object):
+    """
+    ``choices`` followed by the additional styles from settings, built when
+    iterated instead of when the model is imported.
+    """
+
+    def __init__(self, choices):
+        self.choices = choices
+
+    def get_choices(self):
+        return list(self.choices) + get_additional_styles()
+
+    def __iter__(self):
+        return iter(self.get_choices())
+
+    def __len__(self):
+        return len(self.get_choices())
+
+    def __bool__(self):
+        # Field.__init__() evaluates ``choices or []``, which would build the
+        # choices through __len__
+        return True
+
+    __nonzero__ = __bool__
+
+    def __getitem__(self, index):
+        return self.get_choices()[index]
+
+
 # Add an app namespace to related_name to avoid field name clashes
 # with any other plugins that have a field with the same name as the
 # lowercase of the class name of this model.
@@ -161,21 +190,40 @@ class LinkMixin(models.Model):
 
     def get_link_url(self):
         if self.link_page_id:
-            link = self.link_page.get_absolute_url()
+            link = self.get_link_page_url()
         elif self.link_url:
             link = self.link_url
         elif self.link_phone:
             link = 'tel:{}'.format(self.link_phone.replace(' ', ''))
         elif self.link_mailto:
             link = 'mailto:{}'.format(self.link_mailto)
-        elif self.link_file:
-            link = self.link_file.url
+        elif self.link_file_id:
+            link = self.get_link_file_url()
         else:
             link = ''
         if self.link_anchor:
             link += '#{}'.format(self.link_anchor)
         return link
 
+    def get_link_page_url(self):
+        # resolved in bulk when the instances come from a queryset
+        # returned by ``links.with_resolved_links``
+        language = get_language()
+        if language not in getattr(self, '_link_page_urls', {}):
+            links.resolve_links([self], language)
+        return self._link_page_urls[language]
+
+    def get_link_file_url(self):
+        if not hasattr(self, '_link_file_url'):
+            links.resolve_links([self])
+        return self._link_file_url
+
+    def save(self, *args, **kwargs):
+        # the link may point somewhere else now
+        self.__dict__.pop('_link_page_urls', None)
+        self.__dict__.pop('_link_file_url', None)
+        super(LinkMixin, self).save(*args, **kwargs)
+
     def clean(self):
         super(LinkMixin, self).clean()
         field_names = (
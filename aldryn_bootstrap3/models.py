@@ -7,6 +7,7 @@ import collections
 from functools import partial
 
 import django.forms.models
+from django.core.urlresolvers import reverse
 from django.db import models
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.html import strip_tags
@@ -23,7 +24,8 @@ import filer.fields.folder
 import djangocms_text_ckeditor.fields
 from djangocms_attributes_field.fields import AttributesField
 
-from . import model_fields, constants
+from . import model_fields, constants, cache, highlighting
+from .conf import settings
 
 
 # CSS - http://getbootstrap.com/css/
@@ -249,6 +251,32 @@ class Bootstrap3CodePlugin(CMSPlugin):
         verbose_name=_('Code'),
         blank=True,
     )
+    code_language = models.CharField(
+        verbose_name=_('Language'),
+        blank=True,
+        default='',
+        max_length=255,
+        help_text=_('Highlights the code on the server, e.g. "python" or '
+                    '"html". Leave empty to output the code as is.'),
+    )
+    highlighted_code = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+    )
+    highlighted_code_hash = models.CharField(
+        blank=True,
+        default='',
+        max_length=40,
+        editable=False,
+    )
+    # the Pygments style of highlighted_code, empty for css classes
+    highlighted_code_style = models.CharField(
+        blank=True,
+        default='',
+        max_length=255,
+        editable=False,
+    )
     classes = model_fields.Classes()
     attributes = AttributesField(
         verbose_name=_('Attributes'),
@@ -261,6 +289,43 @@ class Bootstrap3CodePlugin(CMSPlugin):
     def __str__(self):
         return '<{}>'.format(self.code_type)
 
+    def save(self, *args, **kwargs):
+        self.update_highlighted_code()
+        super(Bootstrap3CodePlugin, self).save(*args, **kwargs)
+
+    def get_highlighted_code_hash(self):
+        return highlighting.get_hash(
+            self.code, self.code_language, highlighting.get_style())
+
+    def update_highlighted_code(self, force=False):
+        """
+        Highlights the code if the code, language or style changed since it
+        was last highlighted. Returns ``True`` if it was highlighted again.
+        """
+        code_hash = self.get_highlighted_code_hash()
+        if not force and code_hash == self.highlighted_code_hash:
+            return False
+        style = highlighting.get_style()
+        self.highlighted_code = highlighting.highlight(
+            self.code, self.code_language, style)
+        self.highlighted_code_hash = code_hash
+        self.highlighted_code_style = style or ''
+        return True
+
+    def has_current_style(self):
+        return self.highlighted_code_style == (highlighting.get_style() or '')
+
+    def save_highlighted_code(self):
+        """
+        Stores the highlighted code without saving the plugin, the caches of
+        its placeholder have to be cleared by the caller.
+        """
+        Bootstrap3CodePlugin.objects.filter(pk=self.pk).update(
+            highlighted_code=self.highlighted_code,
+            highlighted_code_hash=self.highlighted_code_hash,
+            highlighted_code_style=self.highlighted_code_style,
+        )
+
 
 @python_2_unicode_compatible
 class Boostrap3ButtonPlugin(CMSPlugin, model_fields.LinkMixin):
@@ -980,7 +1045,7 @@ class Bootstrap3CarouselPlugin(CMSPlugin):
 
     style = models.CharField(
         verbose_name=_('Style'),
-        choices=STYLE_CHOICES + model_fields.get_additional_styles(),
+        choices=model_fields.StyleChoices(STYLE_CHOICES),
         default=STYLE_DEFAULT,
         max_length=255,
     )
@@ -1162,6 +1227,27 @@ class Bootstrap3CarouselSlideFolderPlugin(CMSPlugin):
         else:
             return _('<folder is missing>')
 
+    def get_images(self):
+        """
+        Returns the images of the folder that are rendered as slides.
+        """
+        if not self.folder_id:
+            return []
+        images = getattr(self, '_images', None)
+        if images is None:
+            images = cache.get_folder_images([self.folder_id])[self.folder_id]
+        return images
+
+    @classmethod
+    def prefetch_images(cls, instances):
+        """
+        Loads the images of several slide folders at once, see ``get_images``.
+        """
+        instances = [instance for instance in instances if instance.folder_id]
+        images = cache.get_folder_images(instance.folder_id for instance in instances)
+        for instance in instances:
+            instance._images = images[instance.folder_id]
+
 
 # Custom plugins added to support further stylings
 #
@@ -1215,6 +1301,18 @@ class Bootstrap3FilePlugin(CMSPlugin):
         verbose_name=_('Show file size'),
         default=False,
     )
+    # resolved when saving, so rendering does not need to ask the storage,
+    # storages with signed or expiring urls need the download view
+    file_url = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+    )
+    file_size = models.BigIntegerField(
+        blank=True,
+        null=True,
+        editable=False,
+    )
     # common fields
     icon_left = model_fields.Icon()
     icon_right = model_fields.Icon()
@@ -1236,3 +1334,214 @@ class Bootstrap3FilePlugin(CMSPlugin):
             else:
                 label = 'File'
         return label
+
+    def save(self, *args, **kwargs):
+        self.update_file_cache()
+        super(Bootstrap3FilePlugin, self).save(*args, **kwargs)
+
+    def update_file_cache(self):
+        if self.file_id:
+            self.file_url = self.file.url
+            self.file_size = self.file.size
+        else:
+            self.file_url = ''
+            self.file_size = None
+
+    def get_link_url(self):
+        if not self.file_id:
+            return ''
+        if settings.ALDRYN_BOOTSTRAP3_FILE_DOWNLOAD_VIEW:
+            return reverse('aldryn_bootstrap3_file_download', kwargs={'pk': self.pk})
+        # plugins saved before the url was stored fall back to the storage
+        return self.file_url or self.file.url
+
+    def get_file_size(self):
+        if self.file_size is None and self.file_id:
+            return self.file.size
+        return self.file_size
+
+
+# Internal models, not plugins
+
+
+@python_2_unicode_compatible
+class FileDownloadCount(models.Model):
+    """
+    Number of downloads of a filer file through the file download view.
+    """
+    file = models.OneToOneField(
+        'filer.File',
+        verbose_name=_('File'),
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    count = models.PositiveIntegerField(
+        verbose_name=_('Downloads'),
+        default=0,
+    )
+
+    def __str__(self):
+        return '{}: {}'.format(self.file_id, self.count)
+
+
+@python_2_unicode_compatible
+class PageLink(models.Model):
+    """
+    Reverse index from CMS pages to the button and carousel slide plugins
+    linking to them, kept up to date by ``signals.update_page_link``.
+    """
+    plugin = models.OneToOneField(
+        CMSPlugin,
+        verbose_name=_('Plugin'),
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    page = models.ForeignKey(
+        'cms.Page',
+        verbose_name=_('Page'),
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    placeholder = models.ForeignKey(
+        'cms.Placeholder',
+        verbose_name=_('Placeholder'),
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    language = models.CharField(
+        verbose_name=_('Language'),
+        max_length=15,
+    )
+
+    def __str__(self):
+        return '{} -> {}'.format(self.plugin_id, self.page_id)
+
+
+@python_2_unicode_compatible
+class FileUsage(models.Model):
+    """
+    Index of the filer files and folders used by plugins, kept up to date by
+    ``signals.update_file_usage``.
+    """
+    plugin = models.ForeignKey(
+        CMSPlugin,
+        verbose_name=_('Plugin'),
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    field_name = models.CharField(
+        verbose_name=_('Field'),
+        max_length=100,
+    )
+    file = models.ForeignKey(
+        'filer.File',
+        verbose_name=_('File'),
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    folder = models.ForeignKey(
+        'filer.Folder',
+        verbose_name=_('Folder'),
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    placeholder = models.ForeignKey(
+        'cms.Placeholder',
+        verbose_name=_('Placeholder'),
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    language = models.CharField(
+        verbose_name=_('Language'),
+        max_length=15,
+    )
+
+    class Meta:
+        unique_together = (('plugin', 'field_name'),)
+
+    def __str__(self):
+        return '{}.{} -> {}'.format(
+            self.plugin_id,
+            self.field_name,
+            self.file_id or self.folder_id,
+        )
+
+
+@python_2_unicode_compatible
+class PluginHash(models.Model):
+    """
+    Hashes of the content of a plugin and of its whole subtree, kept up to
+    date by ``hashes.update_hashes``.
+    """
+    plugin = models.OneToOneField(
+        CMSPlugin,
+        verbose_name=_('Plugin'),
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    placeholder = models.ForeignKey(
+        'cms.Placeholder',
+        verbose_name=_('Placeholder'),
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    content_hash = models.CharField(
+        verbose_name=_('Content hash'),
+        max_length=40,
+    )
+    subtree_hash = models.CharField(
+        verbose_name=_('Subtree hash'),
+        max_length=40,
+    )
+
+    def __str__(self):
+        return '{}: {}'.format(self.plugin_id, self.subtree_hash)
+
+
+@python_2_unicode_compatible
+class RenderedSubtree(models.Model):
+    """
+    HTML of a top-level plugin of a published page and its children, stored
+    by ``prerender.prerender_page`` when the page is published.
+    """
+    plugin = models.OneToOneField(
+        CMSPlugin,
+        verbose_name=_('Plugin'),
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    placeholder = models.ForeignKey(
+        'cms.Placeholder',
+        verbose_name=_('Placeholder'),
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    language = models.CharField(
+        verbose_name=_('Language'),
+        max_length=15,
+    )
+    # prerender.get_state_key() at render time, the HTML is outdated once
+    # it changes
+    state_key = models.CharField(
+        verbose_name=_('State key'),
+        max_length=255,
+    )
+    content = models.TextField(
+        verbose_name=_('Content'),
+    )
+    sekizai = models.TextField(
+        verbose_name=_('Sekizai data'),
+        blank=True,
+    )
+
+    def __str__(self):
+        return '{} ({})'.format(self.plugin_id, self.language)
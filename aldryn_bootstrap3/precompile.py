@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import collections
+import logging
+import os
+import time
+
+from django.apps import apps
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+
+from . import styles
+
+
+logger = logging.getLogger(__name__)
+
+
+# ``compiled`` and ``missing`` are template names, ``errors`` maps the names
+# of templates failing to compile to the error
+CompileResult = collections.namedtuple('CompileResult', ['compiled', 'missing', 'errors'])
+
+
+def get_addon_template_names():
+    """
+    Returns the names of the templates shipped with the addon, including the
+    admin and widget templates.
+    """
+    root = os.path.join(apps.get_app_config('aldryn_bootstrap3').path, 'templates')
+    names = []
+    for path, dirs, files in os.walk(root):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.endswith('.html'):
+                name = os.path.relpath(os.path.join(path, filename), root)
+                names.append(name.replace(os.sep, '/'))
+    return names
+
+
+def get_style_template_names():
+    names = []
+    for style in styles.get_styles():
+        names.extend(styles.get_style_template_names(style))
+    return names
+
+
+def compile_templates():
+    """
+    Loads the addon's templates through the template engines, compiled
+    templates are kept by the cached template loader if it is configured.
+    The templates of the carousel styles are loaded once by
+    ``styles.registry``, its results are included.
+    """
+    result = CompileResult([], [], {})
+    seen = set()
+    for style in styles.get_styles():
+        missing, errors = styles.registry.check(style)
+        for name in styles.get_style_template_names(style):
+            if name in seen:
+                continue
+            seen.add(name)
+            if name in missing:
+                result.missing.append(name)
+            elif name in errors:
+                result.errors[name] = errors[name]
+            else:
+                result.compiled.append(name)
+
+    for name in get_addon_template_names():
+        if name in seen:
+            continue
+        try:
+            get_template(name)
+        except TemplateDoesNotExist:
+            result.missing.append(name)
+        except Exception as error:
+            # syntax errors and broken tag libraries show up on render
+            # again, they must not stop the process from starting
+            result.errors[name] = error
+        else:
+            result.compiled.append(name)
+    return result
+
+
+def compile_on_startup():
+    """
+    Checks the carousel styles and compiles the templates, logs the ones
+    failing to compile, called by the ``AppConfig``. Missing and broken
+    style templates are logged by ``styles.registry``.
+    """
+    started = time.time()
+    styles.registry.load()
+    result = compile_templates()
+    style_names = set(get_style_template_names())
+    for name, error in sorted(result.errors.items()):
+        if name not in style_names:
+            logger.error('Template %s failed to compile: %s', name, error)
+    logger.debug(
+        'Compiled %d templates in %.3f seconds',
+        len(result.compiled), time.time() - started,
+    )
+    return result
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import hashlib
+import json
+
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import translation
+
+from cms.plugin_pool import plugin_pool
+from cms.plugin_rendering import ContentRenderer
+from cms.utils.plugins import get_plugins
+from sekizai.context import SekizaiContext
+from sekizai.helpers import Watcher
+
+from . import fragments, hashes, metrics, warmup
+
+
+class StoredTemplate(fragments.StoredFragment):
+    """
+    Stands in for the template of a plugin whose subtree was pre-rendered.
+    """
+
+
+def is_prerenderable(plugin):
+    """
+    Returns whether ``plugin`` and its children render the same for all
+    visitors: their plugin classes must be cacheable and must not set
+    ``prerender = False``.
+    """
+    try:
+        plugin_class = plugin_pool.get_plugin(plugin.plugin_type)
+    except KeyError:
+        return False
+    if not plugin_class.cache or not getattr(plugin_class, 'prerender', True):
+        return False
+    children = getattr(plugin, 'child_plugin_instances', None) or []
+    return all(is_prerenderable(child) for child in children)
+
+
+def get_file_states(placeholder):
+    """
+    Returns a dict mapping ``(kind, id)`` of the filer files and folders
+    used in ``placeholder`` to their modification state, read once per
+    placeholder and render. A folder changes with its files.
+    """
+    from filer.models import File, Folder
+
+    states = getattr(placeholder, '_aldryn_bootstrap3_file_states', None)
+    if states is not None:
+        return states
+    usage = fragments.get_placeholder_file_usage(placeholder)
+    file_ids = {file_id for path, file_id, folder_id in usage if file_id}
+    folder_ids = {folder_id for path, file_id, folder_id in usage if folder_id}
+    states = {}
+    if file_ids:
+        for pk, modified_at in (
+            File.objects.non_polymorphic()
+            .filter(pk__in=file_ids)
+            .values_list('pk', 'modified_at')
+        ):
+            states[fragments.FILE, pk] = str(modified_at)
+    if folder_ids:
+        for pk, modified_at in Folder.objects.filter(pk__in=folder_ids).values_list('pk', 'modified_at'):
+            states[fragments.FOLDER, pk] = str(modified_at)
+        for pk, latest, count in (
+            File.objects.non_polymorphic()
+            .filter(folder_id__in=folder_ids)
+            .values('folder_id')
+            .annotate(latest=Max('modified_at'), count=Count('pk'))
+            .values_list('folder_id', 'latest', 'count')
+        ):
+            states[fragments.FOLDER, pk] += ':{}:{}'.format(latest, count)
+    placeholder._aldryn_bootstrap3_file_states = states
+    return states
+
+
+def get_state_key(instance, placeholder):
+    """
+    Returns a key of the content of ``instance``, its descendants and the
+    filer files and folders they show, ``None`` if the plugin has no stored
+    subtree hash. It is derived from the database only, so it survives
+    restarts and cache flushes unlike the fragment key.
+    """
+    subtree_hashes = getattr(placeholder, '_aldryn_bootstrap3_subtree_hashes', None)
+    if subtree_hashes is None:
+        subtree_hashes = placeholder._aldryn_bootstrap3_subtree_hashes = {}
+    if instance.language not in subtree_hashes:
+        subtree_hashes[instance.language] = hashes.get_placeholder_hashes(placeholder, instance.language)
+    subtree_hash = subtree_hashes[instance.language].get(instance.pk)
+    if subtree_hash is None:
+        return None
+    file_ids, folder_ids = fragments.get_file_dependencies(placeholder, instance)
+    states = get_file_states(placeholder)
+    values = [subtree_hash]
+    values.extend(
+        '{}:{}:{}'.format(kind, object_id, states.get((kind, object_id), ''))
+        for kind, object_ids in ((fragments.FILE, file_ids), (fragments.FOLDER, folder_ids))
+        for object_id in object_ids
+    )
+    return hashlib.sha1(';'.join(values).encode('utf-8')).hexdigest()
+
+
+def prerender_placeholder(placeholder, page, language):
+    """
+    Stores the HTML of the top-level Bootstrap3 plugins of ``placeholder``
+    in ``language``. Returns the number of subtrees stored.
+    """
+    from .models import RenderedSubtree
+
+    request = warmup.get_request(page, language)
+    renderer = ContentRenderer(request)
+    context = SekizaiContext({
+        'request': request,
+        'cms_content_renderer': renderer,
+    })
+    subtrees = []
+    with translation.override(language):
+        plugins = get_plugins(request, placeholder, page.get_template(), lang=language)
+        for plugin in plugins:
+            plugin_class = plugin_pool.get_plugin(plugin.plugin_type)
+            if not issubclass(plugin_class, fragments.FragmentCacheMixin):
+                continue
+            if not is_prerenderable(plugin):
+                continue
+            state_key = get_state_key(plugin, placeholder)
+            if state_key is None:
+                continue
+            watcher = Watcher(context)
+            content = renderer.render_plugin(plugin, context, placeholder, editable=False)
+            sekizai_changes = [
+                [name, list(values)]
+                for name, values in sorted(watcher.get_changes().items()) if values
+            ]
+            subtrees.append(RenderedSubtree(
+                plugin_id=plugin.pk,
+                placeholder_id=placeholder.pk,
+                language=language,
+                state_key=state_key,
+                content=content,
+                sekizai=json.dumps(sekizai_changes) if sekizai_changes else '',
+            ))
+    with transaction.atomic():
+        RenderedSubtree.objects.filter(
+            placeholder_id=placeholder.pk,
+            language=language,
+        ).delete()
+        RenderedSubtree.objects.bulk_create(subtrees)
+    return len(subtrees)
+
+
+def prerender_page(page, language):
+    """
+    Pre-renders all placeholders of the public version of ``page``.
+    """
+    if page.publisher_is_draft:
+        page = page.publisher_public
+    if page is None:
+        return 0
+    return sum(
+        prerender_placeholder(placeholder, page, language)
+        for placeholder in page.placeholders.all()
+    )
+
+
+def get_stored_template(instance, placeholder):
+    """
+    Returns a ``StoredTemplate`` for the top-level plugin ``instance`` if its
+    subtree was pre-rendered and neither it nor its files changed since,
+    ``None`` otherwise. The subtrees are read once per placeholder and
+    render.
+    """
+    from .models import RenderedSubtree
+
+    stored = getattr(placeholder, '_aldryn_bootstrap3_rendered_subtrees', None)
+    if stored is None:
+        stored = placeholder._aldryn_bootstrap3_rendered_subtrees = {}
+    if instance.language not in stored:
+        stored[instance.language] = dict(
+            (plugin_id, (state_key, content, sekizai))
+            for plugin_id, state_key, content, sekizai in (
+                RenderedSubtree.objects
+                .filter(placeholder_id=placeholder.pk, language=instance.language)
+                .values_list('plugin_id', 'state_key', 'content', 'sekizai')
+            )
+        )
+    subtree = stored[instance.language].get(instance.pk)
+    if subtree is None:
+        return None
+    state_key, content, sekizai = subtree
+    if state_key != get_state_key(instance, placeholder):
+        metrics.increment('prerender_outdated')
+        return None
+    metrics.increment('prerender_hits')
+    return StoredTemplate(content, dict(json.loads(sekizai)) if sekizai else {})
@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import contextlib
+import threading
+
+from django.apps import apps
+from django.core.signals import request_started
+from django.db.models import signals
+
+from cms import signals as cms_signals
+from cms.models import CMSPlugin, Page
+from filer.models import File, Folder
+
+from . import cache, fragments, hashes, links, usage
+from .conf import settings
+from .model_fields import LinkMixin
+
+
+try:
+    from cms import operations
+except ImportError:
+    # django CMS < 3.4
+    operations = None
+    MOVE_OPERATIONS = ()
+else:
+    MOVE_OPERATIONS = (
+        operations.MOVE_PLUGIN,
+        operations.CUT_PLUGIN,
+        operations.PASTE_PLUGIN,
+        operations.PASTE_PLACEHOLDER,
+        operations.ADD_PLUGINS_FROM_PLACEHOLDER,
+    )
+
+
+def remember_file_state(sender, instance, raw=False, **kwargs):
+    # compared after saving to find out what changed, e.g. a file moved to
+    # another folder changes the listing of both folders
+    if raw or not instance.pk:
+        return
+    fields = ['folder_id', 'file', 'sha1']
+    if hasattr(instance, 'subject_location'):
+        fields.append('subject_location')
+    instance._aldryn_bootstrap3_old_state = (
+        sender._base_manager
+        .filter(pk=instance.pk)
+        .values(*fields)
+        .first()
+    )
+
+
+def get_old_file_state(instance):
+    return getattr(instance, '_aldryn_bootstrap3_old_state', None) or {}
+
+
+def invalidate_file_folder(sender, instance, **kwargs):
+    folder_ids = {
+        instance.folder_id,
+        get_old_file_state(instance).get('folder_id'),
+    }
+    for folder_id in folder_ids:
+        if folder_id:
+            cache.invalidate_folder(folder_id)
+
+
+def invalidate_file_usage(sender, instance, created=False, raw=False, **kwargs):
+    # the file was replaced or re-cropped
+    old_state = get_old_file_state(instance)
+    if raw or created or not old_state:
+        return
+    changed = (
+        old_state['file'] != instance.file.name or
+        old_state['sha1'] != instance.sha1 or
+        old_state.get('subject_location') != getattr(instance, 'subject_location', None)
+    )
+    if changed:
+        usage.invalidate_file(instance)
+
+
+def update_file_usage(sender, instance, raw=False, **kwargs):
+    # raw saves of bulk added plugins write their entries in one query
+    if raw:
+        return
+    usage.update_usage(instance)
+
+
+def update_file_plugins(sender, instance, raw=False, **kwargs):
+    # file plugins keep a copy of the url and size of their file
+    if raw:
+        return
+    from .models import Bootstrap3FilePlugin
+
+    Bootstrap3FilePlugin.objects.filter(file_id=instance.pk).update(
+        file_url=instance.url,
+        file_size=instance.size,
+    )
+
+
+def invalidate_file_url(sender, instance, **kwargs):
+    cache.invalidate_file_url(instance.pk)
+
+
+def invalidate_page_links(sender, instance, **kwargs):
+    links.invalidate_page_links(instance)
+
+
+def prerender_page(sender, instance, language, **kwargs):
+    if settings.ALDRYN_BOOTSTRAP3_PRERENDER:
+        # imported on first use, it renders with the cms and sekizai
+        from .prerender import prerender_page
+
+        prerender_page(instance, language)
+
+
+def update_page_link(sender, instance, raw=False, **kwargs):
+    from .models import PageLink
+
+    if raw:
+        return
+    if instance.link_page_id:
+        PageLink.objects.update_or_create(
+            plugin_id=instance.pk,
+            defaults={
+                'page_id': instance.link_page_id,
+                'placeholder_id': instance.placeholder_id,
+                'language': instance.language,
+            },
+        )
+    else:
+        PageLink.objects.filter(plugin_id=instance.pk).delete()
+
+
+def delete_page_link(sender, instance, **kwargs):
+    from .models import PageLink
+
+    PageLink.objects.filter(plugin_id=instance.pk).delete()
+
+
+def invalidate_folder(sender, instance, **kwargs):
+    cache.invalidate_folder(instance.pk)
+    fragments.bump_generation(fragments.FOLDER, instance.pk)
+
+
+def invalidate_file_fragments(sender, instance, **kwargs):
+    fragments.bump_generation(fragments.FILE, instance.pk)
+    folder_ids = {
+        instance.folder_id,
+        get_old_file_state(instance).get('folder_id'),
+    }
+    for folder_id in folder_ids:
+        if folder_id:
+            fragments.bump_generation(fragments.FOLDER, folder_id)
+
+
+# Plugins saved or deleted during a batch only mark their placeholder, its
+# hashes are rebuilt and its fragments invalidated once when the batch ends.
+_local = threading.local()
+
+
+def begin_batch(*args, **kwargs):
+    _local.batch_depth = getattr(_local, 'batch_depth', 0) + 1
+    if _local.batch_depth == 1:
+        _local.batch = set()
+
+
+def add_to_batch(placeholder_id):
+    """
+    Marks ``placeholder_id`` to be updated at the end of the current batch,
+    returns ``False`` if there is no batch.
+    """
+    placeholder_ids = getattr(_local, 'batch', None)
+    if placeholder_ids is None:
+        return False
+    placeholder_ids.add(placeholder_id)
+    return True
+
+
+def flush_batch(*args, **kwargs):
+    placeholder_ids = getattr(_local, 'batch', None)
+    if not placeholder_ids:
+        return
+    for placeholder_id in sorted(placeholder_ids):
+        hashes.rebuild_placeholder_hashes(placeholder_id)
+        fragments.bump_generation(fragments.PLACEHOLDER, placeholder_id)
+    placeholder_ids.clear()
+
+
+def end_batch(*args, **kwargs):
+    if getattr(_local, 'batch_depth', 0) > 1:
+        _local.batch_depth -= 1
+        return
+    try:
+        flush_batch()
+    finally:
+        discard_batch()
+
+
+def discard_batch(**kwargs):
+    _local.batch_depth = 0
+    _local.batch = None
+    _local.deleted = None
+
+
+@contextlib.contextmanager
+def batch():
+    """
+    Defers the hash and fragment updates of the plugins saved or deleted in
+    the block to one rebuild per placeholder when the block ends.
+    """
+    begin_batch()
+    try:
+        yield
+    except Exception:
+        discard_batch()
+        raise
+    end_batch()
+
+
+def update_placeholder(placeholder_id):
+    """
+    Rebuilds the hashes and invalidates the fragments of a placeholder whose
+    plugins changed without signals, once the current batch ends if there
+    is one.
+    """
+    if not add_to_batch(placeholder_id):
+        hashes.rebuild_placeholder_hashes(placeholder_id)
+        fragments.bump_generation(fragments.PLACEHOLDER, placeholder_id)
+
+
+def invalidate_plugin_fragments(sender, instance, raw=False, **kwargs):
+    if raw or not instance.placeholder_id or add_to_batch(instance.placeholder_id):
+        return
+    fragments.bump_generation(fragments.PLACEHOLDER, instance.placeholder_id)
+
+
+def update_plugin_hashes(sender, instance, raw=False, **kwargs):
+    if raw or add_to_batch(instance.placeholder_id):
+        return
+    hashes.update_hashes(instance)
+
+
+def remember_deleted_plugin(sender, instance, **kwargs):
+    # django sends pre_delete for all plugins of a deletion before it sends
+    # post_delete for any of them
+    if getattr(_local, 'deleted', None) is None:
+        _local.deleted = {}
+    _local.deleted[instance.pk] = [instance.placeholder_id, instance.parent_id, False]
+
+
+def update_deleted_plugins(sender, instance, **kwargs):
+    deleted = getattr(_local, 'deleted', None)
+    if not deleted or instance.pk not in deleted:
+        return
+    deleted[instance.pk][2] = True
+    if not all(done for placeholder_id, parent_id, done in deleted.values()):
+        return
+    _local.deleted = None
+    placeholder_ids = set()
+    parent_ids = set()
+    for placeholder_id, parent_id, done in deleted.values():
+        if placeholder_id and not add_to_batch(placeholder_id):
+            placeholder_ids.add(placeholder_id)
+            # parents deleted in the same go are gone already
+            if parent_id and parent_id not in deleted:
+                parent_ids.add(parent_id)
+    for parent in CMSPlugin.objects.filter(pk__in=parent_ids):
+        hashes.update_hashes(parent)
+    for placeholder_id in placeholder_ids:
+        fragments.bump_generation(fragments.PLACEHOLDER, placeholder_id)
+
+
+def update_moved_plugin_index(plugin):
+    """
+    Moves the page links and file usages of ``plugin`` and its descendants
+    to the placeholder and language the plugin was moved to.
+    """
+    from .models import FileUsage, PageLink
+
+    root = CMSPlugin.objects.filter(pk=plugin.pk).values('path', 'placeholder_id', 'language').first()
+    if root is None:
+        return
+    subtree = CMSPlugin.objects.filter(path__startswith=root['path']).values('pk')
+    for model in (PageLink, FileUsage):
+        model.objects.filter(plugin_id__in=subtree).update(
+            placeholder_id=root['placeholder_id'],
+            language=root['language'],
+        )
+
+
+def invalidate_moved_plugins(sender, operation, **kwargs):
+    # the cms moves plugins with queryset updates, without saving them
+    if operation not in MOVE_OPERATIONS:
+        return
+    if operation in (operations.MOVE_PLUGIN, operations.CUT_PLUGIN) and kwargs.get('plugin'):
+        update_moved_plugin_index(kwargs['plugin'])
+    placeholders = {
+        kwargs.get(name) for name in
+        ('placeholder', 'source_placeholder', 'target_placeholder', 'clipboard')
+    }
+    for placeholder in placeholders:
+        if placeholder:
+            update_placeholder(placeholder.pk)
+
+
+def get_file_models():
+    return [model for model in apps.get_models() if issubclass(model, File)]
+
+
+def get_link_models():
+    return [model for model in apps.get_models() if issubclass(model, LinkMixin)]
+
+
+def get_plugin_models():
+    return [
+        model for model in apps.get_models()
+        if issubclass(model, CMSPlugin) and model is not CMSPlugin
+    ]
+
+
+def connect():
+    # filer file models are polymorphic, signals are sent with the concrete
+    # model as sender
+    for model in get_file_models():
+        uid = 'aldryn_bootstrap3_{}'.format(model._meta.label_lower)
+        signals.pre_save.connect(remember_file_state, sender=model, dispatch_uid=uid)
+        signals.post_save.connect(invalidate_file_folder, sender=model, dispatch_uid=uid)
+        signals.post_delete.connect(invalidate_file_folder, sender=model, dispatch_uid=uid)
+        signals.post_save.connect(update_file_plugins, sender=model, dispatch_uid=uid + '_plugins')
+        signals.post_save.connect(invalidate_file_url, sender=model, dispatch_uid=uid + '_url')
+        signals.post_delete.connect(invalidate_file_url, sender=model, dispatch_uid=uid + '_url')
+        signals.post_save.connect(invalidate_file_usage, sender=model, dispatch_uid=uid + '_usage')
+        signals.post_save.connect(invalidate_file_fragments, sender=model, dispatch_uid=uid + '_fragments')
+        signals.post_delete.connect(invalidate_file_fragments, sender=model, dispatch_uid=uid + '_fragments')
+    signals.post_save.connect(invalidate_folder, sender=Folder, dispatch_uid='aldryn_bootstrap3_folder')
+    signals.post_delete.connect(invalidate_folder, sender=Folder, dispatch_uid='aldryn_bootstrap3_folder')
+    for model in usage.get_usage_models():
+        uid = 'aldryn_bootstrap3_{}_usage'.format(model._meta.label_lower)
+        signals.post_save.connect(update_file_usage, sender=model, dispatch_uid=uid)
+    for model in get_link_models():
+        uid = 'aldryn_bootstrap3_{}'.format(model._meta.label_lower)
+        signals.post_save.connect(update_page_link, sender=model, dispatch_uid=uid)
+        signals.post_delete.connect(delete_page_link, sender=model, dispatch_uid=uid)
+    cms_signals.post_publish.connect(invalidate_page_links, sender=Page, dispatch_uid='aldryn_bootstrap3_page_links')
+    cms_signals.post_unpublish.connect(invalidate_page_links, sender=Page, dispatch_uid='aldryn_bootstrap3_page_links')
+    cms_signals.page_moved.connect(invalidate_page_links, sender=Page, dispatch_uid='aldryn_bootstrap3_page_links')
+    # after invalidate_page_links, which may change the fragment keys
+    cms_signals.post_publish.connect(prerender_page, sender=Page, dispatch_uid='aldryn_bootstrap3_prerender')
+    # base plugin saves are followed by a save of the plugin model
+    for model in get_plugin_models():
+        uid = 'aldryn_bootstrap3_{}'.format(model._meta.label_lower)
+        signals.post_save.connect(update_plugin_hashes, sender=model, dispatch_uid=uid + '_hashes')
+        signals.post_save.connect(invalidate_plugin_fragments, sender=model, dispatch_uid=uid + '_fragments')
+    signals.post_save.connect(
+        invalidate_plugin_fragments, sender=CMSPlugin,
+        dispatch_uid='aldryn_bootstrap3_plugin_fragments',
+    )
+    signals.pre_delete.connect(
+        remember_deleted_plugin, sender=CMSPlugin,
+        dispatch_uid='aldryn_bootstrap3_deleted_plugins',
+    )
+    signals.post_delete.connect(
+        update_deleted_plugins, sender=CMSPlugin,
+        dispatch_uid='aldryn_bootstrap3_deleted_plugins',
+    )
+    if operations:
+        # plugins pasted or copied by an operation are updated in one go
+        cms_signals.pre_placeholder_operation.connect(
+            begin_batch, dispatch_uid='aldryn_bootstrap3_plugin_batch',
+        )
+        cms_signals.post_placeholder_operation.connect(
+            invalidate_moved_plugins,
+            dispatch_uid='aldryn_bootstrap3_plugin_hashes',
+        )
+        cms_signals.post_placeholder_operation.connect(
+            end_batch, dispatch_uid='aldryn_bootstrap3_plugin_batch',
+        )
+    # operations failing before their post signal leave a batch behind
+    request_started.connect(discard_batch, dispatch_uid='aldryn_bootstrap3_plugin_batch')
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import logging
+import os
+import threading
+
+from django.template import TemplateDoesNotExist, engines
+from django.template.loader import get_template
+from django.template.utils import get_app_template_dirs
+
+from .conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+# templates every carousel style needs, see CarouselSlideBase.get_slide_template
+CAROUSEL_TEMPLATES = ('carousel', 'slide', 'image_slide', 'slide_folder')
+CAROUSEL_TEMPLATE_DIR = os.path.join('aldryn_bootstrap3', 'plugins', 'carousel')
+
+
+def get_style_template_names(style):
+    return [
+        'aldryn_bootstrap3/plugins/carousel/{}/{}.html'.format(style, name)
+        for name in CAROUSEL_TEMPLATES
+    ]
+
+
+def get_styles():
+    from .models import Bootstrap3CarouselPlugin
+
+    styles = []
+    for style, label in Bootstrap3CarouselPlugin._meta.get_field('style').choices:
+        # the standard style may be listed in the settings again
+        if style not in styles:
+            styles.append(style)
+    return styles
+
+
+def check_templates(style):
+    """
+    Loads the templates of ``style``, returns the names of the missing
+    templates and a dict mapping the names of the templates failing to
+    compile to the error.
+    """
+    missing, errors = [], {}
+    for name in get_style_template_names(style):
+        try:
+            get_template(name)
+        except TemplateDoesNotExist:
+            missing.append(name)
+        except Exception as error:
+            # broken templates must not stop the process from starting
+            errors[name] = error
+    return missing, errors
+
+
+def log_style(style, missing, errors):
+    if missing:
+        logger.warning(
+            'Carousel style %s is missing templates: %s',
+            style, ', '.join(missing),
+        )
+    for name, error in sorted(errors.items()):
+        logger.error(
+            'Carousel style %s is invalid, template %s failed to compile: %s',
+            style, name, error,
+        )
+
+
+def get_template_dirs():
+    dirs = list(get_app_template_dirs('templates'))
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is not None:
+            dirs.extend(engine.dirs)
+    return dirs
+
+
+def get_signature():
+    """
+    Modification times of the carousel template directories and of their
+    style directories, adding or removing a style template changes them.
+    """
+    signature = []
+    for template_dir in get_template_dirs():
+        path = os.path.join(template_dir, CAROUSEL_TEMPLATE_DIR)
+        if not os.path.isdir(path):
+            continue
+        signature.append((path, os.stat(path).st_mtime))
+        for name in sorted(os.listdir(path)):
+            style_path = os.path.join(path, name)
+            if os.path.isdir(style_path):
+                signature.append((style_path, os.stat(style_path).st_mtime))
+    return signature
+
+
+class StyleRegistry(object):
+    """
+    Records the missing and broken templates of the carousel styles. It is
+    loaded once on startup and reloaded when the template directories change
+    if ``DEBUG`` is on.
+    """
+
+    def __init__(self):
+        self.styles = None
+        self.errors = None
+        self.signature = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        """
+        Checks the templates of all configured styles and logs the
+        incomplete and invalid ones.
+        """
+        styles, errors = {}, {}
+        for style in get_styles():
+            styles[style], errors[style] = check_templates(style)
+            log_style(style, styles[style], errors[style])
+        with self.lock:
+            self.styles = styles
+            self.errors = errors
+            self.signature = get_signature() if settings.DEBUG else None
+
+    def reload_if_changed(self):
+        if self.styles is None:
+            self.load()
+        elif settings.DEBUG and get_signature() != self.signature:
+            self.load()
+
+    def check(self, style):
+        """
+        Returns the names of the missing templates of ``style`` and a dict
+        mapping its broken templates to the error, styles added to the
+        settings later on are checked on first use.
+        """
+        self.reload_if_changed()
+        with self.lock:
+            styles, errors = self.styles, self.errors
+        if style not in styles:
+            missing, style_errors = check_templates(style)
+            log_style(style, missing, style_errors)
+            with self.lock:
+                self.styles = dict(self.styles, **{style: missing})
+                self.errors = dict(self.errors, **{style: style_errors})
+            return missing, style_errors
+        return styles[style], errors[style]
+
+    def get_missing_templates(self, style):
+        return self.check(style)[0]
+
+    def get_errors(self, style):
+        return self.check(style)[1]
+
+    def is_complete(self, style):
+        missing, errors = self.check(style)
+        return not missing and not errors
+
+
+registry = StyleRegistry()
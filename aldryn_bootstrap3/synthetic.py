@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import collections
+import io
+import random
+
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils.six.moves import range
+
+from cms.api import create_page
+from cms.models import CMSPlugin
+from cms.plugin_pool import plugin_pool
+from cms.utils.conf import get_cms_setting
+from filer.models import File, Folder, Image
+from PIL import Image as PILImage
+
+from . import hashes, usage
+
+
+WORDS = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod '
+    'tempor incididunt ut labore et dolore magna aliqua enim ad minim veniam '
+    'quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo'
+).split()
+
+# relative frequency of each plugin type, containers are picked with their
+# allowed children only
+DEFAULT_MIX = {
+    'Bootstrap3RowCMSPlugin': 6,
+    'Bootstrap3ColumnCMSPlugin': 10,
+    'Bootstrap3BlockquoteCMSPlugin': 1,
+    'Bootstrap3CiteCMSPlugin': 1,
+    'Bootstrap3ButtonCMSPlugin': 6,
+    'Bootstrap3CodeCMSPlugin': 1,
+    'Bootstrap3ImageCMSPlugin': 5,
+    'Bootstrap3ResponsiveCMSPlugin': 1,
+    'Bootstrap3IconCMSPlugin': 2,
+    'Bootstrap3LabelCMSPlugin': 4,
+    'Bootstrap3JumbotronCMSPlugin': 1,
+    'Bootstrap3AlertCMSPlugin': 2,
+    'Bootstrap3ListGroupCMSPlugin': 1,
+    'Bootstrap3ListGroupItemCMSPlugin': 3,
+    'Bootstrap3PanelCMSPlugin': 2,
+    'Bootstrap3PanelHeadingCMSPlugin': 2,
+    'Bootstrap3PanelBodyCMSPlugin': 2,
+    'Bootstrap3PanelFooterCMSPlugin': 1,
+    'Bootstrap3WellCMSPlugin': 2,
+    'Bootstrap3TabCMSPlugin': 1,
+    'Bootstrap3TabItemCMSPlugin': 3,
+    'Bootstrap3AccordionCMSPlugin': 1,
+    'Bootstrap3AccordionItemCMSPlugin': 3,
+    'Bootstrap3CarouselCMSPlugin': 1,
+    'Bootstrap3CarouselSlideCMSPlugin': 4,
+    'Bootstrap3CarouselSlideFolderCMSPlugin': 1,
+    'Bootstrap3SpacerCMSPlugin': 1,
+    'Bootstrap3FileCMSPlugin': 2,
+}
+
+# fields set by the generator itself or left to their defaults
+SKIPPED_FIELDS = ('cmsplugin_ptr', 'classes', 'attributes', 'link_attributes')
+
+
+def parse_mix(value):
+    """
+    Parses ``Row=5,Label=0`` into a dict of plugin types and weights, the
+    ``Bootstrap3`` prefix and ``CMSPlugin`` suffix may be left out.
+    """
+    mix = {}
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if not name.startswith('Bootstrap3'):
+            name = 'Bootstrap3' + name
+        if not name.endswith('CMSPlugin'):
+            name += 'CMSPlugin'
+        if name not in DEFAULT_MIX:
+            raise ValueError('Unknown plugin type {}.'.format(name))
+        mix[name] = float(weight)
+    return mix
+
+
+class Node(object):
+    """
+    A plugin to insert with its children.
+    """
+    __slots__ = ('instance', 'children')
+
+    def __init__(self, instance):
+        self.instance = instance
+        self.children = []
+
+
+class SiteGenerator(object):
+    """
+    Generates pages filled with random Bootstrap3 plugins, the same ``seed``
+    generates the same site.
+
+    Plugins are inserted with a few bulk queries per tree level instead of
+    being saved one by one, which skips the signal handlers; the content
+    hashes, the file usage and page link indexes are built afterwards.
+    """
+
+    def __init__(self, seed=0, mix=None, plugins=100, depth=4, children=5,
+                 images=10, files=5, language='en', template=None):
+        self.random = random.Random(seed)
+        self.mix = dict(DEFAULT_MIX, **(mix or {}))
+        self.plugins = plugins
+        self.depth = depth
+        self.children = children
+        self.image_count = images
+        self.file_count = files
+        self.language = language
+        self.template = template or get_cms_setting('TEMPLATES')[0][0]
+        self.folder = None
+        self.images = []
+        self.files = []
+        self.pages = []
+        self.plugin_count = 0
+
+    def get_words(self, count):
+        return ' '.join(self.random.choice(WORDS) for i in range(count))
+
+    def create_files(self):
+        self.folder = Folder.objects.create(name='Synthetic {}'.format(self.get_words(2)))
+        for i in range(self.image_count):
+            color = tuple(self.random.randint(0, 255) for channel in range(3))
+            data = io.BytesIO()
+            PILImage.new('RGB', (800, 600), color).save(data, 'JPEG')
+            name = 'synthetic-{}.jpg'.format(i)
+            self.images.append(Image.objects.create(
+                folder=self.folder,
+                original_filename=name,
+                file=ContentFile(data.getvalue(), name),
+            ))
+        for i in range(self.file_count):
+            name = 'synthetic-{}.txt'.format(i)
+            content = self.get_words(self.random.randint(10, 1000))
+            self.files.append(File.objects.create(
+                folder=self.folder,
+                original_filename=name,
+                file=ContentFile(content.encode('utf-8'), name),
+            ))
+
+    def get_allowed_types(self, parent_type):
+        if parent_type is None:
+            parent = None
+        else:
+            parent = plugin_pool.get_plugin(parent_type)
+        allowed = []
+        for plugin_type, weight in sorted(self.mix.items()):
+            plugin = plugin_pool.get_plugin(plugin_type)
+            if weight <= 0:
+                continue
+            if parent is None:
+                if plugin.require_parent or plugin.parent_classes:
+                    continue
+            elif parent.child_classes and plugin_type not in parent.child_classes:
+                continue
+            elif plugin.parent_classes and parent_type not in plugin.parent_classes:
+                continue
+            allowed.append((plugin_type, weight))
+        return allowed
+
+    def choose_type(self, parent_type):
+        allowed = self.get_allowed_types(parent_type)
+        if not allowed:
+            return None
+        value = self.random.uniform(0, sum(weight for plugin_type, weight in allowed))
+        for plugin_type, weight in allowed:
+            value -= weight
+            if value <= 0:
+                break
+        return plugin_type
+
+    def get_values(self, plugin_type, model):
+        """
+        Returns field values for a plugin: random choices, texts and links
+        to the generated pages, images and files.
+        """
+        values = {}
+        for field in model._meta.local_concrete_fields:
+            if field.name in SKIPPED_FIELDS or not field.choices:
+                continue
+            values[field.name] = self.random.choice(field.choices)[0]
+        for name in ('label', 'title', 'name', 'alt'):
+            if any(field.name == name for field in model._meta.local_fields):
+                values[name] = self.get_words(self.random.randint(1, 4))
+        if plugin_type in ('Bootstrap3ButtonCMSPlugin', 'Bootstrap3CarouselSlideCMSPlugin'):
+            values['link_target'] = ''
+            if self.pages and self.random.random() < 0.5:
+                values['link_page'] = self.random.choice(self.pages)
+            else:
+                values['link_url'] = 'https://example.com/{}'.format(self.random.randint(1, 1000))
+        if plugin_type == 'Bootstrap3CarouselSlideCMSPlugin':
+            values['content'] = '<p>{}</p>'.format(self.get_words(10))
+        if plugin_type in ('Bootstrap3CarouselSlideCMSPlugin', 'Bootstrap3ImageCMSPlugin'):
+            field = 'image' if plugin_type == 'Bootstrap3CarouselSlideCMSPlugin' else 'file'
+            values[field] = self.random.choice(self.images) if self.images else None
+        if plugin_type == 'Bootstrap3CarouselSlideFolderCMSPlugin':
+            values['folder'] = self.folder
+        if plugin_type == 'Bootstrap3FileCMSPlugin':
+            values['file'] = self.random.choice(self.files) if self.files else None
+        if plugin_type == 'Bootstrap3CodeCMSPlugin':
+            values['code'] = '\n'.join(self.get_words(6) for i in range(5))
+        if plugin_type == 'Bootstrap3ColumnCMSPlugin':
+            values['xs_col'] = self.random.randint(1, 12)
+        return values
+
+    def create_instance(self, plugin_type):
+        model = plugin_pool.get_plugin(plugin_type).model
+        instance = model(plugin_type=plugin_type, **self.get_values(plugin_type, model))
+        # done by save() otherwise
+        for name in ('update_file_cache', 'update_highlighted_code'):
+            if hasattr(instance, name):
+                getattr(instance, name)()
+        return instance
+
+    def generate_nodes(self, parent_type, depth, count, budget):
+        nodes = []
+        while len(nodes) < count and budget[0] > 0:
+            plugin_type = self.choose_type(parent_type)
+            if plugin_type is None:
+                break
+            budget[0] -= 1
+            node = Node(self.create_instance(plugin_type))
+            if plugin_pool.get_plugin(plugin_type).allow_children and depth < self.depth:
+                node.children = self.generate_nodes(
+                    plugin_type, depth + 1, self.random.randint(0, self.children), budget,
+                )
+            nodes.append(node)
+        return nodes
+
+    def generate_tree(self, count):
+        """
+        Returns the root nodes of ``count`` plugins at most.
+        """
+        return self.generate_nodes(None, 1, count, [count])
+
+    def create_page(self, index):
+        parent = self.random.choice(self.pages) if self.pages else None
+        page = create_page(
+            'Page {}'.format(index),
+            self.template,
+            self.language,
+            parent=parent,
+            published=True,
+        )
+        self.pages.append(page)
+        return page
+
+    def generate(self, pages):
+        """
+        Creates ``pages`` published pages with their plugins and returns them.
+        """
+        self.create_files()
+        trees = []
+        for index in range(pages):
+            page = self.create_page(index)
+            draft_placeholders = list(page.placeholders.order_by('slot'))
+            public_placeholders = {
+                placeholder.slot: placeholder
+                for placeholder in page.get_public_object().placeholders.all()
+            }
+            per_placeholder = max(self.plugins // max(len(draft_placeholders), 1), 1)
+            for placeholder in draft_placeholders:
+                state = self.random.getstate()
+                trees.append((placeholder, self.generate_tree(per_placeholder)))
+                public = public_placeholders.get(placeholder.slot)
+                if public is not None:
+                    # the same plugins on the public page
+                    self.random.setstate(state)
+                    trees.append((public, self.generate_tree(per_placeholder)))
+        with transaction.atomic():
+            insert_trees(trees, self.language)
+        self.plugin_count += sum(count_nodes(nodes) for placeholder, nodes in trees)
+        return self.pages[-pages:] if pages else []
+
+
+def count_nodes(nodes):
+    return sum(1 + count_nodes(node.children) for node in nodes)
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def insert_trees(trees, language):
+    """
+    Inserts the plugins of ``trees``, ``(placeholder, root nodes)`` tuples,
+    with one ``bulk_create`` per tree level and plugin model.
+    """
+    last_root = CMSPlugin.get_last_root_node()
+    step = last_root._get_lastpos_in_path() + 1 if last_root else 1
+    # (node, parent node, placeholder, depth, path, position) by depth
+    levels = collections.defaultdict(list)
+    for placeholder, nodes in trees:
+        for position, node in enumerate(nodes):
+            path = CMSPlugin._get_path(None, 1, step)
+            step += 1
+            levels[1].append((node, None, placeholder, 1, path, position))
+    depth = 1
+    while levels[depth]:
+        for node, parent, placeholder, node_depth, path, position in levels[depth]:
+            for child_position, child in enumerate(node.children):
+                levels[depth + 1].append((
+                    child, node, placeholder, depth + 1,
+                    CMSPlugin._get_path(path, depth + 1, child_position + 1),
+                    child_position,
+                ))
+        depth += 1
+
+    instances = []
+    for depth in sorted(levels):
+        bases = [
+            CMSPlugin(
+                parent_id=parent.instance.pk if parent else None,
+                placeholder=placeholder,
+                language=language,
+                plugin_type=node.instance.plugin_type,
+                position=position,
+                depth=node_depth,
+                path=path,
+                numchild=len(node.children),
+            ) for node, parent, placeholder, node_depth, path, position in levels[depth]
+        ]
+        CMSPlugin.objects.bulk_create(bases)
+        # not every database backend returns primary keys from bulk inserts
+        pks = {}
+        for paths in chunks([base.path for base in bases], 500):
+            pks.update(CMSPlugin.objects.filter(path__in=paths).values_list('path', 'pk'))
+        for base, level in zip(bases, levels[depth]):
+            base.pk = pks[base.path]
+            instance = level[0].instance
+            base.set_base_attr(instance)
+            instance.changed_date = base.changed_date
+            instances.append(instance)
+
+    by_model = collections.defaultdict(list)
+    for instance in instances:
+        by_model[type(instance)].append(instance)
+    for model, model_instances in by_model.items():
+        # bulk_create() does not support multi-table inheritance, insert the
+        # rows of the plugin table only
+        fields = model._meta.local_concrete_fields
+        batch_size = max(connection.ops.bulk_batch_size(fields, model_instances), 1)
+        for batch in chunks(model_instances, batch_size):
+            model._base_manager._insert(batch, fields=fields, using=connection.alias)
+
+    build_indexes(instances, set(placeholder.pk for placeholder, nodes in trees))
+
+
+def build_indexes(instances, placeholder_ids):
+    from .models import FileUsage, PageLink
+
+    FileUsage.objects.bulk_create(
+        [entry for instance in instances for entry in usage.get_usage_entries(instance)],
+        batch_size=500,
+    )
+    PageLink.objects.bulk_create([
+        PageLink(
+            plugin_id=instance.pk,
+            page_id=instance.link_page_id,
+            placeholder_id=instance.placeholder_id,
+            language=instance.language,
+        ) for instance in instances if getattr(instance, 'link_page_id', None)
+    ], batch_size=500)
+    for placeholder_id in sorted(placeholder_ids):
+        hashes.rebuild_placeholder_hashes(placeholder_id)
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import functools
+import logging
+import threading
+import time
+
+from django.db import close_old_connections
+from django.utils.six.moves import queue
+
+from . import metrics
+from .conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+# Thumbnail jobs are processed one at a time by a single daemon thread per
+# process, so a bulk upload of 40 images does not hold up the request that
+# created the slides.
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def generate_thumbnails(image, options_list):
+    """
+    Generate all thumbnails described by ``options_list`` for a filer image.
+    Returns the number of thumbnails generated.
+    """
+    count = 0
+    for options in options_list:
+        options = dict(options)
+        options.setdefault('subject_location', image.subject_location)
+        try:
+            image.file.get_thumbnail(options)
+        except Exception:
+            logger.exception(
+                'Failed to generate thumbnail for image %s', image.pk
+            )
+        else:
+            count += 1
+    return count
+
+
+def install_generation_timing():
+    """
+    Observes the duration of every thumbnail easy-thumbnails generates in
+    ``thumbnail_generation_seconds``, including the thumbnails generated by
+    the ``{% thumbnail %}`` tag while plugins are rendered. Called by the
+    ``AppConfig`` if ``ALDRYN_BOOTSTRAP3_METRICS`` is enabled.
+    """
+    from easy_thumbnails.files import Thumbnailer
+
+    generate_thumbnail = Thumbnailer.generate_thumbnail
+    if getattr(generate_thumbnail, 'aldryn_bootstrap3_timed', False):
+        return
+
+    @functools.wraps(generate_thumbnail)
+    def timed_generate_thumbnail(*args, **kwargs):
+        if not settings.ALDRYN_BOOTSTRAP3_METRICS:
+            return generate_thumbnail(*args, **kwargs)
+        started = time.time()
+        try:
+            return generate_thumbnail(*args, **kwargs)
+        finally:
+            metrics.observe('thumbnail_generation_seconds', time.time() - started)
+
+    timed_generate_thumbnail.aldryn_bootstrap3_timed = True
+    Thumbnailer.generate_thumbnail = timed_generate_thumbnail
+
+
+def _work():
+    while True:
+        image, options_list = _queue.get()
+        try:
+            generate_thumbnails(image, options_list)
+        finally:
+            close_old_connections()
+            _queue.task_done()
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_work,
+                name='aldryn-bootstrap3-thumbnails',
+            )
+            _worker.daemon = True
+            _worker.start()
+
+
+def queue_thumbnails(images, options_list):
+    """
+    Queue thumbnail generation for ``images`` in the background.
+
+    ``options_list`` is a list of easy-thumbnails option dicts, usually taken
+    from a plugin's ``srcset()``. Thumbnails are generated right away if
+    ``ALDRYN_BOOTSTRAP3_THUMBNAILS_ASYNC`` is disabled.
+    """
+    options_list = [
+        {
+            'size': options['size'],
+            'crop': options['crop'],
+            'upscale': options['upscale'],
+        } for options in options_list
+    ]
+    if not settings.ALDRYN_BOOTSTRAP3_THUMBNAILS_ASYNC:
+        for image in images:
+            generate_thumbnails(image, options_list)
+        return
+    _ensure_worker()
+    for image in images:
+        _queue.put((image, options_list))
+
+
+def wait_for_thumbnails():
+    """
+    Block until all queued thumbnails have been generated.
+    """
+    _queue.join()
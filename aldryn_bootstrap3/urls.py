@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from django.conf.urls import url
+
+from . import views
+
+
+urlpatterns = [
+    url(
+        r'^file/(?P<pk>[0-9]+)/download/$',
+        views.file_download,
+        name='aldryn_bootstrap3_file_download'
+    ),
+    url(
+        r'^metrics/$',
+        views.metrics_view,
+        name='aldryn_bootstrap3_metrics'
+    ),
+]
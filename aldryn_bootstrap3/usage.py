@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Q
+
+from cms.models import CMSPlugin
+from filer.fields.file import FilerFileField
+from filer.fields.folder import FilerFolderField
+
+from . import utils
+
+
+def get_usage_fields(model):
+    """
+    Returns the fields of ``model`` pointing at filer files or folders.
+    """
+    return [
+        field for field in model._meta.fields
+        if isinstance(field, (FilerFileField, FilerFolderField))
+    ]
+
+
+def get_usage_models():
+    """
+    Returns the plugin models of this addon using filer files or folders.
+    """
+    return [
+        model for model in apps.get_app_config('aldryn_bootstrap3').get_models()
+        if issubclass(model, CMSPlugin) and get_usage_fields(model)
+    ]
+
+
+def get_usage_entries(instance):
+    """
+    Returns the unsaved usage index entries of the plugin ``instance``.
+    """
+    from .models import FileUsage
+
+    usages = []
+    for field in get_usage_fields(instance.__class__):
+        value = getattr(instance, field.attname)
+        if not value:
+            continue
+        usage = FileUsage(
+            plugin_id=instance.pk,
+            field_name=field.name,
+            placeholder_id=instance.placeholder_id,
+            language=instance.language,
+        )
+        if isinstance(field, FilerFolderField):
+            usage.folder_id = value
+        else:
+            usage.file_id = value
+        usages.append(usage)
+    return usages
+
+
+def update_usage(instance):
+    """
+    Replaces the usage index entries of the plugin ``instance``.
+    """
+    from .models import FileUsage
+
+    usages = get_usage_entries(instance)
+    with transaction.atomic():
+        FileUsage.objects.filter(plugin_id=instance.pk).delete()
+        FileUsage.objects.bulk_create(usages)
+
+
+def get_file_usage(file_obj):
+    """
+    Returns the usage index entries of the plugins showing ``file_obj``,
+    directly or through its folder.
+    """
+    from .models import FileUsage
+
+    query = Q(file_id=file_obj.pk)
+    if file_obj.folder_id:
+        query |= Q(folder_id=file_obj.folder_id)
+    return FileUsage.objects.filter(query)
+
+
+def get_folder_usage(folder):
+    from .models import FileUsage
+
+    return FileUsage.objects.filter(folder_id=folder.pk)
+
+
+def get_plugins_using_file(file_obj):
+    """
+    Returns a queryset of the plugins showing ``file_obj``.
+    """
+    plugin_ids = get_file_usage(file_obj).values('plugin_id')
+    return CMSPlugin.objects.filter(pk__in=plugin_ids)
+
+
+def invalidate_file(file_obj, thumbnails=True):
+    """
+    Invalidates the cached content of the placeholders showing ``file_obj``
+    and optionally deletes its thumbnails, e.g. after the file was replaced
+    or its subject location changed.
+    """
+    if thumbnails and file_obj.file:
+        file_obj.file.delete_thumbnails()
+    rows = (
+        get_file_usage(file_obj)
+        .values_list('placeholder_id', 'language')
+        .distinct()
+    )
+    utils.clear_placeholder_caches(rows)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import collections
+import functools
+import operator
+
+from django.db import transaction
+from django.db.models import F, Q
+
+from cms.models import CMSPlugin, Placeholder
+from treebeard.exceptions import PathOverflow
+
+from . import fragments
+
+
+def bulk_add_child_plugins(parent, instances):
+    """
+    Add ``instances`` (unsaved plugin model instances) as the last children
+    of ``parent`` using a fixed number of tree queries.
+
+    ``cms.api.add_plugin`` and ``CMSPlugin.save()`` walk the tree for every
+    single plugin; here the tree paths are computed up front, all base
+    ``CMSPlugin`` rows are inserted with one ``bulk_create`` and the parent
+    is updated once. The hashes of the placeholder are rebuilt once and the
+    file usage and page link entries are written with one query each as
+    well. ``plugin_type`` has to be set on every instance.
+    """
+    instances = list(instances)
+    if not instances:
+        return []
+
+    depth = parent.depth + 1
+    last_child = parent.get_last_child()
+    if last_child:
+        step = last_child._get_lastpos_in_path() + 1
+    else:
+        step = 1
+    position = CMSPlugin.objects.filter(parent=parent).count()
+
+    bases = []
+    for offset, instance in enumerate(instances):
+        path = CMSPlugin._get_path(parent.path, depth, step + offset)
+        if len(path) != depth * CMSPlugin.steplen:
+            raise PathOverflow('Path Overflow from: {}'.format(parent.path))
+        bases.append(CMSPlugin(
+            parent_id=parent.pk,
+            placeholder_id=parent.placeholder_id,
+            language=parent.language,
+            plugin_type=instance.plugin_type,
+            position=position + offset,
+            depth=depth,
+            path=path,
+            numchild=0,
+        ))
+
+    from . import links, usage
+    from .models import FileUsage, PageLink
+
+    with transaction.atomic():
+        CMSPlugin.objects.bulk_create(bases)
+        # Not every database backend returns primary keys from bulk inserts,
+        # paths are unique so use them to look the new rows up again.
+        pks = dict(
+            CMSPlugin.objects
+            .filter(path__in=[base.path for base in bases])
+            .values_list('path', 'pk')
+        )
+        for base, instance in zip(bases, instances):
+            base.pk = pks[base.path]
+            base.set_base_attr(instance)
+            instance.changed_date = base.changed_date
+            # raw saves skip the parent table, which is already populated.
+            instance.save_base(raw=True, force_insert=True)
+        FileUsage.objects.bulk_create([
+            entry for instance in instances for entry in usage.get_usage_entries(instance)
+        ])
+        PageLink.objects.bulk_create([
+            link for link in map(links.get_page_link, instances) if link
+        ])
+        CMSPlugin.objects.filter(pk=parent.pk).update(
+            numchild=F('numchild') + len(instances),
+        )
+        parent.numchild += len(instances)
+        if parent.placeholder_id:
+            from .signals import update_placeholder
+
+            parent.placeholder.mark_as_dirty(parent.language, clear_cache=True)
+            # raw saves skip the hash and fragment updates of each plugin
+            update_placeholder(parent.placeholder_id)
+    return instances
+
+
+def clear_placeholder_caches(rows):
+    """
+    Clears the cms placeholder cache, the plugin fragments and the
+    pre-rendered subtrees for ``(placeholder_id, language)`` pairs with one
+    query for all placeholders.
+    """
+    from .models import RenderedSubtree
+
+    languages = collections.defaultdict(set)
+    for placeholder_id, language in rows:
+        if placeholder_id:
+            languages[placeholder_id].add(language)
+    if languages:
+        # e.g. urls of linked pages, which are not part of their state key
+        RenderedSubtree.objects.filter(functools.reduce(operator.or_, (
+            Q(placeholder_id=placeholder_id, language__in=placeholder_languages)
+            for placeholder_id, placeholder_languages in languages.items()
+        ))).delete()
+    for placeholder in Placeholder.objects.filter(pk__in=languages):
+        fragments.bump_generation(fragments.PLACEHOLDER, placeholder.pk)
+        for language in sorted(languages[placeholder.pk]):
+            placeholder.clear_cache(language)
+
+
+def invalidate_placeholders(rows):
+    """
+    Rebuilds the hashes and clears the caches of ``(placeholder_id,
+    language)`` pairs whose plugins were changed with queryset updates.
+    """
+    from .signals import update_placeholder
+
+    rows = set(rows)
+    for placeholder_id in sorted(set(placeholder_id for placeholder_id, language in rows if placeholder_id)):
+        update_placeholder(placeholder_id)
+    clear_placeholder_caches(rows)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition, require_safe
+
+from . import downloads, metrics
+from .conf import settings
+from .models import Bootstrap3FilePlugin
+
+
+def get_download_file(request, pk):
+    # etag, last modified and view all need the file, look it up once
+    if not hasattr(request, '_aldryn_bootstrap3_file'):
+        plugin = get_object_or_404(
+            Bootstrap3FilePlugin.objects.select_related('file'),
+            pk=pk,
+        )
+        file_obj = plugin.file
+        if file_obj is None or not file_obj.file:
+            raise Http404
+        if not file_obj.is_public and not file_obj.has_read_permission(request):
+            raise Http404
+        request._aldryn_bootstrap3_file = file_obj
+    return request._aldryn_bootstrap3_file
+
+
+def file_etag(request, pk):
+    return downloads.get_etag(get_download_file(request, pk))
+
+
+def file_last_modified(request, pk):
+    return get_download_file(request, pk).modified_at
+
+
+@require_safe
+@condition(etag_func=file_etag, last_modified_func=file_last_modified)
+def file_download(request, pk):
+    """
+    Delivers the file of a file plugin, see ``downloads.serve``.
+    """
+    file_obj = get_download_file(request, pk)
+    response = downloads.serve(request, file_obj)
+    if request.method == 'GET' and response.status_code in (200, 206, 302):
+        downloads.download_counter.add(file_obj.pk)
+    return response
+
+
+@require_safe
+def metrics_view(request):
+    """
+    Serves the metrics of this process in the Prometheus text format, if
+    ``ALDRYN_BOOTSTRAP3_METRICS`` is enabled.
+    """
+    if not settings.ALDRYN_BOOTSTRAP3_METRICS:
+        raise Http404
+    return HttpResponse(
+        metrics.render_text(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
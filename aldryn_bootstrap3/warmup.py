@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals, absolute_import
+
+import collections
+import threading
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.db.models import Q
+from django.utils import translation
+from django.utils.encoding import force_text
+
+from cms.models import CMSPlugin, Page, Placeholder, Title
+from cms.plugin_pool import plugin_pool
+from cms.plugin_rendering import ContentRenderer
+from sekizai.context import SekizaiContext
+
+
+# A placeholder of a published page to render in one of its languages.
+WarmupTask = collections.namedtuple('WarmupTask', ['placeholder', 'page', 'language'])
+
+
+class TimingStats(object):
+    """
+    Collects render times per plugin type, shared by the worker threads.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def add(self, plugin_type, seconds):
+        with self.lock:
+            count, total, maximum = self.data.get(plugin_type, (0, 0.0, 0.0))
+            self.data[plugin_type] = (count + 1, total + seconds, max(maximum, seconds))
+
+    def get_rows(self):
+        """
+        Returns ``(plugin_type, count, total, mean, max)`` tuples, slowest
+        plugin types first.
+        """
+        with self.lock:
+            rows = [
+                (plugin_type, count, total, total / count, maximum)
+                for plugin_type, (count, total, maximum) in self.data.items()
+            ]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+
+class TimingContentRenderer(ContentRenderer):
+    """
+    Records the time spent rendering each plugin, without the time spent
+    rendering its children.
+    """
+
+    def __init__(self, request, stats):
+        super(TimingContentRenderer, self).__init__(request)
+        self.stats = stats
+        self._child_times = []
+
+    def render_plugin(self, instance, context, placeholder=None, editable=False):
+        self._child_times.append(0.0)
+        started = time.time()
+        try:
+            return super(TimingContentRenderer, self).render_plugin(
+                instance, context, placeholder, editable,
+            )
+        finally:
+            elapsed = time.time() - started
+            child_time = self._child_times.pop()
+            if self._child_times:
+                self._child_times[-1] += elapsed
+            self.stats.add(instance.plugin_type, elapsed - child_time)
+
+
+def get_plugin_types():
+    return [
+        plugin.__name__ for plugin in plugin_pool.get_all_plugins()
+        if plugin.__module__.startswith('aldryn_bootstrap3.')
+    ]
+
+
+def get_priority_pages(entries):
+    """
+    Returns the published pages matching ``entries``, reverse ids or ids of
+    draft pages, in the given order.
+    """
+    entries = [force_text(entry) for entry in entries]
+    ids = [int(entry) for entry in entries if entry.isdigit()]
+    pages = Page.objects.filter(
+        Q(reverse_id__in=entries) | Q(publisher_public_id__in=ids),
+        publisher_is_draft=False,
+    )
+    pages_by_entry = {}
+    for page in pages:
+        pages_by_entry[force_text(page.publisher_public_id)] = page
+        if page.reverse_id:
+            pages_by_entry[page.reverse_id] = page
+    ordered = []
+    for entry in entries:
+        page = pages_by_entry.get(entry)
+        if page is not None and page not in ordered:
+            ordered.append(page)
+    return ordered
+
+
+def get_tasks(priority_pages=None):
+    """
+    Returns a ``WarmupTask`` for each placeholder of a published page that
+    contains Bootstrap3 plugins in a published language. Placeholders of
+    ``priority_pages`` come first, the others follow in page tree order.
+    """
+    rows = list(
+        CMSPlugin.objects
+        .filter(
+            placeholder__page__publisher_is_draft=False,
+            plugin_type__in=get_plugin_types(),
+        )
+        .order_by('placeholder__page__path', 'placeholder_id', 'language')
+        .values_list('placeholder_id', 'placeholder__page__pk', 'language')
+        .distinct()
+    )
+    page_ids = set(row[1] for row in rows)
+    published = set(
+        Title.objects
+        .filter(page_id__in=page_ids, published=True)
+        .values_list('page_id', 'language')
+    )
+    pages = Page.objects.in_bulk(page_ids)
+    placeholders = Placeholder.objects.in_bulk(set(row[0] for row in rows))
+
+    priorities = dict(
+        (page.pk, position) for position, page in enumerate(priority_pages or [])
+    )
+    tasks = [
+        WarmupTask(placeholders[placeholder_id], pages[page_id], language)
+        for placeholder_id, page_id, language in rows
+        if (page_id, language) in published
+    ]
+    # sorted() is stable, the tree order is kept within each group
+    return sorted(tasks, key=lambda task: priorities.get(task.page.pk, len(priorities)))
+
+
+def get_request(page, language):
+    # the test client and the toolbar are imported on first use only
+    from django.test.client import RequestFactory
+    from cms.toolbar.toolbar import CMSToolbar
+
+    request = RequestFactory().get(page.get_absolute_url(language))
+    request.user = AnonymousUser()
+    request.session = {}
+    request.current_page = page
+    request.LANGUAGE_CODE = language
+    # templates check the toolbar, anonymous visitors get one as well
+    request.toolbar = CMSToolbar(request)
+    return request
+
+
+def warm_placeholder(task, stats):
+    """
+    Renders a placeholder the way anonymous visitors see it, which fills the
+    fragment, placeholder and thumbnail caches. Returns the time it took.
+    """
+    started = time.time()
+    with translation.override(task.language):
+        request = get_request(task.page, task.language)
+        renderer = TimingContentRenderer(request, stats)
+        context = SekizaiContext({
+            'request': request,
+            'cms_content_renderer': renderer,
+        })
+        renderer.render_placeholder(
+            task.placeholder,
+            context,
+            language=task.language,
+            page=task.page,
+            editable=False,
+            use_cache=True,
+        )
+    return time.time() - started
@@ -7,7 +7,7 @@ from aldryn_bootstrap3 import __version__
 
 REQUIREMENTS = [
     'django-appconf>=1.0.0',
-    'django-cms>=3.3.0',
+    'django-cms>=3.4.0',
     'django-durationfield>=0.5.1',
     'django-filer>=0.9.11',
     'djangocms-text-ckeditor>=3.1.0',
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+# Benchmarks are not collected by ``setup.py test``, run them with e.g.
+# djangocms-helper aldryn_bootstrap3 test tests.benchmarks.bench_render --cms --extra-settings=tests/settings.py
+# BENCHMARK_UPDATE=1 stores the measurements in baselines.json, time and
+# memory are only compared with BENCHMARK_TIMINGS=1.
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+import collections
+import json
+import os
+import sys
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import translation
+
+from cms.models import Placeholder
+from cms.plugin_rendering import ContentRenderer
+from sekizai.context import SekizaiContext
+
+from djangocms_helper.base_test import BaseTestCase
+
+from aldryn_bootstrap3 import warmup
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2
+    tracemalloc = None
+
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), 'baselines.json')
+# queries must not grow. Time and memory depend on the machine, with
+# BENCHMARK_TIMINGS=1 they are compared as well, allowing for TOLERANCE
+TIMINGS = os.environ.get('BENCHMARK_TIMINGS') == '1'
+TOLERANCE = float(os.environ.get('BENCHMARK_TOLERANCE', '1.0'))
+# BENCHMARK_UPDATE=1 stores the measurements as new baselines
+UPDATE = os.environ.get('BENCHMARK_UPDATE') == '1'
+REPEAT = 5
+
+Measurement = collections.namedtuple('Measurement', ['seconds', 'queries', 'memory'])
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH) as baselines_file:
+        return json.load(baselines_file)
+
+
+def save_baselines(baselines):
+    with open(BASELINES_PATH, 'w') as baselines_file:
+        json.dump(baselines, baselines_file, indent=2, sort_keys=True)
+        baselines_file.write('\n')
+
+
+def measure(func):
+    """
+    Returns the best time of ``REPEAT`` calls of ``func``, its queries and
+    the peak of the memory it allocates, after a first call filling the
+    caches.
+    """
+    func()
+    timings = []
+    for i in range(REPEAT):
+        started = time.time()
+        func()
+        timings.append(time.time() - started)
+    with CaptureQueriesContext(connection) as queries:
+        func()
+    memory = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+        try:
+            func()
+            memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return Measurement(min(timings), len(queries), memory)
+
+
+def render_placeholder(page, placeholder_id, language='en'):
+    # a fresh placeholder, the cms keeps the plugins of rendered ones
+    placeholder = Placeholder.objects.get(pk=placeholder_id)
+    request = warmup.get_request(page, language)
+    renderer = ContentRenderer(request)
+    context = SekizaiContext({
+        'request': request,
+        'cms_content_renderer': renderer,
+    })
+    with translation.override(language):
+        return renderer.render_placeholder(
+            placeholder,
+            context,
+            language=language,
+            page=page,
+            editable=False,
+        )
+
+
+class BenchmarkTestCase(BaseTestCase):
+    """
+    Compares measurements with the baselines in ``baselines.json``.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super(BenchmarkTestCase, cls).setUpClass()
+        cls.baselines = load_baselines()
+
+    @classmethod
+    def tearDownClass(cls):
+        if UPDATE:
+            save_baselines(cls.baselines)
+        super(BenchmarkTestCase, cls).tearDownClass()
+
+    def assertWithinBaseline(self, name, measurement):
+        sys.stderr.write('\n{}: {:.1f} ms, {} queries, {} KiB\n'.format(
+            name,
+            measurement.seconds * 1000,
+            measurement.queries,
+            measurement.memory // 1024 if measurement.memory is not None else '-',
+        ))
+        if UPDATE:
+            self.baselines[name] = measurement._asdict()
+            return
+        baseline = self.baselines.get(name)
+        if baseline is None:
+            self.fail('No baseline for {}, run with BENCHMARK_UPDATE=1.'.format(name))
+        self.assertLessEqual(
+            measurement.queries, baseline['queries'],
+            '{} makes more queries than its baseline'.format(name),
+        )
+        if not TIMINGS:
+            return
+        self.assertLessEqual(
+            measurement.seconds, baseline['seconds'] * (1 + TOLERANCE),
+            '{} renders slower than its baseline'.format(name),
+        )
+        if measurement.memory is not None and baseline['memory'] is not None:
+            self.assertLessEqual(
+                measurement.memory, baseline['memory'] * (1 + TOLERANCE),
+                '{} allocates more memory than its baseline'.format(name),
+            )
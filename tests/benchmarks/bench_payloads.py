@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import pickle
+import sys
+import timeit
+
+from django.core.cache import cache
+from django.test.utils import override_settings
+from django.utils import translation
+
+from cms.api import add_plugin, create_page
+
+from djangocms_helper.base_test import BaseTestCase
+from filer.models import Image
+
+from aldryn_bootstrap3 import fragments, warmup
+
+
+PLUGINS = (
+    ('Bootstrap3ButtonCMSPlugin', {'label': 'Read more', 'link_url': 'http://example.com'}),
+    ('Bootstrap3LabelCMSPlugin', {'label': 'New'}),
+    ('Bootstrap3IconCMSPlugin', {'icon': 'fa-heart'}),
+    ('Bootstrap3BlockquoteCMSPlugin', {}),
+    ('Bootstrap3RowCMSPlugin', {}),
+    ('Bootstrap3ImageCMSPlugin', {}),
+)
+
+
+def get_size(value):
+    return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+def get_load_time(value, number=1000):
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    return timeit.timeit(lambda: pickle.loads(data), number=number) / number
+
+
+@override_settings(
+    ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_TIMEOUT=60,
+    CMS_PLACEHOLDER_CACHE=False,
+)
+class PayloadBenchmark(BaseTestCase):
+    """
+    Reports the size and unpickling time of the cached fragment of each
+    plugin type, next to the pickled plugin instance and the fragment
+    layout used before ``FRAGMENT_FORMAT`` 1.
+    """
+
+    def setUp(self):
+        cache.clear()
+        fragments.local_cache.clear()
+        self.page = create_page('home', 'page.html', 'en')
+        self.placeholder = self.page.placeholders.get(slot='content')
+        self.image = Image.objects.create(
+            owner=self.user,
+            original_filename='image.jpg',
+            file=self.create_django_image_object(),
+        )
+
+    def tearDown(self):
+        self.image.file.delete(save=False)
+
+    def test_payload_sizes(self):
+        for plugin_type, data in PLUGINS:
+            if plugin_type == 'Bootstrap3ImageCMSPlugin':
+                data = dict(data, file=self.image)
+            add_plugin(self.placeholder, plugin_type, 'en', **data)
+        self.page.publish('en')
+        public_placeholder = self.page.get_public_object().placeholders.get(slot='content')
+        for task in warmup.get_tasks():
+            warmup.warm_placeholder(task, warmup.TimingStats())
+
+        rows = []
+        with translation.override('en'):
+            for plugin in public_placeholder.get_plugins('en'):
+                instance = plugin.get_plugin_instance()[0]
+                key = fragments.get_fragment_key(instance, public_placeholder)
+                content, sekizai_changes, expires = fragments.get_fragment(key)
+                packed = cache.get(key)
+                rows.append((
+                    plugin.plugin_type,
+                    get_size(instance),
+                    get_size((content, sekizai_changes, expires)),
+                    get_size(packed),
+                    get_load_time(instance) * 1e6,
+                    get_load_time(packed) * 1e6,
+                ))
+                self.assertLess(get_size(packed), get_size(instance))
+
+        stream = sys.stderr
+        stream.write('\n{:<32} {:>9} {:>9} {:>9} {:>11} {:>11}\n'.format(
+            'plugin type', 'instance', 'legacy', 'fragment', 'instance us', 'fragment us',
+        ))
+        for row in rows:
+            stream.write('{:<32} {:>9} {:>9} {:>9} {:>11.1f} {:>11.1f}\n'.format(*row))
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+from django.test.utils import override_settings
+
+from cms.api import add_plugin, create_page
+
+from djangocms_text_ckeditor.utils import plugin_to_tag
+from filer.models import Image
+
+from aldryn_bootstrap3 import models, utils
+
+from .base import BenchmarkTestCase, measure, render_placeholder
+
+
+@override_settings(
+    ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_TIMEOUT=0,
+    ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_LOCAL_TIMEOUT=0,
+    ALDRYN_BOOTSTRAP3_PRERENDER=False,
+    CMS_PLACEHOLDER_CACHE=False,
+)
+class RenderBenchmark(BenchmarkTestCase):
+    """
+    Renders large placeholders the way anonymous visitors see them, without
+    the fragment and placeholder caches.
+    """
+
+    def setUp(self):
+        self.page = create_page('home', 'page.html', 'en')
+        self.placeholder = self.page.placeholders.get(slot='content')
+
+    def render(self):
+        return render_placeholder(self.page, self.placeholder.pk)
+
+    def test_grid(self):
+        # 1,000 columns in 100 rows
+        for i in range(100):
+            row = add_plugin(self.placeholder, 'Bootstrap3RowCMSPlugin', 'en')
+            utils.bulk_add_child_plugins(row, [
+                models.Bootstrap3ColumnPlugin(
+                    plugin_type='Bootstrap3ColumnCMSPlugin',
+                    xs_col=1,
+                ) for j in range(10)
+            ])
+        self.assertWithinBaseline('grid', measure(self.render))
+
+    def test_carousel(self):
+        image = Image.objects.create(
+            owner=self.user,
+            original_filename='image.jpg',
+            file=self.create_django_image_object(),
+        )
+        self.addCleanup(image.file.delete, save=False)
+        carousel = add_plugin(self.placeholder, 'Bootstrap3CarouselCMSPlugin', 'en')
+        utils.bulk_add_child_plugins(carousel, [
+            models.Bootstrap3CarouselSlidePlugin(
+                plugin_type='Bootstrap3CarouselSlideCMSPlugin',
+                image=image,
+            ) for i in range(50)
+        ])
+        self.assertWithinBaseline('carousel', measure(self.render))
+
+    def test_accordion(self):
+        accordion = add_plugin(self.placeholder, 'Bootstrap3AccordionCMSPlugin', 'en')
+        utils.bulk_add_child_plugins(accordion, [
+            models.Bootstrap3AccordionItemPlugin(
+                plugin_type='Bootstrap3AccordionItemCMSPlugin',
+                title='Item {}'.format(i),
+            ) for i in range(200)
+        ])
+        self.assertWithinBaseline('accordion', measure(self.render))
+
+    def test_text_buttons(self):
+        # 500 buttons inline in a text plugin
+        text = add_plugin(self.placeholder, 'TextPlugin', 'en', body='')
+        buttons = utils.bulk_add_child_plugins(text, [
+            models.Boostrap3ButtonPlugin(
+                plugin_type='Bootstrap3ButtonCMSPlugin',
+                label='Button {}'.format(i),
+                link_url='http://example.com/{}'.format(i),
+            ) for i in range(500)
+        ])
+        text.body = ' '.join(plugin_to_tag(button) for button in buttons)
+        text.save()
+        self.assertWithinBaseline('text_buttons', measure(self.render))
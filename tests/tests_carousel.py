@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.test.utils import override_settings
+
+from cms.api import add_plugin, create_page
+from cms.models import CMSPlugin, Placeholder
+
+from djangocms_helper.base_test import BaseTestCase
+from filer import settings as filer_settings
+from filer.models import Folder, FolderPermission, Image
+
+from aldryn_bootstrap3 import hashes, utils
+from aldryn_bootstrap3.models import Bootstrap3CarouselSlidePlugin, FileUsage, PageLink, PluginHash
+
+
+@override_settings(ALDRYN_BOOTSTRAP3_THUMBNAILS_ASYNC=False)
+class CarouselBulkUploadTestCase(BaseTestCase):
+
+    def setUp(self):
+        self.placeholder = Placeholder.objects.create(slot='content')
+        self.carousel = add_plugin(
+            self.placeholder, 'Bootstrap3CarouselCMSPlugin', 'en',
+        )
+        self.url = reverse(
+            'admin:bootstrap3_carousel_bulk_upload',
+            kwargs={'pk': self.carousel.pk},
+        )
+
+    def get_upload(self, name):
+        self.create_django_image_object()
+        with open(self.filename, 'rb') as fobj:
+            return SimpleUploadedFile(name, fobj.read(), 'image/jpeg')
+
+    def test_bulk_upload_files(self):
+        add_plugin(
+            self.placeholder, 'Bootstrap3CarouselSlideCMSPlugin', 'en',
+            target=self.carousel,
+        )
+        uploads = [self.get_upload('slide-{}.jpg'.format(i)) for i in range(3)]
+        with self.login_user_context(self.user):
+            response = self.client.post(self.url, {'files': uploads})
+        self.assertEqual(response.status_code, 200)
+
+        plugin_ids = json.loads(response.content.decode('utf-8'))['plugin_ids']
+        self.assertEqual(len(plugin_ids), 3)
+        slides = Bootstrap3CarouselSlidePlugin.objects.filter(
+            parent=self.carousel,
+        ).order_by('position')
+        self.assertEqual([slide.position for slide in slides], [0, 1, 2, 3])
+        self.assertEqual(
+            [slide.image.original_filename for slide in slides[1:]],
+            ['slide-0.jpg', 'slide-1.jpg', 'slide-2.jpg'],
+        )
+        carousel = CMSPlugin.objects.get(pk=self.carousel.pk)
+        self.assertEqual(carousel.numchild, 4)
+        self.assertEqual(
+            [plugin.pk for plugin in carousel.get_children()][1:],
+            plugin_ids,
+        )
+
+    def test_bulk_upload_folder(self):
+        folder = Folder.objects.create(name='slides')
+        for name in ('b.jpg', 'a.jpg'):
+            Image.objects.create(
+                owner=self.user,
+                folder=folder,
+                original_filename=name,
+                file=self.create_django_image_object(),
+            )
+        with self.login_user_context(self.user):
+            response = self.client.post(self.url, {'folder': folder.pk})
+        self.assertEqual(response.status_code, 200)
+        slides = Bootstrap3CarouselSlidePlugin.objects.filter(
+            parent=self.carousel,
+        ).order_by('position')
+        self.assertEqual(
+            [slide.image.original_filename for slide in slides],
+            ['a.jpg', 'b.jpg'],
+        )
+
+    def test_bulk_upload_requires_permission(self):
+        with self.login_user_context(self.user_normal):
+            response = self.client.post(self.url, {})
+        self.assertEqual(response.status_code, 403)
+
+    def test_bulk_upload_requires_files_or_folder(self):
+        with self.login_user_context(self.user):
+            response = self.client.post(self.url, {})
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_upload_requires_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        uploads = [self.get_upload('slide.jpg')]
+        response = client.post(self.url, {'files': uploads})
+        self.assertEqual(response.status_code, 403)
+
+        token = 'a' * 64
+        client.cookies[settings.CSRF_COOKIE_NAME] = token
+        uploads = [self.get_upload('slide.jpg')]
+        response = client.post(self.url, {'files': uploads}, HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 200)
+
+    def test_bulk_upload_requires_folder_permission(self):
+        self.addCleanup(setattr, filer_settings, 'FILER_ENABLE_PERMISSIONS', filer_settings.FILER_ENABLE_PERMISSIONS)
+        filer_settings.FILER_ENABLE_PERMISSIONS = True
+        editor = self.create_user(
+            'editor', 'editor@example.com', 'editor', is_staff=True,
+            base_cms_permissions=True, permissions=['add_bootstrap3carouselslideplugin'],
+        )
+        # only page placeholders can be edited by other users than superusers
+        page = create_page('home', 'page.html', 'en')
+        carousel = add_plugin(
+            page.placeholders.get(slot='content'), 'Bootstrap3CarouselCMSPlugin', 'en',
+        )
+        self.url = reverse('admin:bootstrap3_carousel_bulk_upload', kwargs={'pk': carousel.pk})
+        folder = Folder.objects.create(name='slides', owner=self.user)
+        with self.login_user_context(editor):
+            response = self.client.post(self.url, {'folder': folder.pk})
+        self.assertEqual(response.status_code, 403)
+
+        FolderPermission.objects.create(
+            folder=folder, user=editor, type=FolderPermission.THIS,
+            can_read=FolderPermission.ALLOW,
+        )
+        with self.login_user_context(editor):
+            response = self.client.post(self.url, {'folder': folder.pk})
+            self.assertEqual(response.status_code, 200)
+            # uploading into the folder needs more than read access
+            response = self.client.post(self.url, {
+                'folder': folder.pk, 'files': [self.get_upload('slide.jpg')],
+            })
+            self.assertEqual(response.status_code, 403)
+
+    def test_bulk_upload_rebuilds_hashes_once(self):
+        rebuilds = []
+        rebuild_placeholder_hashes = hashes.rebuild_placeholder_hashes
+
+        def counting_rebuild(placeholder_id):
+            rebuilds.append(placeholder_id)
+            return rebuild_placeholder_hashes(placeholder_id)
+
+        hashes.rebuild_placeholder_hashes = counting_rebuild
+        self.addCleanup(setattr, hashes, 'rebuild_placeholder_hashes', rebuild_placeholder_hashes)
+        uploads = [self.get_upload('slide-{}.jpg'.format(i)) for i in range(3)]
+        with self.login_user_context(self.user):
+            response = self.client.post(self.url, {'files': uploads})
+        plugin_ids = json.loads(response.content.decode('utf-8'))['plugin_ids']
+        self.assertEqual(rebuilds, [self.placeholder.pk])
+        self.assertEqual(
+            PluginHash.objects.filter(plugin_id__in=plugin_ids).count(), 3,
+        )
+
+    def test_bulk_add_writes_index_entries_once(self):
+        page = create_page('home', 'page.html', 'en')
+        image = Image.objects.create(
+            owner=self.user,
+            original_filename='slide.jpg',
+            file=self.create_django_image_object(),
+        )
+        slides = [
+            Bootstrap3CarouselSlidePlugin(
+                plugin_type='Bootstrap3CarouselSlideCMSPlugin',
+                image=image,
+                link_page=page,
+            ) for i in range(3)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            utils.bulk_add_child_plugins(self.carousel, slides)
+        plugin_ids = [slide.pk for slide in slides]
+        for model in (FileUsage, PageLink):
+            table = model._meta.db_table
+            self.assertEqual(len([
+                query for query in queries.captured_queries
+                if table in query['sql'] and not query['sql'].startswith('SELECT')
+            ]), 1, table)
+        self.assertEqual(
+            set(FileUsage.objects.filter(plugin_id__in=plugin_ids).values_list('plugin_id', 'file_id')),
+            {(plugin_id, image.pk) for plugin_id in plugin_ids},
+        )
+        self.assertEqual(
+            set(PageLink.objects.filter(plugin_id__in=plugin_ids).values_list('plugin_id', 'page_id')),
+            {(plugin_id, page.pk) for plugin_id in plugin_ids},
+        )
+
+
+@override_settings(ALDRYN_BOOTSTRAP3_CAROUSEL_FOLDER_MAX_SLIDES=3)
+class CarouselSlideFolderTestCase(BaseTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.page = create_page('home', 'page.html', 'en')
+        self.placeholder = self.page.placeholders.get(slot='content')
+        self.folder = Folder.objects.create(name='slides')
+        self.images = [
+            Image.objects.create(
+                owner=self.user,
+                folder=self.folder,
+                original_filename='{}.jpg'.format(i),
+                file=self.create_django_image_object(),
+            ) for i in range(5)
+        ]
+        self.carousel = add_plugin(
+            self.placeholder, 'Bootstrap3CarouselCMSPlugin', 'en',
+        )
+        self.slide_folder = add_plugin(
+            self.placeholder, 'Bootstrap3CarouselSlideFolderCMSPlugin', 'en',
+            target=self.carousel, folder=self.folder,
+        )
+
+    def test_images_are_limited_and_ordered(self):
+        self.assertEqual(
+            [image.original_filename for image in self.slide_folder.get_images()],
+            ['0.jpg', '1.jpg', '2.jpg'],
+        )
+
+    def test_listing_is_cached_until_folder_changes(self):
+        self.slide_folder.get_images()
+        with self.assertNumQueries(1):
+            self.slide_folder.get_images()
+        self.images[0].folder = None
+        self.images[0].save()
+        self.assertEqual(
+            [image.original_filename for image in self.slide_folder.get_images()],
+            ['1.jpg', '2.jpg', '3.jpg'],
+        )
+
+    def test_render(self):
+        rendered = self.render_plugin(self.page, 'en', self.slide_folder)
+        self.assertEqual(rendered.count('class="item'), 3)
+
+    def test_number_of_slides(self):
+        add_plugin(
+            self.placeholder, 'Bootstrap3CarouselSlideCMSPlugin', 'en',
+            target=self.carousel,
+        )
+        other_folder = Folder.objects.create(name='empty')
+        add_plugin(
+            self.placeholder, 'Bootstrap3CarouselSlideFolderCMSPlugin', 'en',
+            target=self.carousel, folder=other_folder,
+        )
+        carousel = self.placeholder.get_plugins('en').get(pk=self.carousel.pk)
+        carousel = carousel.get_plugin_instance()[0]
+        carousel.child_plugin_instances = [
+            plugin.get_plugin_instance()[0] for plugin in carousel.get_children()
+        ]
+        plugin = carousel.get_plugin_class_instance()
+        # counts for both folders are fetched with a single query
+        with self.assertNumQueries(1):
+            self.assertEqual(plugin.get_number_of_slides(carousel), 4)
+        with self.assertNumQueries(0):
+            self.assertEqual(plugin.get_number_of_slides(carousel), 4)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils.six import StringIO
+
+from cms.api import add_plugin
+from cms.models import Placeholder
+
+from aldryn_bootstrap3 import fragments, hashes
+from aldryn_bootstrap3.cms_plugins import Bootstrap3CodeCMSPlugin
+from aldryn_bootstrap3.models import Bootstrap3CodePlugin
+
+
+class Bootstrap3CodePluginTestCase(TestCase):
+
+    def test_highlighted_on_save(self):
+        plugin = Bootstrap3CodePlugin.objects.create(
+            code='print("<b>")',
+            code_language='python',
+        )
+        self.assertIn('<span class="nb">print</span>', plugin.highlighted_code)
+        self.assertIn('&lt;b&gt;', plugin.highlighted_code)
+
+    def test_not_highlighted_without_language(self):
+        plugin = Bootstrap3CodePlugin.objects.create(code='print(1)')
+        self.assertEqual(plugin.highlighted_code, '')
+
+    def test_highlighted_again_on_change(self):
+        plugin = Bootstrap3CodePlugin.objects.create(
+            code='a = 1',
+            code_language='python',
+        )
+        self.assertFalse(plugin.update_highlighted_code())
+        plugin.code = 'b = 2'
+        self.assertTrue(plugin.update_highlighted_code())
+        self.assertIn('b', plugin.highlighted_code)
+        with override_settings(ALDRYN_BOOTSTRAP3_CODE_HIGHLIGHT_STYLE='monokai'):
+            self.assertTrue(plugin.update_highlighted_code())
+        self.assertIn('style="', plugin.highlighted_code)
+
+    def test_backfill_command(self):
+        plugin = Bootstrap3CodePlugin.objects.create(
+            code='a = 1',
+            code_language='python',
+        )
+        Bootstrap3CodePlugin.objects.filter(pk=plugin.pk).update(
+            highlighted_code='',
+            highlighted_code_hash='',
+        )
+        out = StringIO()
+        call_command('aldryn_bootstrap3_highlight_code', processes=1, stdout=out)
+        self.assertIn('Highlighted 1 code plugin(s).', out.getvalue())
+        plugin = Bootstrap3CodePlugin.objects.get(pk=plugin.pk)
+        self.assertIn('<span', plugin.highlighted_code)
+
+        out = StringIO()
+        call_command('aldryn_bootstrap3_highlight_code', processes=1, stdout=out)
+        self.assertIn('Highlighted 0 code plugin(s).', out.getvalue())
+
+    def test_backfill_command_in_batches(self):
+        plugins = [
+            Bootstrap3CodePlugin.objects.create(code='a = {}'.format(i), code_language='python')
+            for i in range(5)
+        ]
+        Bootstrap3CodePlugin.objects.filter(pk__in=[plugins[1].pk, plugins[4].pk]).update(
+            highlighted_code='',
+            highlighted_code_hash='',
+        )
+        out = StringIO()
+        call_command('aldryn_bootstrap3_highlight_code', processes=1, batch_size=2, stdout=out)
+        self.assertIn('Highlighted 2 code plugin(s).', out.getvalue())
+        self.assertFalse(Bootstrap3CodePlugin.objects.filter(highlighted_code='').exists())
+
+        with override_settings(ALDRYN_BOOTSTRAP3_CODE_HIGHLIGHT_STYLE='monokai'):
+            out = StringIO()
+            call_command('aldryn_bootstrap3_highlight_code', processes=1, batch_size=2, stdout=out)
+        self.assertIn('Highlighted 5 code plugin(s).', out.getvalue())
+        self.assertEqual(
+            set(Bootstrap3CodePlugin.objects.values_list('highlighted_code_style', flat=True)),
+            {'monokai'},
+        )
+
+    def test_highlighted_again_on_render_after_style_change(self):
+        plugin = Bootstrap3CodePlugin.objects.create(
+            code='a = 1',
+            code_language='python',
+        )
+        self.assertEqual(plugin.highlighted_code_style, '')
+        self.assertTrue(plugin.has_current_style())
+        with override_settings(ALDRYN_BOOTSTRAP3_CODE_HIGHLIGHT_STYLE='monokai'):
+            self.assertFalse(plugin.has_current_style())
+            context = Bootstrap3CodeCMSPlugin().render({}, plugin, None)
+        self.assertIn('style="', context['instance'].highlighted_code)
+        self.assertEqual(plugin.highlighted_code_style, 'monokai')
+        # stored, so the next render does not highlight it again
+        plugin = Bootstrap3CodePlugin.objects.get(pk=plugin.pk)
+        self.assertEqual(plugin.highlighted_code_style, 'monokai')
+        self.assertIn('style="', plugin.highlighted_code)
+
+    def test_backfill_command_invalidates_placeholder(self):
+        placeholder = Placeholder.objects.create(slot='content')
+        plugin = add_plugin(placeholder, 'Bootstrap3CodeCMSPlugin', 'en', code='a = 1', code_language='python')
+        subtree_hash = hashes.get_placeholder_hashes(placeholder)[plugin.pk]
+        generation = fragments.get_generations([(fragments.PLACEHOLDER, placeholder.pk)])
+        with override_settings(ALDRYN_BOOTSTRAP3_CODE_HIGHLIGHT_STYLE='monokai'):
+            call_command('aldryn_bootstrap3_highlight_code', processes=1, stdout=StringIO())
+        self.assertNotEqual(hashes.get_placeholder_hashes(placeholder)[plugin.pk], subtree_hash)
+        self.assertNotEqual(
+            fragments.get_generations([(fragments.PLACEHOLDER, placeholder.pk)]), generation,
+        )
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from django.conf import settings
+from django.test.utils import override_settings
+
+from cms.api import add_plugin, assign_user_to_page, create_page
+from cms.models import ACCESS_PAGE, StaticPlaceholder
+
+from djangocms_helper.base_test import BaseTestCase
+from filer.models import Image
+
+
+@override_settings(
+    MIDDLEWARE_CLASSES=list(settings.MIDDLEWARE_CLASSES) + [
+        'aldryn_bootstrap3.middleware.ConditionalPageMiddleware',
+    ],
+)
+class ConditionalPageMiddlewareTestCase(BaseTestCase):
+
+    def setUp(self):
+        self.page = create_page('home', 'page.html', 'en')
+        self.placeholder = self.page.placeholders.get(slot='content')
+        self.image = Image.objects.create(
+            owner=self.user,
+            original_filename='image.jpg',
+            file=self.create_django_image_object(),
+        )
+        self.label = add_plugin(
+            self.placeholder, 'Bootstrap3LabelCMSPlugin', 'en', label='first',
+        )
+        add_plugin(
+            self.placeholder, 'Bootstrap3ImageCMSPlugin', 'en', file=self.image,
+        )
+        self.page.publish('en')
+        self.url = self.page.get_absolute_url('en')
+
+    def tearDown(self):
+        self.image.file.delete(save=False)
+
+    def get_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        return response['ETag']
+
+    def test_not_modified(self):
+        etag = self.get_etag()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since(self):
+        response = self.client.get(self.url)
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_content(self):
+        etag = self.get_etag()
+        self.label.label = 'second'
+        self.label.save()
+        self.page.publish('en')
+        self.assertNotEqual(self.get_etag(), etag)
+
+    def test_etag_changes_with_files(self):
+        etag = self.get_etag()
+        self.image.subject_location = '10,10'
+        self.image.save()
+        self.assertNotEqual(self.get_etag(), etag)
+
+    def test_etag_changes_with_static_placeholders(self):
+        static_placeholder = StaticPlaceholder.objects.create(name='footer', code='footer')
+        etag = self.get_etag()
+        add_plugin(static_placeholder.draft, 'Bootstrap3LabelCMSPlugin', 'en', label='footer')
+        self.assertEqual(self.get_etag(), etag)
+        static_placeholder.publish(None, 'en', force=True)
+        self.assertNotEqual(self.get_etag(), etag)
+
+    @override_settings(CMS_PERMISSION=True)
+    def test_restricted_pages_are_ignored(self):
+        etag = self.get_etag()
+        assign_user_to_page(self.page, self.user_normal, grant_on=ACCESS_PAGE, can_view=True)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertNotEqual(response.status_code, 304)
+        self.assertNotIn('ETag', response)
+
+    def test_authenticated_users_are_ignored(self):
+        etag = self.get_etag()
+        with self.login_user_context(self.user):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+import calendar
+from importlib import import_module
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+from django.utils.http import http_date
+
+from cms.api import add_plugin, create_page
+
+from djangocms_helper.base_test import BaseTestCase
+from filer.models import File
+
+from aldryn_bootstrap3 import downloads
+from aldryn_bootstrap3.models import Bootstrap3FilePlugin, FileDownloadCount
+
+
+@override_settings(
+    ALDRYN_BOOTSTRAP3_FILE_DOWNLOAD_VIEW=True,
+    ROOT_URLCONF='tests.urls',
+)
+class FileDownloadTestCase(BaseTestCase):
+
+    def setUp(self):
+        downloads.download_counter.counts.clear()
+        self.page = create_page('home', 'page.html', 'en')
+        self.placeholder = self.page.placeholders.get(slot='content')
+        self.file = File.objects.create(
+            owner=self.user,
+            original_filename='report.txt',
+            file=ContentFile(b'0123456789', 'report.txt'),
+        )
+        self.plugin = add_plugin(
+            self.placeholder, 'Bootstrap3FileCMSPlugin', 'en',
+            file=self.file, show_file_size=True,
+        )
+        self.url = reverse(
+            'aldryn_bootstrap3_file_download', kwargs={'pk': self.plugin.pk},
+        )
+
+    def tearDown(self):
+        self.file.file.delete(save=False)
+
+    def test_file_is_cached_on_plugin(self):
+        self.assertEqual(self.plugin.file_url, self.file.url)
+        self.assertEqual(self.plugin.file_size, 10)
+
+    @override_settings(ALDRYN_BOOTSTRAP3_FILE_DOWNLOAD_VIEW=False)
+    def test_render_without_stored_file(self):
+        # plugins saved before the url and size were stored
+        Bootstrap3FilePlugin.objects.filter(pk=self.plugin.pk).update(file_url='', file_size=None)
+        plugin = Bootstrap3FilePlugin.objects.get(pk=self.plugin.pk)
+        rendered = self.render_plugin(self.page, 'en', plugin)
+        self.assertIn('href="{}"'.format(self.file.url), rendered)
+        self.assertIn('10\xa0bytes', rendered)
+
+    def test_backfill_migration(self):
+        migration = import_module('aldryn_bootstrap3.migrations.0022_file_cache_backfill')
+        Bootstrap3FilePlugin.objects.filter(pk=self.plugin.pk).update(file_url='', file_size=None)
+        migration.backfill_file_cache(apps, None)
+        plugin = Bootstrap3FilePlugin.objects.get(pk=self.plugin.pk)
+        self.assertEqual(plugin.file_url, self.file.url)
+        self.assertEqual(plugin.file_size, 10)
+
+    def test_render_links_to_view(self):
+        rendered = self.render_plugin(self.page, 'en', self.plugin)
+        self.assertIn('href="{}"'.format(self.url), rendered)
+        self.assertIn('10\xa0bytes', rendered)
+
+    def test_download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['ETag'], '"{}"'.format(self.file.sha1))
+
+    def test_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_invalid_range_is_ignored(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=5-2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+
+    def test_if_range(self):
+        etag = '"{}"'.format(self.file.sha1)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE=http_date(
+            calendar.timegm(self.file.modified_at.utctimetuple()),
+        ))
+        self.assertEqual(response.status_code, 206)
+
+        # the file was replaced since the first part was downloaded
+        for if_range in ('"outdated"', 'W/' + etag, http_date(0)):
+            response = self.client.get(self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE=if_range)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+
+    def test_not_modified(self):
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH='"{}"'.format(self.file.sha1),
+        )
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(ALDRYN_BOOTSTRAP3_FILE_DOWNLOAD_SERVER='nginx')
+    def test_nginx(self):
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected/{}'.format(self.file.file.name),
+        )
+
+    @override_settings(ALDRYN_BOOTSTRAP3_FILE_DOWNLOAD_SERVER='nginx')
+    def test_nginx_quotes_the_path(self):
+        File.objects.filter(pk=self.file.pk).update(file='files/annual report?#1.txt')
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected/files/annual%20report%3F%231.txt',
+        )
+
+    def test_private_file(self):
+        self.file.is_public = False
+        self.file.save()
+        # follow the redirect of LocaleMiddleware to the prefixed url
+        response = self.client.get(self.url, follow=True)
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(ALDRYN_BOOTSTRAP3_FILE_DOWNLOAD_FLUSH_COUNT=3)
+    def test_download_count(self):
+        for i in range(2):
+            self.client.get(self.url)
+        self.assertFalse(FileDownloadCount.objects.exists())
+        self.client.get(self.url)
+        self.assertEqual(FileDownloadCount.objects.get(file=self.file).count, 3)
+        self.client.get(self.url)
+        downloads.download_counter.flush()
+        self.assertEqual(FileDownloadCount.objects.get(file=self.file).count, 4)
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+import time
+
+from django.core.cache import cache
+from django.template import engines
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from cms.api import add_plugin, create_page
+
+from djangocms_helper.base_test import BaseTestCase
+from filer.models import Image
+
+from aldryn_bootstrap3 import cms_plugins, fragments, metrics
+from aldryn_bootstrap3.models import Boostrap3LabelPlugin
+
+
+@override_settings(
+    ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_TIMEOUT=60,
+    CMS_PLACEHOLDER_CACHE=False,
+    CMS_PAGE_CACHE=False,
+)
+class FragmentCacheTestCase(BaseTestCase):
+
+    def setUp(self):
+        cache.clear()
+        fragments.local_cache.clear()
+        self.page = create_page('home', 'page.html', 'en')
+        self.placeholder = self.page.placeholders.get(slot='content')
+        self.image = Image.objects.create(
+            owner=self.user,
+            original_filename='image.jpg',
+            file=self.create_django_image_object(),
+        )
+        self.image_plugin = add_plugin(
+            self.placeholder, 'Bootstrap3ImageCMSPlugin', 'en', file=self.image,
+        )
+        add_plugin(self.placeholder, 'Bootstrap3LabelCMSPlugin', 'en', label='first')
+        self.page.publish('en')
+        self.public_placeholder = self.page.get_public_object().placeholders.get(slot='content')
+
+    def tearDown(self):
+        self.image.file.delete(save=False)
+        fragments.local_cache.clear()
+
+    def get_content(self, **headers):
+        response = self.client.get(self.page.get_absolute_url('en'), **headers)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode('utf-8')
+
+    def test_fragments_are_cached_until_placeholder_changes(self):
+        self.assertIn('first', self.get_content())
+        # queryset updates do not send signals
+        Boostrap3LabelPlugin.objects.filter(
+            placeholder=self.public_placeholder,
+        ).update(label='second')
+        self.assertIn('first', self.get_content())
+
+        fragments.bump_generation(fragments.PLACEHOLDER, self.public_placeholder.pk)
+        self.assertIn('second', self.get_content())
+
+    def add_row(self):
+        row = add_plugin(self.placeholder, 'Bootstrap3RowCMSPlugin', 'en')
+        column = add_plugin(self.placeholder, 'Bootstrap3ColumnCMSPlugin', 'en', target=row)
+        add_plugin(self.placeholder, 'Bootstrap3LabelCMSPlugin', 'en', target=column, label='nested')
+        self.page.publish('en')
+
+    def update_nested_label(self, label):
+        Boostrap3LabelPlugin.objects.filter(
+            placeholder=self.public_placeholder, parent__isnull=False,
+        ).update(label=label)
+
+    def patch_label_plugin(self, name, value):
+        plugin_class = cms_plugins.Bootstrap3LabelCMSPlugin
+        setattr(plugin_class, name, value)
+        self.addCleanup(delattr, plugin_class, name)
+
+    def test_uncacheable_descendants(self):
+        self.patch_label_plugin('cache', False)
+        self.add_row()
+        self.assertIn('nested', self.get_content())
+        self.update_nested_label('changed')
+        self.assertIn('changed', self.get_content())
+
+    def test_vary_headers_of_descendants(self):
+        self.patch_label_plugin('get_vary_cache_on', lambda *args: 'X-Variant')
+        self.add_row()
+        self.assertIn('nested', self.get_content(HTTP_X_VARIANT='a'))
+        self.update_nested_label('changed')
+        self.assertIn('nested', self.get_content(HTTP_X_VARIANT='a'))
+        self.assertIn('changed', self.get_content(HTTP_X_VARIANT='b'))
+
+    def test_render_is_skipped_on_hits(self):
+        add_plugin(self.placeholder, 'Bootstrap3CarouselCMSPlugin', 'en')
+        self.page.publish('en')
+        plugin_class = cms_plugins.Bootstrap3CarouselCMSPlugin
+        render = plugin_class.render
+        calls = []
+
+        def counting_render(*args):
+            calls.append(args)
+            return render(*args)
+
+        plugin_class.render = counting_render
+        self.addCleanup(setattr, plugin_class, 'render', render)
+        self.get_content()
+        self.get_content()
+        self.assertEqual(len(calls), 1)
+
+    def test_key_depends_on_files(self):
+        plugin = self.image_plugin
+        key = fragments.get_fragment_key(plugin, self.placeholder)
+        fragments.bump_generation(fragments.FILE, self.image.pk + 1)
+        self.assertEqual(fragments.get_fragment_key(plugin, self.placeholder), key)
+        self.image.subject_location = '10,10'
+        self.image.save()
+        self.assertNotEqual(fragments.get_fragment_key(plugin, self.placeholder), key)
+
+    @override_settings(ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_LOCAL_TIMEOUT=60)
+    def test_local_generations(self):
+        key = fragments.get_fragment_key(self.image_plugin, self.placeholder)
+        # another process bumps the placeholder
+        cache.incr(fragments.GENERATION_KEY.format(
+            fragments.PLACEHOLDER, self.placeholder.pk,
+        ))
+        self.assertEqual(fragments.get_fragment_key(self.image_plugin, self.placeholder), key)
+        fragments.local_cache.clear()
+        self.assertNotEqual(fragments.get_fragment_key(self.image_plugin, self.placeholder), key)
+
+
+@override_settings(
+    ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_TIMEOUT=60,
+    ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_LOCK_WAIT=0.2,
+)
+class StampedeProtectionTestCase(TestCase):
+    key = 'aldryn_bootstrap3:fragment:test'
+
+    def setUp(self):
+        cache.clear()
+        fragments.local_cache.clear()
+        metrics.reset()
+        self.template = fragments.CachedTemplate(
+            engines['django'].from_string('{{ value }}'), self.key,
+        )
+
+    def expire(self):
+        content, sekizai_changes, expires = fragments.get_fragment(self.key)
+        cache.set(self.key, fragments.pack_fragment(content, sekizai_changes, time.time() - 1))
+
+    def test_stale_fragment_is_served_while_locked(self):
+        self.assertEqual(self.template.render({'value': 'first'}), 'first')
+        self.expire()
+        # another process refreshes the fragment
+        token = fragments.acquire_lock(self.key)
+        self.assertTrue(token)
+        self.assertEqual(self.template.render({'value': 'second'}), 'first')
+        self.assertEqual(metrics.get_counters()['fragment_cache_stale_serves'], 1)
+
+        fragments.release_lock(self.key, token)
+        self.assertEqual(self.template.render({'value': 'second'}), 'second')
+        self.assertEqual(self.template.render({'value': 'third'}), 'second')
+        self.assertEqual(metrics.get_counters()['fragment_cache_refreshes'], 2)
+        self.assertIsNone(cache.get(fragments.LOCK_KEY.format(self.key)))
+
+    def test_expired_lock_is_not_released(self):
+        token = fragments.acquire_lock(self.key)
+        # the lock expired and another process took it
+        cache.delete(fragments.LOCK_KEY.format(self.key))
+        other_token = fragments.acquire_lock(self.key)
+        self.assertNotEqual(token, other_token)
+        fragments.release_lock(self.key, token)
+        self.assertEqual(cache.get(fragments.LOCK_KEY.format(self.key)), other_token)
+        self.assertIsNone(fragments.acquire_lock(self.key))
+        fragments.release_lock(self.key, other_token)
+        self.assertIsNone(cache.get(fragments.LOCK_KEY.format(self.key)))
+
+    def test_missing_fragment_waits_for_lock(self):
+        self.assertTrue(fragments.acquire_lock(self.key))
+        # the other process does not finish in time
+        self.assertEqual(self.template.render({'value': 'first'}), 'first')
+        counters = metrics.get_counters()
+        self.assertEqual(counters['fragment_cache_lock_waits'], 1)
+        self.assertGreaterEqual(counters['fragment_cache_lock_wait_seconds'], 0.2)
+        self.assertIsNone(cache.get(self.key))
+
+        fragments.set_fragment(self.key, 'other', {})
+        self.assertEqual(fragments.wait_for_fragment(self.key)[0], 'other')
+
+    def test_fragment_format(self):
+        packed = fragments.pack_fragment('<p>', {'css': [], 'js': ['<script>']}, 1.0)
+        self.assertEqual(packed, (fragments.FRAGMENT_FORMAT, '<p>', (('js', ('<script>',)),), 1.0))
+        content, sekizai_changes, expires = fragments.unpack_fragment(packed)
+        self.assertEqual(sekizai_changes, {'js': ('<script>',)})
+        self.assertTrue(hasattr(content, '__html__'))
+        # entries of other formats are misses
+        self.assertIsNone(fragments.unpack_fragment(('<p>', {}, 1.0)))
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+from django.core.management import call_command
+from django.utils.six import StringIO
+
+from cms.api import add_plugin, create_page
+from cms.models import CMSPlugin
+
+from djangocms_helper.base_test import BaseTestCase
+
+from aldryn_bootstrap3 import hashes, signals
+from aldryn_bootstrap3.models import PluginHash
+
+
+class PluginHashTestCase(BaseTestCase):
+
+    def setUp(self):
+        self.page = create_page('home', 'page.html', 'en')
+        self.placeholder = self.page.placeholders.get(slot='content')
+        self.row = add_plugin(self.placeholder, 'Bootstrap3RowCMSPlugin', 'en')
+        self.column = add_plugin(
+            self.placeholder, 'Bootstrap3ColumnCMSPlugin', 'en', target=self.row,
+        )
+        self.button = add_plugin(
+            self.placeholder, 'Bootstrap3ButtonCMSPlugin', 'en',
+            target=self.column, label='first', link_url='http://example.com',
+        )
+
+    def get_hash(self, plugin):
+        return PluginHash.objects.get(plugin_id=plugin.pk).subtree_hash
+
+    def count_calls(self, module, name):
+        calls = []
+        original = getattr(module, name)
+
+        def wrapper(*args, **kwargs):
+            calls.append(args)
+            return original(*args, **kwargs)
+
+        setattr(module, name, wrapper)
+        self.addCleanup(setattr, module, name, original)
+        return calls
+
+    def get_rebuilt_hashes(self):
+        hashes.rebuild_placeholder_hashes(self.placeholder.pk)
+        return hashes.get_placeholder_hashes(self.placeholder)
+
+    def test_hashes_follow_changes(self):
+        initial = hashes.get_placeholder_hashes(self.placeholder)
+        self.assertEqual(len(initial), 3)
+        self.assertEqual(initial, self.get_rebuilt_hashes())
+
+        self.button.label = 'second'
+        self.button.save()
+        changed = hashes.get_placeholder_hashes(self.placeholder)
+        self.assertNotEqual(changed[self.row.pk], initial[self.row.pk])
+        self.assertEqual(changed, self.get_rebuilt_hashes())
+
+        # the hash only depends on the content
+        self.button.label = 'first'
+        self.button.save()
+        self.assertEqual(self.get_hash(self.row), initial[self.row.pk])
+
+    def test_child_added_and_deleted(self):
+        initial = self.get_hash(self.row)
+        button = add_plugin(
+            self.placeholder, 'Bootstrap3ButtonCMSPlugin', 'en',
+            target=self.column, label='other', link_url='http://example.com',
+        )
+        self.assertNotEqual(self.get_hash(self.row), initial)
+        self.assertEqual(
+            hashes.get_placeholder_hashes(self.placeholder),
+            self.get_rebuilt_hashes(),
+        )
+        CMSPlugin.objects.get(pk=button.pk).delete()
+        self.assertEqual(self.get_hash(self.row), initial)
+
+    def test_placeholder_hash(self):
+        with self.assertNumQueries(1):
+            initial = hashes.get_placeholder_hash(self.placeholder, 'en')
+        self.button.label = 'second'
+        self.button.save()
+        self.assertNotEqual(hashes.get_placeholder_hash(self.placeholder, 'en'), initial)
+
+    def test_rebuild_command(self):
+        initial = hashes.get_placeholder_hashes(self.placeholder)
+        PluginHash.objects.all().delete()
+        out = StringIO()
+        call_command('aldryn_bootstrap3_rebuild_hashes', stdout=out)
+        self.assertIn('1 placeholder(s)', out.getvalue())
+        self.assertEqual(hashes.get_placeholder_hashes(self.placeholder), initial)
+
+    def test_new_plugins_update_their_ancestors(self):
+        rebuilds = self.count_calls(hashes, 'rebuild_placeholder_hashes')
+        column = add_plugin(
+            self.placeholder, 'Bootstrap3ColumnCMSPlugin', 'en', target=self.row,
+        )
+        add_plugin(
+            self.placeholder, 'Bootstrap3ButtonCMSPlugin', 'en',
+            target=column, label='other', link_url='http://example.com',
+        )
+        self.assertEqual(rebuilds, [])
+        self.assertEqual(
+            hashes.get_placeholder_hashes(self.placeholder),
+            self.get_rebuilt_hashes(),
+        )
+
+    def test_other_models_are_ignored(self):
+        updates = self.count_calls(hashes, 'update_hashes')
+        self.page.save()
+        self.user.save()
+        self.assertEqual(updates, [])
+
+    def test_batch(self):
+        updates = self.count_calls(hashes, 'update_hashes')
+        rebuilds = self.count_calls(hashes, 'rebuild_placeholder_hashes')
+        with signals.batch():
+            for label in ('one', 'two', 'three'):
+                add_plugin(
+                    self.placeholder, 'Bootstrap3ButtonCMSPlugin', 'en',
+                    target=self.column, label=label, link_url='http://example.com',
+                )
+            self.assertEqual(rebuilds, [])
+        self.assertEqual(updates, [])
+        self.assertEqual(rebuilds, [(self.placeholder.pk,)])
+        self.assertEqual(len(hashes.get_placeholder_hashes(self.placeholder)), 6)
+
+    def test_subtree_deleted(self):
+        initial = self.get_hash(self.row)
+        column = add_plugin(
+            self.placeholder, 'Bootstrap3ColumnCMSPlugin', 'en', target=self.row,
+        )
+        for label in ('one', 'two'):
+            add_plugin(
+                self.placeholder, 'Bootstrap3ButtonCMSPlugin', 'en',
+                target=column, label=label, link_url='http://example.com',
+            )
+        updates = self.count_calls(hashes, 'update_hashes')
+        CMSPlugin.objects.get(pk=column.pk).delete()
+        self.assertEqual([plugin.pk for plugin, in updates], [self.row.pk])
+        self.assertEqual(self.get_hash(self.row), initial)
+
+    def test_concurrent_insert(self):
+        expected = self.get_rebuilt_hashes()
+        bulk_create = PluginHash.objects.bulk_create
+
+        def racing_bulk_create(objs, *args, **kwargs):
+            # another process inserts a row after it was deleted
+            del PluginHash.objects.bulk_create
+            PluginHash.objects.create(
+                plugin_id=self.row.pk, placeholder_id=self.placeholder.pk,
+                content_hash='', subtree_hash='',
+            )
+            return bulk_create(objs, *args, **kwargs)
+
+        PluginHash.objects.bulk_create = racing_bulk_create
+        self.addCleanup(PluginHash.objects.__dict__.pop, 'bulk_create', None)
+        hashes.rebuild_placeholder_hashes(self.placeholder.pk)
+        self.assertNotIn('bulk_create', PluginHash.objects.__dict__)
+        self.assertEqual(hashes.get_placeholder_hashes(self.placeholder), expected)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+
+# settings of the fresh interpreter, the app settings keep their defaults
+SETTINGS = (
+    'INSTALLED_APPS', 'LANGUAGES', 'LANGUAGE_CODE', 'SITE_ID',
+    'CMS_TEMPLATES', 'TEMPLATES', 'MIDDLEWARE_CLASSES', 'STATIC_URL', 'ROOT_URLCONF',
+)
+
+SCRIPT = """
+import json, sys, time
+from django.conf import settings
+settings.configure(**json.loads(sys.argv[1]))
+import django
+started, before = time.time(), set(sys.modules)
+django.setup()
+setup = time.time() - started
+setup_modules = set(sys.modules) - before
+if 'aldryn_bootstrap3' in settings.INSTALLED_APPS:
+    import aldryn_bootstrap3.cms_plugins
+print(json.dumps({
+    'setup_modules': sorted(setup_modules),
+    'time': time.time() - started,
+    'modules': sorted(set(sys.modules) - before),
+}))
+"""
+
+# modules only needed by some requests, imported on first use
+DEFERRED_MODULES = ('filer.admin', 'pygments.lexers', 'pygments.formatters')
+# modules only needed to render outside of requests, e.g. the warmup, not
+# imported by the app on startup
+STARTUP_DEFERRED_MODULES = (
+    'django.test', 'cms.toolbar.toolbar', 'cms.plugin_rendering',
+    'aldryn_bootstrap3.prerender', 'aldryn_bootstrap3.warmup',
+)
+# without django.contrib.admin, whose autodiscovery imports the admin and
+# plugins of all apps, the app must not import them on startup either, e.g.
+# through the template engine loading the tag libraries of all apps
+NO_ADMIN_STARTUP_DEFERRED_MODULES = STARTUP_DEFERRED_MODULES + (
+    'filer.admin', 'cms.admin', 'aldryn_bootstrap3.instrumentation',
+)
+
+# loose budgets catching heavy imports creeping back in, for the modules
+# and time the app adds to django.setup() and importing its plugins
+MODULE_BUDGET = 45
+TIME_BUDGET = 1.0
+
+
+class ImportTestCase(SimpleTestCase):
+
+    def get_import_profile(self, installed=True, admin=True):
+        options = {name: getattr(settings, name) for name in SETTINGS}
+        options['INSTALLED_APPS'] = [
+            app for app in settings.INSTALLED_APPS
+            if (installed or app != 'aldryn_bootstrap3') and (admin or app != 'django.contrib.admin')
+        ]
+        options['DATABASES'] = {
+            'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+        }
+        output = subprocess.check_output([
+            sys.executable, '-c', SCRIPT, json.dumps(options, default=str),
+        ])
+        return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+    def check_import_profile(self, admin, startup_deferred_modules):
+        baseline = self.get_import_profile(installed=False, admin=admin)
+        profile = self.get_import_profile(admin=admin)
+        modules = set(profile['modules']) - set(baseline['modules'])
+        setup_modules = set(profile['setup_modules']) - set(baseline['setup_modules'])
+        self.assertIn('aldryn_bootstrap3.cms_plugins', modules)
+        for prefix in DEFERRED_MODULES:
+            self.assertFalse(
+                [module for module in modules if module.startswith(prefix)],
+                '{} is imported on startup'.format(prefix),
+            )
+        for prefix in startup_deferred_modules:
+            self.assertFalse(
+                [module for module in setup_modules if module.startswith(prefix)],
+                '{} is imported by django.setup()'.format(prefix),
+            )
+        self.assertLessEqual(len(modules), MODULE_BUDGET, sorted(modules))
+        self.assertLess(profile['time'] - baseline['time'], TIME_BUDGET)
+
+    def test_cms_plugins(self):
+        self.check_import_profile(True, STARTUP_DEFERRED_MODULES)
+
+    def test_cms_plugins_without_admin(self):
+        self.check_import_profile(False, NO_ADMIN_STARTUP_DEFERRED_MODULES)
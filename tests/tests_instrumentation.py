@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings
+
+from cms.api import add_plugin, create_page
+from cms.models import CMSPlugin
+
+from djangocms_helper.base_test import BaseTestCase
+from filer.models import Image
+
+from aldryn_bootstrap3 import instrumentation
+
+
+class RecordingHandler(logging.Handler):
+
+    def __init__(self):
+        super(RecordingHandler, self).__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@override_settings(
+    ALDRYN_BOOTSTRAP3_RENDER_TIMING=True,
+    MIDDLEWARE_CLASSES=list(settings.MIDDLEWARE_CLASSES) + [
+        'aldryn_bootstrap3.middleware.RenderTimingMiddleware',
+    ],
+    CMS_PLACEHOLDER_CACHE=False,
+    CMS_PAGE_CACHE=False,
+)
+class RenderTimingTestCase(BaseTestCase):
+
+    def setUp(self):
+        self.page = create_page('home', 'page.html', 'en')
+        placeholder = self.page.placeholders.get(slot='content')
+        row = add_plugin(placeholder, 'Bootstrap3RowCMSPlugin', 'en')
+        column = add_plugin(placeholder, 'Bootstrap3ColumnCMSPlugin', 'en', target=row)
+        add_plugin(placeholder, 'Bootstrap3LabelCMSPlugin', 'en', target=column, label='nested')
+        add_plugin(placeholder, 'Bootstrap3LabelCMSPlugin', 'en', label='first')
+        self.page.publish('en')
+        self.handler = RecordingHandler()
+        instrumentation.logger.addHandler(self.handler)
+        self.addCleanup(instrumentation.logger.removeHandler, self.handler)
+        level = instrumentation.logger.level
+        instrumentation.logger.setLevel(logging.INFO)
+        self.addCleanup(instrumentation.logger.setLevel, level)
+
+    def test_timings_are_exported(self):
+        response = self.client.get(self.page.get_absolute_url('en'))
+        self.assertEqual(response.status_code, 200)
+        metrics = response['Server-Timing'].split(', ')
+        self.assertEqual(len(metrics), 3)
+        self.assertTrue(any(
+            metric.startswith('Bootstrap3LabelCMSPlugin;dur=') and '2 plugins' in metric
+            for metric in metrics
+        ))
+        self.assertIsNone(instrumentation.get_timings())
+
+        self.assertEqual(len(self.handler.records), 1)
+        data = self.handler.records[0].render_timings
+        self.assertEqual(data['path'], self.page.get_absolute_url('en'))
+        self.assertEqual(len(data['plugins']), 4)
+        json.dumps(data)
+        # the output of the children is not counted twice
+        content = response.content.decode('utf-8')
+        self.assertLess(sum(plugin['bytes'] for plugin in data['plugins']), len(content))
+        for plugin in data['plugins']:
+            self.assertGreaterEqual(plugin['bytes'], 0)
+            self.assertGreaterEqual(plugin['queries'], 0)
+
+    def test_queries_are_counted_without_debug_cursor(self):
+        # outside of requests the collector stays installed until removed
+        self.addCleanup(instrumentation.uninstall_collector)
+        timings = instrumentation.start_collecting()
+        try:
+            self.assertFalse(connection.force_debug_cursor)
+            list(CMSPlugin.objects.all())
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                self.assertEqual(cursor.fetchone()[0], 1)
+        finally:
+            instrumentation.stop_collecting()
+        self.assertEqual(len(timings.queries), 2)
+        self.assertEqual(len(connection.queries_log), 0)
+        list(CMSPlugin.objects.all())
+        self.assertEqual(len(timings.queries), 2)
+
+    @override_settings(ALDRYN_BOOTSTRAP3_RENDER_TIMING=False)
+    def test_disabled(self):
+        response = self.client.get(self.page.get_absolute_url('en'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(self.handler.records, [])
+
+
+@override_settings(
+    ALDRYN_BOOTSTRAP3_SLOW_RENDER_THRESHOLD=0.001,
+    CMS_PLACEHOLDER_CACHE=False,
+    CMS_PAGE_CACHE=False,
+)
+class SlowRenderTestCase(BaseTestCase):
+
+    def setUp(self):
+        self.page = create_page('home', 'page.html', 'en')
+        placeholder = self.page.placeholders.get(slot='content')
+        self.image = Image.objects.create(
+            owner=self.user,
+            original_filename='image.jpg',
+            file=self.create_django_image_object(),
+        )
+        self.row = add_plugin(placeholder, 'Bootstrap3RowCMSPlugin', 'en')
+        self.column = add_plugin(placeholder, 'Bootstrap3ColumnCMSPlugin', 'en', target=self.row)
+        add_plugin(placeholder, 'Bootstrap3ImageCMSPlugin', 'en', target=self.column, file=self.image)
+        self.page.publish('en')
+        self.handler = RecordingHandler()
+        instrumentation.slow_logger.addHandler(self.handler)
+        self.addCleanup(instrumentation.slow_logger.removeHandler, self.handler)
+
+    def tearDown(self):
+        self.image.file.delete(save=False)
+
+    def test_slow_renders_are_logged(self):
+        self.client.get(self.page.get_absolute_url('en'))
+        records = [record.slow_render for record in self.handler.records]
+        self.assertEqual(
+            [record['plugin_type'] for record in records],
+            ['Bootstrap3ImageCMSPlugin', 'Bootstrap3ColumnCMSPlugin', 'Bootstrap3RowCMSPlugin'],
+        )
+        image, column, row = records
+        public_row, public_column, public_image = (
+            self.page.get_public_object().placeholders.get(slot='content')
+            .get_plugins('en')
+        )
+        self.assertEqual(image['path'], 'Row#{} > Column#{} > Image#{}'.format(
+            public_row.pk, public_column.pk, public_image.pk,
+        ))
+        self.assertEqual(image['placeholder'], 'content')
+        self.assertEqual(image['page'], self.page.get_absolute_url('en'))
+        self.assertEqual(image['language'], 'en')
+        self.assertGreater(image['inline_thumbnails'], 0)
+        self.assertEqual(row['inline_thumbnails'], 0)
+        self.assertGreaterEqual(row['total_ms'], image['total_ms'])
+        # the collection ends with the top-level plugin
+        self.assertIsNone(instrumentation.get_timings())
+        self.assertFalse(connection.force_debug_cursor)
+
+    def test_one_query_collector_per_request(self):
+        add_plugin(self.page.placeholders.get(slot='content'), 'Bootstrap3LabelCMSPlugin', 'en', label='first')
+        self.page.publish('en')
+        installs = []
+        install = instrumentation.QueryCollector.install
+
+        def counting_install(collector):
+            installs.append(collector)
+            return install(collector)
+
+        instrumentation.QueryCollector.install = counting_install
+        self.addCleanup(setattr, instrumentation.QueryCollector, 'install', install)
+        self.assertIn('first', self.client.get(self.page.get_absolute_url('en')).content.decode('utf-8'))
+        # both top-level plugins were timed with the same collector
+        self.assertEqual(len(installs), 1)
+        self.assertIn(
+            'Bootstrap3LabelCMSPlugin',
+            [record.slow_render['plugin_type'] for record in self.handler.records],
+        )
+        # and removed when the request finished
+        self.assertIsNone(instrumentation._local.collector)
+
+    @override_settings(ALDRYN_BOOTSTRAP3_SLOW_RENDER_THRESHOLD=10000)
+    def test_fast_renders_are_not_logged(self):
+        self.client.get(self.page.get_absolute_url('en'))
+        self.assertEqual(self.handler.records, [])
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.urlresolvers import reverse
+
+from cms.api import add_plugin, create_page
+from cms.models import Placeholder, Title
+
+from djangocms_helper.base_test import BaseTestCase
+from filer.models import File
+
+from aldryn_bootstrap3.cms_plugins import Bootstrap3ButtonCMSPlugin
+from aldryn_bootstrap3.models import PageLink
+
+
+class LinkResolutionTestCase(BaseTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.page = create_page('home', 'page.html', 'en')
+        self.placeholder = self.page.placeholders.get(slot='content')
+        self.pages = [
+            create_page('page {}'.format(i), 'page.html', 'en', parent=self.page)
+            for i in range(3)
+        ]
+        self.file = File.objects.create(
+            owner=self.user,
+            original_filename='report.txt',
+            file=ContentFile(b'report', 'report.txt'),
+        )
+        self.buttons = [
+            add_plugin(
+                self.placeholder, 'Bootstrap3ButtonCMSPlugin', 'en',
+                link_page=page,
+            ) for page in self.pages
+        ]
+        self.buttons.append(add_plugin(
+            self.placeholder, 'Bootstrap3ButtonCMSPlugin', 'en',
+            link_file=self.file, link_anchor='top',
+        ))
+
+    def tearDown(self):
+        self.file.file.delete(save=False)
+
+    def get_buttons(self):
+        return Bootstrap3ButtonCMSPlugin.get_render_queryset().filter(
+            pk__in=[button.pk for button in self.buttons],
+        ).order_by('pk')
+
+    def test_links_are_resolved_in_bulk(self):
+        # pages, titles and files
+        with self.assertNumQueries(4):
+            buttons = list(self.get_buttons().iterator())
+        with self.assertNumQueries(0):
+            urls = [button.get_link_url() for button in buttons]
+        self.assertEqual(urls[:3], [page.get_absolute_url() for page in self.pages])
+        self.assertEqual(urls[3], '{}#top'.format(self.file.url))
+
+        # the urls are cached now
+        with self.assertNumQueries(1):
+            list(self.get_buttons())
+
+    def test_urls_are_invalidated_on_publish(self):
+        self.page.publish('en')
+        list(self.get_buttons())
+        Title.objects.filter(page=self.pages[0]).update(slug='renamed', path='renamed')
+        self.pages[0].publish('en')
+        button = self.get_buttons()[0]
+        self.assertEqual(button.get_link_url(), '/en/renamed/')
+
+
+class PageLinkTestCase(BaseTestCase):
+
+    def setUp(self):
+        self.home = create_page('home', 'page.html', 'en', published=True)
+        self.page = create_page('page', 'page.html', 'en', parent=self.home, published=True)
+        self.child = create_page('child', 'page.html', 'en', parent=self.page, published=True)
+        self.other = create_page('other', 'page.html', 'en', parent=self.home, published=True)
+        self.placeholder = self.home.placeholders.get(slot='content')
+        self.button = add_plugin(
+            self.placeholder, 'Bootstrap3ButtonCMSPlugin', 'en',
+            link_page=self.child,
+        )
+
+    def test_index_follows_plugin(self):
+        link = PageLink.objects.get(plugin_id=self.button.pk)
+        self.assertEqual(link.page_id, self.child.pk)
+        self.assertEqual(link.placeholder_id, self.placeholder.pk)
+
+        self.button.link_page = None
+        self.button.link_url = 'http://example.com'
+        self.button.save()
+        self.assertFalse(PageLink.objects.filter(plugin_id=self.button.pk).exists())
+
+        self.button.link_page = self.other
+        self.button.save()
+        self.button.delete()
+        self.assertFalse(PageLink.objects.exists())
+
+    def test_index_follows_moved_plugin(self):
+        row = add_plugin(self.placeholder, 'Bootstrap3RowCMSPlugin', 'en')
+        column = add_plugin(self.placeholder, 'Bootstrap3ColumnCMSPlugin', 'en', target=row)
+        button = add_plugin(
+            self.placeholder, 'Bootstrap3ButtonCMSPlugin', 'en',
+            target=column, link_page=self.other,
+        )
+        target = self.other.placeholders.get(slot='content')
+        with self.login_user_context(self.user):
+            response = self.client.post(reverse('admin:cms_page_move_plugin') + '?cms_path=/', {
+                'plugin_id': row.pk,
+                'placeholder_id': target.pk,
+                'plugin_language': 'en',
+                'plugin_order[]': [row.pk],
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            set(PageLink.objects.values_list('plugin_id', 'placeholder_id')),
+            {(self.button.pk, self.placeholder.pk), (button.pk, target.pk)},
+        )
+
+    def record_cleared_caches(self):
+        cleared = []
+        clear_cache = Placeholder.clear_cache
+
+        def record(placeholder, language, site_id=None):
+            cleared.append((placeholder.pk, language))
+            return clear_cache(placeholder, language, site_id)
+
+        Placeholder.clear_cache = record
+        self.addCleanup(setattr, Placeholder, 'clear_cache', clear_cache)
+        return cleared
+
+    def test_publish_invalidates_linking_placeholders(self):
+        cleared = self.record_cleared_caches()
+        # the url of the child changes with its parent
+        self.page.publish('en')
+        self.assertIn((self.placeholder.pk, 'en'), cleared)
+
+        del cleared[:]
+        self.other.publish('en')
+        self.assertNotIn((self.placeholder.pk, 'en'), cleared)
+
+    def test_move_invalidates_linking_placeholders(self):
+        cleared = self.record_cleared_caches()
+        self.page.move_page(self.other, 'last-child')
+        self.assertIn((self.placeholder.pk, 'en'), cleared)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test.utils import override_settings
+from django.utils.six import StringIO
+
+from cms.api import add_plugin, create_page
+
+from djangocms_helper.base_test import BaseTestCase
+from filer.models import Image
+
+from aldryn_bootstrap3 import memory
+
+
+@unittest.skipIf(memory.tracemalloc is None, 'tracemalloc is not available')
+@override_settings(
+    MIDDLEWARE_CLASSES=list(settings.MIDDLEWARE_CLASSES) + [
+        'aldryn_bootstrap3.middleware.MemoryProfileMiddleware',
+    ],
+    CMS_PLACEHOLDER_CACHE=False,
+    CMS_PAGE_CACHE=False,
+)
+class MemoryProfileTestCase(BaseTestCase):
+
+    def setUp(self):
+        self.image = Image.objects.create(
+            owner=self.user,
+            original_filename='image.jpg',
+            file=self.create_django_image_object(),
+        )
+        self.addCleanup(self.image.file.delete, save=False)
+        self.page = create_page('home', 'page.html', 'en', reverse_id='home')
+        placeholder = self.page.placeholders.get(slot='content')
+        row = add_plugin(placeholder, 'Bootstrap3RowCMSPlugin', 'en')
+        column = add_plugin(placeholder, 'Bootstrap3ColumnCMSPlugin', 'en', target=row)
+        add_plugin(placeholder, 'Bootstrap3ImageCMSPlugin', 'en', target=column, file=self.image)
+        add_plugin(placeholder, 'Bootstrap3LabelCMSPlugin', 'en', target=column, label='label')
+        self.page.publish('en')
+
+    def test_profile(self):
+        profile = memory.profile_page(self.page.get_public_object(), 'en')
+        self.assertFalse(memory.tracemalloc.is_tracing())
+        self.assertGreater(profile.peak, 0)
+        self.assertTrue(profile.sites)
+        rows = {row[0]: row[1:] for row in profile.get_rows()}
+        self.assertEqual(set(rows), {
+            'Bootstrap3RowCMSPlugin',
+            'Bootstrap3ColumnCMSPlugin',
+            'Bootstrap3ImageCMSPlugin',
+            'Bootstrap3LabelCMSPlugin',
+        })
+        count, allocated, retained, tree, srcset = rows['Bootstrap3ImageCMSPlugin']
+        self.assertEqual(count, 1)
+        self.assertGreater(retained, 0)
+        self.assertGreater(srcset, 0)
+        self.assertGreater(rows['Bootstrap3ColumnCMSPlugin'][3], 0)
+        self.assertEqual(rows['Bootstrap3LabelCMSPlugin'][4], 0)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('aldryn_bootstrap3_profile_memory', 'home', top=3, stdout=out)
+        output = out.getvalue()
+        self.assertIn('peak:', output)
+        self.assertIn('Bootstrap3ImageCMSPlugin', output)
+        self.assertIn('top allocation sites:', output)
+
+    def test_request_flag(self):
+        url = self.page.get_absolute_url('en') + '?' + memory.PROFILE_PARAM
+        with self.settings(DEBUG=True):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'Bootstrap3ImageCMSPlugin', response.content)
+
+        response = self.client.get(url)
+        self.assertTrue(response['Content-Type'].startswith('text/html'))
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import threading
+
+from django.core.urlresolvers import reverse
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from cms.api import add_plugin, create_page
+
+from djangocms_helper.base_test import BaseTestCase
+from easy_thumbnails.files import Thumbnailer
+from filer.models import Image
+
+from aldryn_bootstrap3 import metrics, thumbnails
+
+
+class MetricsTestCase(SimpleTestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def test_text_format(self):
+        metrics.increment('fragment_cache_hits')
+        metrics.increment('fragment_cache_hits')
+        metrics.observe('upload_seconds', 0.02, {'view': 'ajax_upload'})
+        metrics.observe('upload_seconds', 20, {'view': 'ajax_upload'})
+        metrics.increment('errors', labels={'name': 'a "quoted"\nvalue'})
+        lines = metrics.render_text().splitlines()
+        self.assertIn('# TYPE aldryn_bootstrap3_fragment_cache_hits_total counter', lines)
+        self.assertIn('aldryn_bootstrap3_fragment_cache_hits_total 2', lines)
+        self.assertIn('aldryn_bootstrap3_errors_total{name="a \\"quoted\\"\\nvalue"} 1', lines)
+        self.assertIn('# TYPE aldryn_bootstrap3_upload_seconds histogram', lines)
+        self.assertIn('aldryn_bootstrap3_upload_seconds_bucket{view="ajax_upload",le="0.01"} 0', lines)
+        self.assertIn('aldryn_bootstrap3_upload_seconds_bucket{view="ajax_upload",le="0.025"} 1', lines)
+        self.assertIn('aldryn_bootstrap3_upload_seconds_bucket{view="ajax_upload",le="10.0"} 1', lines)
+        self.assertIn('aldryn_bootstrap3_upload_seconds_bucket{view="ajax_upload",le="+Inf"} 2', lines)
+        self.assertIn('aldryn_bootstrap3_upload_seconds_sum{view="ajax_upload"} 20.02', lines)
+        self.assertIn('aldryn_bootstrap3_upload_seconds_count{view="ajax_upload"} 2', lines)
+
+    def test_threads(self):
+        def work():
+            for i in range(1000):
+                metrics.increment('renders')
+                metrics.observe('render_seconds', 0.001)
+
+        threads = [threading.Thread(target=work) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(metrics.get_counters()['renders'], 8000)
+        self.assertEqual(metrics.get_histograms()['render_seconds'][2], 8000)
+
+
+@override_settings(
+    ALDRYN_BOOTSTRAP3_METRICS=True,
+    ROOT_URLCONF='tests.urls',
+    CMS_PLACEHOLDER_CACHE=False,
+    CMS_PAGE_CACHE=False,
+)
+class MetricsViewTestCase(BaseTestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.url = reverse('aldryn_bootstrap3_metrics')
+
+    def test_plugin_render_times(self):
+        page = create_page('home', 'page.html', 'en')
+        placeholder = page.placeholders.get(slot='content')
+        row = add_plugin(placeholder, 'Bootstrap3RowCMSPlugin', 'en')
+        add_plugin(placeholder, 'Bootstrap3ColumnCMSPlugin', 'en', target=row)
+        page.publish('en')
+        self.client.get(page.get_absolute_url('en'))
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        content = response.content.decode('utf-8')
+        for plugin_type in ('Bootstrap3RowCMSPlugin', 'Bootstrap3ColumnCMSPlugin'):
+            self.assertIn(
+                'aldryn_bootstrap3_plugin_render_seconds_count{{plugin_type="{}"}} 1'.format(plugin_type),
+                content,
+            )
+
+    def test_thumbnails_generated_on_render(self):
+        generate_thumbnail = Thumbnailer.generate_thumbnail
+        thumbnails.install_generation_timing()
+        self.addCleanup(setattr, Thumbnailer, 'generate_thumbnail', generate_thumbnail)
+        image = Image.objects.create(
+            owner=self.user,
+            original_filename='image.jpg',
+            file=self.create_django_image_object(),
+        )
+        self.addCleanup(image.file.delete, save=False)
+        page = create_page('home', 'page.html', 'en')
+        add_plugin(page.placeholders.get(slot='content'), 'Bootstrap3ImageCMSPlugin', 'en', file=image)
+        page.publish('en')
+        self.client.get(page.get_absolute_url('en'))
+        self.assertGreater(metrics.get_histograms()['thumbnail_generation_seconds'][2], 0)
+
+    @override_settings(ALDRYN_BOOTSTRAP3_METRICS=False)
+    def test_disabled(self):
+        response = self.client.get(self.url, follow=True)
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+from django.conf import settings
+from django.template import engines
+from django.test.utils import override_settings
+
+from djangocms_helper.base_test import BaseTestCase
+
+from aldryn_bootstrap3 import precompile, styles
+
+from .tests_instrumentation import RecordingHandler
+
+
+CACHED_TEMPLATES = [dict(
+    settings.TEMPLATES[0],
+    APP_DIRS=False,
+    OPTIONS=dict(settings.TEMPLATES[0]['OPTIONS'], loaders=[
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]),
+)]
+
+
+class PrecompileTestCase(BaseTestCase):
+
+    def setUp(self):
+        registry = styles.registry
+        styles.registry = styles.StyleRegistry()
+        self.addCleanup(setattr, styles, 'registry', registry)
+        self.handler = RecordingHandler()
+        for logger in (precompile.logger, styles.logger):
+            logger.addHandler(self.handler)
+            self.addCleanup(logger.removeHandler, self.handler)
+
+    def test_compile(self):
+        result = precompile.compile_templates()
+        self.assertEqual(result.missing, [])
+        self.assertEqual(result.errors, {})
+        self.assertIn('aldryn_bootstrap3/plugins/row.html', result.compiled)
+        self.assertIn('admin/aldryn_bootstrap3/widgets/icon.html', result.compiled)
+        for name in styles.get_style_template_names('standard'):
+            self.assertIn(name, result.compiled)
+        self.assertEqual(len(result.compiled), len(set(result.compiled)))
+
+    @override_settings(ALDRYN_BOOTSTRAP3_CAROUSEL_STYLES='Standard, Missing')
+    def test_missing_style(self):
+        result = precompile.compile_templates()
+        self.assertEqual(result.missing, styles.get_style_template_names('missing'))
+        self.assertEqual(precompile.compile_on_startup().missing, result.missing)
+        # missing style templates are logged by the style registry only
+        self.assertEqual(
+            set(record.name for record in self.handler.records), {styles.logger.name},
+        )
+
+    @override_settings(TEMPLATES=CACHED_TEMPLATES)
+    def test_cached_loader(self):
+        loader = engines['django'].engine.template_loaders[0]
+        result = precompile.compile_templates()
+        cached = set(
+            template.origin.template_name
+            for template in loader.get_template_cache.values()
+            if hasattr(template, 'origin')
+        )
+        self.assertEqual(cached, set(result.compiled))
+
+    @override_settings(ALDRYN_BOOTSTRAP3_CAROUSEL_STYLES='Standard, Missing')
+    def test_styles_are_loaded_once(self):
+        checked = []
+        check_templates = styles.check_templates
+
+        def counting_check_templates(style):
+            checked.append(style)
+            return check_templates(style)
+
+        styles.check_templates = counting_check_templates
+        self.addCleanup(setattr, styles, 'check_templates', check_templates)
+        result = precompile.compile_on_startup()
+        self.assertEqual(sorted(checked), ['missing', 'standard'])
+        for name in styles.get_style_template_names('standard'):
+            self.assertIn(name, result.compiled)
+        self.assertEqual(result.missing, styles.get_style_template_names('missing'))
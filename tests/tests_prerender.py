@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from django.test.utils import override_settings
+
+from cms.api import add_plugin, create_page
+
+from djangocms_helper.base_test import BaseTestCase
+from filer.models import File
+
+from aldryn_bootstrap3 import fragments, hashes, metrics
+from aldryn_bootstrap3.cms_plugins import Bootstrap3LabelCMSPlugin
+from aldryn_bootstrap3.models import Boostrap3LabelPlugin, RenderedSubtree
+
+
+@override_settings(
+    ALDRYN_BOOTSTRAP3_PRERENDER=True,
+    CMS_PLACEHOLDER_CACHE=False,
+    CMS_PAGE_CACHE=False,
+)
+class PrerenderTestCase(BaseTestCase):
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.page = create_page('home', 'page.html', 'en')
+        self.placeholder = self.page.placeholders.get(slot='content')
+        row = add_plugin(self.placeholder, 'Bootstrap3RowCMSPlugin', 'en')
+        column = add_plugin(self.placeholder, 'Bootstrap3ColumnCMSPlugin', 'en', target=row)
+        add_plugin(self.placeholder, 'Bootstrap3LabelCMSPlugin', 'en', target=column, label='nested')
+        add_plugin(self.placeholder, 'Bootstrap3LabelCMSPlugin', 'en', label='first')
+
+    def get_content(self):
+        response = self.client.get(self.page.get_absolute_url('en'))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode('utf-8')
+
+    def get_public_placeholder(self):
+        return self.page.get_public_object().placeholders.get(slot='content')
+
+    def test_published_subtrees_are_served(self):
+        self.page.publish('en')
+        public_placeholder = self.get_public_placeholder()
+        self.assertEqual(
+            RenderedSubtree.objects.filter(placeholder=public_placeholder).count(), 2,
+        )
+        content = self.get_content()
+        self.assertIn('nested', content)
+        self.assertIn('first', content)
+        self.assertEqual(metrics.get_counters()['prerender_hits'], 2)
+
+        # queryset updates do not send signals
+        Boostrap3LabelPlugin.objects.filter(
+            placeholder=public_placeholder, label='first',
+        ).update(label='second')
+        self.assertIn('first', self.get_content())
+
+        # the snapshots are keyed by the stored subtree hashes
+        hashes.rebuild_placeholder_hashes(public_placeholder.pk)
+        self.assertIn('second', self.get_content())
+        self.assertEqual(metrics.get_counters()['prerender_outdated'], 1)
+
+    def test_snapshots_survive_cache_flushes(self):
+        self.page.publish('en')
+        self.get_content()
+        cache.clear()
+        fragments.local_cache.clear()
+        content = self.get_content()
+        self.assertIn('first', content)
+        self.assertEqual(metrics.get_counters()['prerender_hits'], 4)
+        self.assertNotIn('prerender_outdated', metrics.get_counters())
+
+    def test_file_changes(self):
+        file_obj = File.objects.create(
+            owner=self.user,
+            original_filename='report.txt',
+            file=ContentFile(b'0123456789', 'report.txt'),
+        )
+        self.addCleanup(file_obj.file.delete, save=False)
+        add_plugin(self.placeholder, 'Bootstrap3FileCMSPlugin', 'en', file=file_obj)
+        self.page.publish('en')
+        self.assertIn('report.txt', self.get_content())
+        self.assertEqual(metrics.get_counters()['prerender_hits'], 3)
+        File.objects.filter(pk=file_obj.pk).update(modified_at=timezone.now() + timedelta(seconds=1))
+        self.get_content()
+        self.assertEqual(metrics.get_counters()['prerender_hits'], 5)
+        self.assertEqual(metrics.get_counters()['prerender_outdated'], 1)
+
+    def test_context_dependent_plugins_are_rendered_live(self):
+        Bootstrap3LabelCMSPlugin.prerender = False
+        self.addCleanup(delattr, Bootstrap3LabelCMSPlugin, 'prerender')
+        self.page.publish('en')
+        self.assertFalse(RenderedSubtree.objects.exists())
+        self.assertIn('nested', self.get_content())
+
+    @override_settings(ALDRYN_BOOTSTRAP3_PRERENDER=False)
+    def test_disabled(self):
+        self.page.publish('en')
+        self.assertFalse(RenderedSubtree.objects.exists())
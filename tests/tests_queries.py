@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+import difflib
+import re
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import translation
+
+from cms.api import add_plugin, create_page
+from cms.models import Placeholder
+from cms.plugin_pool import plugin_pool
+from cms.plugin_rendering import ContentRenderer
+from sekizai.context import SekizaiContext
+
+from djangocms_helper.base_test import BaseTestCase
+from filer.models import File, Folder, Image
+
+from aldryn_bootstrap3 import fragments, utils, warmup
+
+
+CHILD_COUNTS = (1, 10, 100)
+# used for plugins accepting any children and any parent
+DEFAULT_CHILD = 'Bootstrap3LabelCMSPlugin'
+DEFAULT_PARENT = 'Bootstrap3WellCMSPlugin'
+
+
+def normalize(sql):
+    # ids and positions differ between the trees, the selected columns
+    # only make the diff harder to read
+    sql = re.sub(r'^SELECT .*? FROM ', 'SELECT ... FROM ', sql)
+    return re.sub(r'\b\d+\b', '#', sql)
+
+
+@override_settings(
+    CMS_PLACEHOLDER_CACHE=False,
+    CMS_PAGE_CACHE=False,
+)
+class QueryBudgetTestCase(BaseTestCase):
+    """
+    Renders each plugin with 1, 10 and 100 children and 1, 10 and 100 times
+    nested in its parent, the number of queries must not depend on it.
+    """
+
+    def setUp(self):
+        self.page = create_page('home', 'page.html', 'en')
+        self.folder = Folder.objects.create(name='slides')
+        self.image = Image.objects.create(
+            owner=self.user,
+            folder=self.folder,
+            original_filename='image.jpg',
+            file=self.create_django_image_object(),
+        )
+        self.file = File.objects.create(
+            owner=self.user,
+            original_filename='report.txt',
+            file=ContentFile(b'0123456789', 'report.txt'),
+        )
+        self.addCleanup(self.image.file.delete, save=False)
+        self.addCleanup(self.file.file.delete, save=False)
+
+    def get_data(self, plugin_type):
+        return {
+            'Bootstrap3ButtonCMSPlugin': {'label': 'button', 'link_page': self.page},
+            'Bootstrap3CarouselSlideCMSPlugin': {'image': self.image, 'link_page': self.page},
+            'Bootstrap3CarouselSlideFolderCMSPlugin': {'folder': self.folder},
+            'Bootstrap3FileCMSPlugin': {'file': self.file},
+            'Bootstrap3ImageCMSPlugin': {'file': self.image},
+            'Bootstrap3LabelCMSPlugin': {'label': 'label'},
+            'Bootstrap3TabItemCMSPlugin': {'title': 'tab'},
+        }.get(plugin_type, {})
+
+    def add_tree(self, plugin_type, child_type, count):
+        """
+        Adds ``plugin_type`` with ``count`` children to a new placeholder.
+        """
+        placeholder = Placeholder.objects.create(slot='content')
+        parent = add_plugin(placeholder, plugin_type, 'en', **self.get_data(plugin_type))
+        model = plugin_pool.get_plugin(child_type).model
+        utils.bulk_add_child_plugins(parent, [
+            model(plugin_type=child_type, **self.get_data(child_type))
+            for i in range(count)
+        ])
+        return placeholder
+
+    def render(self, placeholder):
+        """
+        Returns the queries of rendering ``placeholder`` with empty caches.
+        """
+        cache.clear()
+        fragments.local_cache.clear()
+        # the cms keeps the plugins of rendered placeholders
+        placeholder = Placeholder.objects.get(pk=placeholder.pk)
+        request = warmup.get_request(self.page, 'en')
+        renderer = ContentRenderer(request)
+        context = SekizaiContext({
+            'request': request,
+            'cms_content_renderer': renderer,
+        })
+        with translation.override('en'), CaptureQueriesContext(connection) as queries:
+            renderer.render_placeholder(
+                placeholder, context, language='en', page=self.page, editable=False,
+            )
+        return [normalize(query['sql']) for query in queries.captured_queries]
+
+    def check_budget(self, plugin_type, child_type):
+        """
+        Returns a description of the extra queries if rendering more
+        children of ``plugin_type`` makes more queries, or ``None``.
+        """
+        trees = [
+            self.add_tree(plugin_type, child_type, count) for count in CHILD_COUNTS
+        ]
+        # queries made once per process, e.g. content types and thumbnails
+        self.render(trees[0])
+        queries = [self.render(tree) for tree in trees]
+        if all(len(sql) == len(queries[0]) for sql in queries):
+            return None
+        diff = difflib.unified_diff(
+            queries[0], queries[-1],
+            '{} children'.format(CHILD_COUNTS[0]),
+            '{} children'.format(CHILD_COUNTS[-1]),
+            lineterm='',
+        )
+        return '{} with {} children: {} queries\n{}'.format(
+            plugin_type,
+            child_type,
+            ', '.join(str(len(sql)) for sql in queries),
+            '\n'.join(diff),
+        )
+
+    def assertBudgets(self, pairs):
+        failures = [
+            failure for failure in (
+                self.check_budget(plugin_type, child_type)
+                for plugin_type, child_type in pairs
+            ) if failure
+        ]
+        if failures:
+            self.fail('\n\n'.join(failures))
+
+    def test_plugins_with_children(self):
+        pairs = []
+        for plugin_type in warmup.get_plugin_types():
+            plugin = plugin_pool.get_plugin(plugin_type)
+            if plugin.allow_children:
+                child_classes = plugin.child_classes or [DEFAULT_CHILD]
+                pairs.append((plugin_type, child_classes[0]))
+        self.assertBudgets(pairs)
+
+    def test_nested_plugins(self):
+        pairs = []
+        for plugin_type in warmup.get_plugin_types():
+            parent_classes = plugin_pool.get_plugin(plugin_type).parent_classes
+            pairs.append((parent_classes[0] if parent_classes else DEFAULT_PARENT, plugin_type))
+        self.assertBudgets(pairs)
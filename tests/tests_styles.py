@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db import models
+from django.test.utils import override_settings
+
+from djangocms_helper.base_test import BaseTestCase
+
+from aldryn_bootstrap3 import model_fields, styles
+from aldryn_bootstrap3.forms import CarouselPluginForm
+from aldryn_bootstrap3.models import Bootstrap3CarouselPlugin
+
+from .tests_instrumentation import RecordingHandler
+
+
+class StyleRegistryTestCase(BaseTestCase):
+
+    def setUp(self):
+        self.template_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.template_dir)
+        registry = styles.registry
+        styles.registry = styles.StyleRegistry()
+        self.addCleanup(setattr, styles, 'registry', registry)
+        # incomplete styles are logged
+        self.handler = RecordingHandler()
+        styles.logger.addHandler(self.handler)
+        self.addCleanup(styles.logger.removeHandler, self.handler)
+
+    def get_warnings(self):
+        return [record.getMessage() for record in self.handler.records]
+
+    def get_form(self, style):
+        form = CarouselPluginForm(data={'style': style, 'interval': 5000, 'ride': True})
+        # the choices of the form field are built with the form class
+        form.fields['style'].choices = Bootstrap3CarouselPlugin._meta.get_field('style').choices
+        return form
+
+    def add_template(self, style, name, content='{{ instance.pk }}'):
+        path = os.path.join(self.template_dir, styles.CAROUSEL_TEMPLATE_DIR, style)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        with open(os.path.join(path, '{}.html'.format(name)), 'w') as fobj:
+            fobj.write(content)
+
+    def test_load(self):
+        styles.registry.load()
+        self.assertEqual(self.get_warnings(), [])
+        self.assertEqual(styles.registry.styles, {'standard': []})
+        self.assertTrue(styles.registry.is_complete('standard'))
+        self.assertTrue(self.get_form('standard').is_valid())
+
+    @override_settings(ALDRYN_BOOTSTRAP3_CAROUSEL_STYLES='Standard, Feature')
+    def test_incomplete_style(self):
+        styles.registry.load()
+        self.assertEqual(self.get_warnings(), [
+            'Carousel style feature is missing templates: {}'.format(
+                ', '.join(styles.get_style_template_names('feature')),
+            ),
+        ])
+        self.assertEqual(
+            styles.registry.get_missing_templates('feature'),
+            styles.get_style_template_names('feature'),
+        )
+        form = self.get_form('feature')
+        self.assertFalse(form.is_valid())
+        self.assertIn('feature/carousel.html', form.errors['style'][0])
+
+    @override_settings(ALDRYN_BOOTSTRAP3_CAROUSEL_STYLES='Standard, Feature')
+    def test_broken_style(self):
+        with self.settings(TEMPLATES=[dict(settings.TEMPLATES[0], DIRS=[self.template_dir])]):
+            for name in styles.CAROUSEL_TEMPLATES:
+                self.add_template('feature', name)
+            self.add_template('feature', 'slide', '{% if %}')
+            styles.registry.load()
+            self.assertEqual(styles.registry.get_missing_templates('feature'), [])
+            self.assertEqual(
+                list(styles.registry.get_errors('feature')),
+                ['aldryn_bootstrap3/plugins/carousel/feature/slide.html'],
+            )
+            self.assertFalse(styles.registry.is_complete('feature'))
+            self.assertTrue(styles.registry.is_complete('standard'))
+            form = self.get_form('feature')
+            self.assertFalse(form.is_valid())
+            self.assertIn('feature/slide.html failed to compile', form.errors['style'][0])
+        self.assertEqual(len(self.get_warnings()), 1)
+        self.assertIn('Carousel style feature is invalid', self.get_warnings()[0])
+
+    @override_settings(ALDRYN_BOOTSTRAP3_CAROUSEL_STYLES='Standard, Feature', DEBUG=True)
+    def test_reload(self):
+        with self.settings(TEMPLATES=[dict(settings.TEMPLATES[0], DIRS=[self.template_dir])]):
+            styles.registry.load()
+            self.assertFalse(styles.registry.is_complete('feature'))
+            self.add_template('feature', 'carousel')
+            self.assertEqual(
+                styles.registry.get_missing_templates('feature'),
+                styles.get_style_template_names('feature')[1:],
+            )
+            for name in styles.CAROUSEL_TEMPLATES:
+                self.add_template('feature', name)
+            self.assertTrue(styles.registry.is_complete('feature'))
+            self.assertTrue(self.get_form('feature').is_valid())
+        # logged on each reload while the style was incomplete
+        self.assertEqual(len(self.get_warnings()), 2)
+
+    @override_settings(ALDRYN_BOOTSTRAP3_CAROUSEL_STYLES='Standard, Feature', DEBUG=False)
+    def test_no_reload_in_production(self):
+        with self.settings(TEMPLATES=[dict(settings.TEMPLATES[0], DIRS=[self.template_dir])]):
+            styles.registry.load()
+            for name in styles.CAROUSEL_TEMPLATES:
+                self.add_template('feature', name)
+            self.assertFalse(styles.registry.is_complete('feature'))
+        self.assertEqual(len(self.get_warnings()), 1)
+
+    @override_settings(ALDRYN_BOOTSTRAP3_CAROUSEL_STYLES='Feature')
+    def test_choices_are_lazy(self):
+        calls = []
+        get_additional_styles = model_fields.get_additional_styles
+
+        def counting_get_additional_styles():
+            calls.append(True)
+            return get_additional_styles()
+
+        model_fields.get_additional_styles = counting_get_additional_styles
+        self.addCleanup(setattr, model_fields, 'get_additional_styles', get_additional_styles)
+        field = models.CharField(
+            choices=model_fields.StyleChoices([('standard', 'Standard')]), max_length=255,
+        )
+        self.assertEqual(calls, [])
+        self.assertEqual([style for style, label in field.choices], ['standard', 'feature'])
+        self.assertEqual(len(calls), 1)
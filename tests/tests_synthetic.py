@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from django.core.management import call_command
+from django.test.utils import override_settings
+from django.utils.six import StringIO
+
+from cms.models import CMSPlugin
+from cms.plugin_pool import plugin_pool
+
+from djangocms_helper.base_test import BaseTestCase
+from filer.models import File
+
+from aldryn_bootstrap3 import synthetic
+from aldryn_bootstrap3.models import FileUsage, PageLink, PluginHash
+
+
+@override_settings(
+    CMS_PLACEHOLDER_CACHE=False,
+    CMS_PAGE_CACHE=False,
+)
+class SiteGeneratorTestCase(BaseTestCase):
+
+    def tearDown(self):
+        for file_obj in File.objects.all():
+            file_obj.file.delete(save=False)
+
+    def get_structure(self, placeholder):
+        plugins = CMSPlugin.objects.filter(placeholder=placeholder).order_by('path')
+        return [(plugin.depth, plugin.position, plugin.plugin_type) for plugin in plugins]
+
+    def test_generate(self):
+        generator = synthetic.SiteGenerator(seed=1, plugins=300, images=2, files=1)
+        pages = generator.generate(3)
+        self.assertEqual(len(pages), 3)
+        plugins = list(CMSPlugin.objects.all())
+        self.assertEqual(len(plugins), generator.plugin_count)
+        self.assertGreater(len(set(plugin.plugin_type for plugin in plugins)), 20)
+        for plugin in plugins:
+            self.assertEqual(
+                plugin.numchild, sum(1 for child in plugins if child.parent_id == plugin.pk),
+            )
+            instance, plugin_class = plugin.get_plugin_instance()
+            self.assertIsNotNone(instance)
+            if plugin_class.parent_classes:
+                self.assertIn(plugin.parent.plugin_type, plugin_class.parent_classes)
+        self.assertEqual(PluginHash.objects.count(), len(plugins))
+        self.assertTrue(FileUsage.objects.exists())
+        self.assertTrue(PageLink.objects.exists())
+
+        for page in pages:
+            public = page.get_public_object()
+            self.assertEqual(
+                self.get_structure(page.placeholders.get(slot='content')),
+                self.get_structure(public.placeholders.get(slot='content')),
+            )
+            response = self.client.get(public.get_absolute_url('en'))
+            self.assertEqual(response.status_code, 200)
+
+    def test_seed(self):
+        first = synthetic.SiteGenerator(seed=2, plugins=50, images=1, files=0).generate(2)
+        second = synthetic.SiteGenerator(seed=2, plugins=50, images=1, files=0).generate(2)
+        third = synthetic.SiteGenerator(seed=3, plugins=50, images=1, files=0).generate(2)
+        structures = [
+            [self.get_structure(page.placeholders.get(slot='content')) for page in pages]
+            for pages in (first, second, third)
+        ]
+        self.assertEqual(structures[0], structures[1])
+        self.assertNotEqual(structures[0], structures[2])
+
+    def test_mix(self):
+        self.assertEqual(
+            synthetic.parse_mix('Row=0, Bootstrap3LabelCMSPlugin=2'),
+            {'Bootstrap3RowCMSPlugin': 0, 'Bootstrap3LabelCMSPlugin': 2},
+        )
+        with self.assertRaises(ValueError):
+            synthetic.parse_mix('Unknown=1')
+        synthetic.SiteGenerator(
+            mix={'Bootstrap3RowCMSPlugin': 0}, plugins=100, images=0, files=0,
+        ).generate(1)
+        self.assertFalse(CMSPlugin.objects.filter(plugin_type='Bootstrap3RowCMSPlugin').exists())
+        self.assertFalse(CMSPlugin.objects.filter(plugin_type='Bootstrap3ColumnCMSPlugin').exists())
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            'aldryn_bootstrap3_generate_site',
+            pages=2, plugins=20, images=1, files=1, stdout=out,
+        )
+        self.assertIn('Generated 2 page(s) with', out.getvalue())
+        self.assertTrue(all(
+            plugin_type in plugin_pool.plugins
+            for plugin_type in CMSPlugin.objects.values_list('plugin_type', flat=True)
+        ))
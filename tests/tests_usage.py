@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+from django.core.urlresolvers import reverse
+
+from cms.api import add_plugin, create_page
+from cms.models import Placeholder
+
+from djangocms_helper.base_test import BaseTestCase
+from filer.models import Folder, Image
+
+from aldryn_bootstrap3 import fragments, usage
+from aldryn_bootstrap3.models import FileUsage
+
+
+class FileUsageTestCase(BaseTestCase):
+
+    def setUp(self):
+        self.page = create_page('home', 'page.html', 'en')
+        self.placeholder = self.page.placeholders.get(slot='content')
+        self.folder = Folder.objects.create(name='slides')
+        self.image = Image.objects.create(
+            owner=self.user,
+            folder=self.folder,
+            original_filename='image.jpg',
+            file=self.create_django_image_object(),
+        )
+        self.other_image = Image.objects.create(
+            owner=self.user,
+            original_filename='other.jpg',
+            file=self.create_django_image_object(),
+        )
+        self.image_plugin = add_plugin(
+            self.placeholder, 'Bootstrap3ImageCMSPlugin', 'en',
+            file=self.image,
+        )
+        self.carousel = add_plugin(
+            self.placeholder, 'Bootstrap3CarouselCMSPlugin', 'en',
+        )
+        self.slide = add_plugin(
+            self.placeholder, 'Bootstrap3CarouselSlideCMSPlugin', 'en',
+            target=self.carousel, image=self.other_image, link_file=self.image,
+        )
+        self.slide_folder = add_plugin(
+            self.placeholder, 'Bootstrap3CarouselSlideFolderCMSPlugin', 'en',
+            target=self.carousel, folder=self.folder,
+        )
+
+    def tearDown(self):
+        for image in (self.image, self.other_image):
+            image.file.delete(save=False)
+
+    def test_plugins_using_file(self):
+        self.assertEqual(
+            set(usage.get_plugins_using_file(self.image).values_list('pk', flat=True)),
+            {self.image_plugin.pk, self.slide.pk, self.slide_folder.pk},
+        )
+        self.assertEqual(
+            list(usage.get_plugins_using_file(self.other_image).values_list('pk', flat=True)),
+            [self.slide.pk],
+        )
+
+    def test_usage_follows_moved_plugin(self):
+        other = create_page('other', 'page.html', 'en')
+        target = other.placeholders.get(slot='content')
+        with self.login_user_context(self.user):
+            response = self.client.post(reverse('admin:cms_page_move_plugin') + '?cms_path=/', {
+                'plugin_id': self.carousel.pk,
+                'placeholder_id': target.pk,
+                'plugin_language': 'en',
+                'plugin_order[]': [self.carousel.pk],
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            set(FileUsage.objects.values_list('plugin_id', 'placeholder_id')),
+            {
+                (self.image_plugin.pk, self.placeholder.pk),
+                (self.slide.pk, target.pk),
+                (self.slide_folder.pk, target.pk),
+            },
+        )
+        carousel = self.carousel.__class__.objects.get(pk=self.carousel.pk)
+        self.assertEqual(
+            fragments.get_file_dependencies(target, carousel),
+            (sorted([self.image.pk, self.other_image.pk]), [self.folder.pk]),
+        )
+
+    def test_usage_follows_plugin(self):
+        self.slide.link_file = None
+        self.slide.save()
+        self.assertEqual(
+            set(usage.get_file_usage(self.image).values_list('plugin_id', flat=True)),
+            {self.image_plugin.pk, self.slide_folder.pk},
+        )
+        self.image_plugin.delete()
+        self.assertEqual(
+            list(usage.get_file_usage(self.image).values_list('plugin_id', flat=True)),
+            [self.slide_folder.pk],
+        )
+
+    def test_recrop_invalidates_thumbnails_and_placeholders(self):
+        self.render_plugin(self.page, 'en', self.image_plugin)
+        source_cache = self.image.file.get_source_cache()
+        self.assertTrue(source_cache.thumbnails.exists())
+
+        cleared = []
+        clear_cache = Placeholder.clear_cache
+
+        def record(placeholder, language, site_id=None):
+            cleared.append((placeholder.pk, language))
+            return clear_cache(placeholder, language, site_id)
+
+        Placeholder.clear_cache = record
+        self.addCleanup(setattr, Placeholder, 'clear_cache', clear_cache)
+
+        self.image.subject_location = '10,10'
+        self.image.save()
+        self.assertEqual(cleared, [(self.placeholder.pk, 'en')])
+        self.assertFalse(source_cache.thumbnails.exists())
+
+        # unrelated changes keep the thumbnails
+        del cleared[:]
+        self.image.name = 'renamed'
+        self.image.save()
+        self.assertEqual(cleared, [])
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test.utils import override_settings
+from django.utils.six import StringIO
+
+from cms.api import add_plugin, create_page
+
+from djangocms_helper.base_test import BaseTestCase
+
+from aldryn_bootstrap3 import fragments, metrics, warmup
+
+
+@override_settings(
+    ALDRYN_BOOTSTRAP3_FRAGMENT_CACHE_TIMEOUT=60,
+    CMS_PLACEHOLDER_CACHE=False,
+)
+class WarmupTestCase(BaseTestCase):
+
+    def setUp(self):
+        cache.clear()
+        fragments.local_cache.clear()
+        metrics.reset()
+        self.home = create_page('home', 'page.html', 'en', published=True)
+        self.page = create_page(
+            'page', 'page.html', 'en', parent=self.home, reverse_id='landing',
+        )
+        for page in (self.home, self.page):
+            placeholder = page.placeholders.get(slot='content')
+            row = add_plugin(placeholder, 'Bootstrap3RowCMSPlugin', 'en')
+            add_plugin(
+                placeholder, 'Bootstrap3ColumnCMSPlugin', 'en', target=row,
+            )
+            add_plugin(placeholder, 'Bootstrap3LabelCMSPlugin', 'en', label='label')
+            page.publish('en')
+        # not published
+        add_plugin(
+            create_page('draft', 'page.html', 'en').placeholders.get(slot='content'),
+            'Bootstrap3LabelCMSPlugin', 'en', label='draft',
+        )
+
+    def tearDown(self):
+        fragments.local_cache.clear()
+
+    def test_tasks_are_ordered_by_priority(self):
+        tasks = warmup.get_tasks()
+        self.assertEqual(
+            [task.page.pk for task in tasks],
+            [self.home.publisher_public_id, self.page.publisher_public_id],
+        )
+        self.assertEqual(set(task.placeholder.slot for task in tasks), {'content'})
+
+        pages = warmup.get_priority_pages(['landing', self.home.pk, 'missing'])
+        self.assertEqual(
+            [page.pk for page in pages],
+            [self.page.publisher_public_id, self.home.publisher_public_id],
+        )
+        tasks = warmup.get_tasks(pages[:1])
+        self.assertEqual(tasks[0].page.pk, self.page.publisher_public_id)
+
+    def test_command_fills_fragment_cache(self):
+        out = StringIO()
+        call_command('aldryn_bootstrap3_warmup', concurrency=1, stdout=out)
+        output = out.getvalue()
+        self.assertIn('Warmed up 2 placeholder(s).', output)
+        for plugin_type in ('Bootstrap3RowCMSPlugin', 'Bootstrap3LabelCMSPlugin'):
+            self.assertIn(plugin_type, output)
+        # nested plugins are cached on their own as well
+        self.assertEqual(metrics.get_counters()['fragment_cache_refreshes'], 6)
+
+        # the visitors get the cached fragments of the root plugins
+        self.client.get(self.page.get_absolute_url('en'))
+        self.assertEqual(metrics.get_counters()['fragment_cache_hits'], 2)
+
+    def test_failures_are_reported(self):
+        warm_placeholder = warmup.warm_placeholder
+
+        def failing_warm_placeholder(task, stats):
+            if task.page.pk == self.home.publisher_public_id:
+                raise ValueError('broken')
+            return warm_placeholder(task, stats)
+
+        warmup.warm_placeholder = failing_warm_placeholder
+        self.addCleanup(setattr, warmup, 'warm_placeholder', warm_placeholder)
+        out, err = StringIO(), StringIO()
+        call_command('aldryn_bootstrap3_warmup', concurrency=1, stdout=out, stderr=err)
+        self.assertIn('Warmed up 1 placeholder(s).', out.getvalue())
+        self.assertIn('Failed to warm up 1 placeholder(s).', out.getvalue())
+        self.assertIn("/en/ (en) content: ValueError('broken'", err.getvalue())
+
+    def test_time_budget(self):
+        out = StringIO()
+        call_command('aldryn_bootstrap3_warmup', concurrency=1, time_budget=-1, stdout=out)
+        self.assertIn('Skipped 2 placeholder(s) after the time budget.', out.getvalue())
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+from django.conf.urls import include, url
+
+from djangocms_helper.urls import urlpatterns
+
+
+urlpatterns = [
+    url(r'^bootstrap3/', include('aldryn_bootstrap3.urls')),
+] + urlpatterns